@@ -0,0 +1,285 @@
+"""
+    bench_vivotools.py -- time the hot paths of vivotools on a synthetic VIVO
+    graph served by the local stand-in SPARQL endpoint (vivo_stand_in.py)
+
+    For each benchmark, report latency percentiles in milliseconds, SPARQL
+    queries per call and the peak resident memory of the process while the
+    benchmark ran.  The peak is reset before each benchmark through
+    /proc/self/clear_refs.  Where it can not be reset, as off Linux, the peak
+    is that of the process so far, which never goes down, and is saved as
+    process_peak_memory_kb rather than peak_memory_kb.  Results are saved as
+    JSON, by default to bench_<vivotools version>.json, and can be compared
+    with the results of an earlier version:
+
+        python bench_vivotools.py --people 200 --compare bench_1.72.json
+
+    update_pubmed and update_pubmed_pipeline are timed with synthetic PubMed
+    values in place of Entrez, so no benchmark touches the network.
+
+    A micro-benchmark times the emission of one triple of RDF by
+    assert_resource_property and assert_data_property, and by a tempita
+    template made for each triple as vivotools did before 1.84, or made once.
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import argparse, json, os, random, resource, tempfile, time
+import tempita
+from datetime import datetime
+
+def percentile(sorted_times, p):
+    """
+    Given a sorted list of times, return the pth percentile, nearest rank
+    """
+    k = int(round(p / 100.0 * (len(sorted_times) - 1)))
+    return sorted_times[k]
+
+def peak_memory_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def reset_peak_memory():
+    """
+    Reset the peak resident memory of the process to its resident memory
+    now.  Return False if the peak can not be reset
+    """
+    try:
+        f = open("/proc/self/clear_refs", "w")
+        try:
+            f.write("5")
+        finally:
+            f.close()
+        return True
+    except (IOError, OSError):
+        return False
+
+def bench(name, function, calls, server, results):
+    """
+    Call function once for each argument list in calls and record the
+    latency of each call, the queries it made and the peak memory
+    """
+    times = []
+    if reset_peak_memory():
+        memory = 'peak_memory_kb'
+    else:
+        memory = 'process_peak_memory_kb'
+    queries = server.queries
+    for args in calls:
+        start = time.time()
+        function(*args)
+        times.append((time.time() - start) * 1000.0)
+    queries = server.queries - queries
+    times.sort()
+    results[name] = {
+        'calls': len(times),
+        'mean_ms': sum(times) / len(times),
+        'p50_ms': percentile(times, 50),
+        'p90_ms': percentile(times, 90),
+        'p99_ms': percentile(times, 99),
+        'max_ms': times[-1],
+        'queries_per_call': float(queries) / len(times),
+        memory: peak_memory_kb()}
+    print "%-32s %6d %10.2f %10.2f %10.2f %10.1f %10d" % (name, len(times),
+        results[name]['p50_ms'], results[name]['p90_ms'],
+        results[name]['p99_ms'], results[name]['queries_per_call'],
+        results[name][memory])
+
+resource_property_text = """    <rdf:Description rdf:about="{{uri}}">
+        <{{resource_property}} rdf:resource="{{resource_uri}}"/>
+    </rdf:Description>
+"""
+
+def bench_emission(triples, results):
+    """
+    Emit triples triples of RDF each way and record the microseconds per
+    triple
+    """
+    template = tempita.Template(resource_property_text)
+    ways = [
+        ["tempita per triple", lambda i: tempita.Template(
+            resource_property_text).substitute(uri="http://vivo/n%d" % i,
+            resource_property="vivo:hasSubjectArea",
+            resource_uri="http://vivo/c%d" % i)],
+        ["tempita precompiled", lambda i: template.substitute(
+            uri="http://vivo/n%d" % i, resource_property="vivo:hasSubjectArea",
+            resource_uri="http://vivo/c%d" % i)],
+        ["assert_resource_property", lambda i: vt.assert_resource_property(
+            "http://vivo/n%d" % i, "vivo:hasSubjectArea",
+            "http://vivo/c%d" % i)],
+        ["assert_data_property", lambda i: vt.assert_data_property(
+            "http://vivo/n%d" % i, "bibo:pmid", str(i))]]
+    print "\n%-32s %10s %12s" % ("emission", "triples", "us/triple")
+    for [name, function] in ways:
+        start = time.time()
+        for i in xrange(triples):
+            function(i)
+        us = (time.time() - start) * 1e6 / triples
+        results[name] = {'triples': triples, 'us_per_triple': us}
+        print "%-32s %10d %12.2f" % (name, triples, us)
+
+def synthetic_pubmed_values(rng, concepts):
+    """
+    Return a replacement for get_pubmed_values giving synthetic values, half
+    of the keywords known concepts and half new
+    """
+    def get_pubmed_values(doi, pmid=None, debug=False):
+        return {'pmid': pmid or str(rng.randint(30000000, 39999999)),
+                'pmcid': "PMC%d" % rng.randint(1000000, 3999999),
+                'abstract': "Synthetic abstract " * 20,
+                'keyword_list': [rng.choice(concepts),
+                                 "New concept %d" % rng.randint(1, 10**6)],
+                'grants_cited': ["R01 CA%06d" % rng.randint(1, 999999)]}
+    return get_pubmed_values
+
+def synthetic_pubmed_batch(get_pubmed_values):
+    """
+    Return replacements for get_pmids_from_dois and get_pubmed_values_batch
+    giving the synthetic values of get_pubmed_values
+    """
+    def get_pmids_from_dois(dois):
+        return dict((doi, get_pubmed_values(doi)['pmid']) for doi in dois)
+    def get_pubmed_values_batch(pmids):
+        return dict((pmid, get_pubmed_values(None, pmid)) for pmid in pmids)
+    return [get_pmids_from_dois, get_pubmed_values_batch]
+
+def write_csv(rows):
+    """
+    Write a "|" delimited CSV file of rows rows to a temporary file.  Return
+    its name
+    """
+    [handle, filename] = tempfile.mkstemp(suffix=".csv")
+    f = os.fdopen(handle, "w")
+    f.write("uri|ufid|label|email|dept\n")
+    for i in range(rows):
+        f.write("http://vivo.ufl.edu/individual/n%d|%08d|Person%d, Ann|" \
+            "person%d@ufl.edu|%08d\n" % (i, i, i, i, i % 100))
+    f.close()
+    return filename
+
+def compare(results, emission, filename):
+    """
+    Print the change in median latency and queries per call, and in the
+    cost of emitting a triple, from the results saved in filename
+    """
+    previous = json.load(open(filename))
+    print "\nCompared with", filename, "(version", previous['version'] + ")"
+    print "%-32s %12s %12s %12s" % ("benchmark", "p50 before", "p50 now",
+                                    "queries")
+    for name in sorted(results):
+        if name not in previous['results']:
+            continue
+        before = previous['results'][name]
+        now = results[name]
+        print "%-32s %12.2f %12.2f %5.1f->%-5.1f" % (name, before['p50_ms'],
+            now['p50_ms'], before['queries_per_call'],
+            now['queries_per_call'])
+    for name in sorted(emission):
+        if name not in previous.get('emission', {}):
+            continue
+        print "%-32s %9.2f us %9.2f us" % (name,
+            previous['emission'][name]['us_per_triple'],
+            emission[name]['us_per_triple'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vivotools")
+    parser.add_argument("--people", type=int, default=100,
+                        help="people in the synthetic graph")
+    parser.add_argument("--calls", type=int, default=20,
+                        help="calls of each getter and update function")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="calls of each dictionary builder")
+    parser.add_argument("--rows", type=int, default=10000,
+                        help="rows of the CSV file for read_csv")
+    parser.add_argument("--triples", type=int, default=100000,
+                        help="triples emitted by each way of emitting RDF")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="results file, default bench_<version>.json")
+    parser.add_argument("--compare", default=None,
+                        help="results file of an earlier run to compare")
+    args = parser.parse_args()
+
+    print datetime.now(), "Start"
+    start = time.time()
+    [store, uris] = vivo_stand_in.synthetic_graph(args.people,
+                                                  seed=args.seed)
+    print datetime.now(), len(store), "triples made in", \
+        round(time.time() - start, 2), "seconds"
+    server = vivo_stand_in.serve(store)
+    vt.set_sparql_endpoint(server.url)
+    rng = random.Random(args.seed)
+
+    def sample(kind, n=args.calls):
+        return [rng.choice(uris[kind]) for i in range(n)]
+
+    results = {}
+    print "\n%-32s %6s %10s %10s %10s %10s %10s" % ("benchmark", "calls",
+        "p50 ms", "p90 ms", "p99 ms", "queries", "peak kB")
+    bench("get_person(all)", lambda uri: vt.get_person(uri,
+        get_publications=True, get_grants=True, get_positions=True,
+        get_degrees=True), [[uri] for uri in sample('person')],
+        server, results)
+    bench("get_grant(get_investigators)", lambda uri: vt.get_grant(uri,
+        get_investigators=True), [[uri] for uri in sample('grant')],
+        server, results)
+    for name in ['concept', 'deptid', 'ufid', 'doi', 'title', 'publisher',
+                 'journal', 'date']:
+        function = getattr(vt, "make_" + name + "_dictionary")
+        bench("make_" + name + "_dictionary", function,
+              [[]] * args.repeat, server, results)
+    people = sample('person', 2 * args.calls)
+    bench("merge_uri", vt.merge_uri,
+          [people[i:i+2] for i in range(0, len(people), 2)], server, results)
+    bench("remove_uri", vt.remove_uri,
+          [[uri] for uri in sample('publication')], server, results)
+
+    vt.make_concept_dictionary()
+    labels = vt.concept_dictionary.keys()
+    saved = [vt.get_pubmed_values, vt.get_pmids_from_dois,
+             vt.get_pubmed_values_batch]
+    vt.get_pubmed_values = synthetic_pubmed_values(rng, labels)
+    [vt.get_pmids_from_dois, vt.get_pubmed_values_batch] = \
+        synthetic_pubmed_batch(vt.get_pubmed_values)
+    try:
+        bench("update_pubmed", vt.update_pubmed,
+              [[uri] for uri in sample('publication')], server, results)
+        bench("update_pubmed_pipeline(%d)" % args.calls,
+              vt.update_pubmed_pipeline,
+              [[sample('publication')]] * args.repeat, server, results)
+    finally:
+        [vt.get_pubmed_values, vt.get_pmids_from_dois,
+         vt.get_pubmed_values_batch] = saved
+
+    filename = write_csv(args.rows)
+    try:
+        bench("read_csv(%d rows)" % args.rows, vt.read_csv,
+              [[filename]] * args.repeat, server, results)
+    finally:
+        os.remove(filename)
+
+    emission = {}
+    bench_emission(args.triples, emission)
+
+    output = args.output or "bench_" + vt.__version__ + ".json"
+    f = open(output, "w")
+    json.dump({'version': vt.__version__, 'date': datetime.now().isoformat(),
+               'people': args.people, 'triples': len(store),
+               'results': results, 'emission': emission}, f, indent=2,
+              sort_keys=True)
+    f.close()
+    print "\n", datetime.now(), "Results saved to", output
+    if args.compare is not None:
+        compare(results, emission, args.compare)
+    vt.sparql_connection_pool.close()
+    server.shutdown()
+    print datetime.now(), "Finish"
+
+if __name__ == "__main__":
+    main()
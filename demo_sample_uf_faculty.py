@@ -3,12 +3,14 @@
 
     Version 0.1 MC 2013-12-27
     --  Initial version.
+    Version 0.2 MC 2026-10-18
+    --  Gather faculty a page at a time with vivo_sparql_pages
 """
 
 __author__      = "Michael Conlon"
 __copyright__   = "Copyright 2013, University of Florida"
 __license__     = "BSD 3-Clause license"
-__version__     = "0.1"
+__version__     = "0.2"
 
 import vivotools as vt
 import random
@@ -22,12 +24,10 @@ query = """
     }
 """
 print datetime.now(),"Gathering Current UF Faculty from VIVO"
-data = vt.vivo_sparql_query(query) 
-print datetime.now(),"Current UF Faculty found = ",len(data["results"]["bindings"])
-print datetime.now(),"Load data structure with results"
 d = []
-for item in data["results"]["bindings"]:
+for item in vt.vivo_sparql_pages(query, page_size=2000):
     d.append(item["uri"]["value"])
+print datetime.now(),"Current UF Faculty found = ",len(d)
 print datetime.now(),"Select random sample"
 random.shuffle(d)
 print datetime.now(),"Show selected faculty by VIVO URI"
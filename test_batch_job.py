@@ -0,0 +1,107 @@
+"""
+    test_batch_job.py -- run a BatchJob of remove_uri and merge_uri on a
+    synthetic VIVO, kill it part way and show the resumed job does only the
+    items not done and gives the RDF of doing every item in one go.  Show
+    items are left not done while Entrez is down, with or without a PubMed
+    cache
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import os, tempfile
+from datetime import datetime
+
+print datetime.now(),"Start"
+[store, uris] = vivo_stand_in.synthetic_graph(50)
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+path = os.path.join(tempfile.mkdtemp(), "job.sqlite")
+
+pub_uris = uris['publication'][:40]
+srdf = "".join(vt.remove_uri(uri) for uri in pub_uris)
+
+calls = []
+def remove_until_killed(uri):
+    calls.append(uri)
+    if len(calls) > 25:
+        raise KeyboardInterrupt # the job dies
+    return vt.remove_uri(uri)
+
+job = vt.BatchJob(path, remove_until_killed, chunk_size=10)
+print datetime.now(), job.add(pub_uris), "items added"
+try:
+    job.run()
+except KeyboardInterrupt:
+    print datetime.now(), "killed", job.stats()
+job.close()
+
+calls = []
+job = vt.BatchJob(path, vt.remove_uri, chunk_size=10)
+print datetime.now(), job.add(pub_uris), "items added again"
+print datetime.now(), "resumed", job.run(pool=vt.WorkerPool(4))
+print datetime.now(), "same RDF", job.rdf() == ["", srdf]
+job.close()
+
+people = uris['person'][:10]
+pairs = [people[i:i+2] for i in range(0, len(people), 2)] + [["bad"]]
+job = vt.BatchJob(path + ".merge", vt.merge_uri)
+job.add(pairs)
+print datetime.now(), job.run(), job.failed()
+print datetime.now(), "same RDF", job.rdf()[0] == \
+    "".join(vt.merge_uri(*pair)[0] for pair in pairs[:-1])
+job.close()
+
+#   An update_pubmed job while Entrez is down leaves every item not done
+
+def entrez_down(doi, pmid=None):
+    raise vt.PubmedUnavailable("Entrez is down")
+def entrez_up(doi, pmid=None):
+    return {'pmid': "1", 'abstract': "Abstract of " + doi}
+vt.make_concept_dictionary()
+job = vt.BatchJob(path + ".pubmed", vt.update_pubmed, chunk_size=10,
+                  dictionaries=['concept_dictionary'])
+job.add(pub_uris)
+vt.get_pubmed_values = entrez_down
+print datetime.now(), "Entrez down", job.run(), job.failed()[0]
+vt.get_pubmed_values = entrez_up
+print datetime.now(), "Entrez up", job.run()
+print datetime.now(), "same RDF", job.rdf()[0] == \
+    "".join(vt.update_pubmed(uri)[0] for uri in pub_uris)
+job.close()
+
+#   With a PubMed cache holding some of the records, a job while Entrez is
+#   down leaves the items with records not in the cache not done, rather
+#   than done with no values.  Each item is a pair of PMIDs fetched together
+
+def abstracts_of(*pmids):
+    values = vt.get_pubmed_values_batch(pmids)
+    return ["".join(values[pmid].get('abstract', "") for pmid in pmids), ""]
+record = """<PubmedArticle><MedlineCitation><PMID>%s</PMID><Article>
+<Abstract><AbstractText>Abstract of %s</AbstractText></Abstract>
+</Article></MedlineCitation></PubmedArticle>"""
+pmids = [str(40000000 + i) for i in range(12)]
+vt.set_pubmed_cache(vt.PubmedCache(path + ".cache"))
+vt.pubmed_cache.put("", dict((pmid, record % (pmid, pmid))
+                             for pmid in pmids[:9]))
+vt.set_retry_policy(vt.RetryPolicy(retries=1, sleep=lambda seconds: None))
+vt.eutils_url = "http://localhost:1/entrez/eutils/" # Entrez is down
+job = vt.BatchJob(path + ".cached", abstracts_of)
+job.add([pmids[i:i+2] for i in range(0, len(pmids), 2)])
+print datetime.now(), "Entrez down, half cached", job.run(), \
+    job.failed()[0]
+print datetime.now(), "cached", list(job.results())
+job.close()
+vt.set_pubmed_cache(None)
+vt.set_retry_policy(vt.RetryPolicy())
+
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
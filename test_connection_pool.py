@@ -0,0 +1,30 @@
+"""
+    test_connection_pool.py -- issue a series of SPARQL queries through a
+    connection pool and show the keep-alive connections reused
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+pool = vt.ConnectionPool(maxsize=4, maxsize_per_host=2, idle_timeout=30.0)
+vt.set_connection_pool(pool)
+for uri in ["http://vivo.ufl.edu/individual/n25562",
+            "http://vivo.ufl.edu/individual/n39051",
+            "http://vivo.ufl.edu/individual/n8763427",
+            "http://vivo.ufl.edu/individual/n614029206"]:
+    triples = vt.get_triples(uri)
+    print datetime.now(), uri, len(triples["results"]["bindings"]), "triples"
+print "Idle connections", pool._idle
+pool.close()
+
+print datetime.now(),"Finish"
@@ -0,0 +1,36 @@
+"""
+    test_deref_pool.py -- get a person with publications and grants,
+    dereferencing one entity at a time and then concurrently with a pool of
+    workers.  Compare the results and the run times
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+uri = "http://vivo.ufl.edu/individual/n25562" # Mike Conlon
+person = vt.get_person(uri, get_publications=True, get_grants=True)
+print datetime.now(), "Sequential", len(person['publications']), \
+    "publications", len(person['grants']), "grants"
+
+vt.set_connection_pool(vt.ConnectionPool(maxsize=10, maxsize_per_host=8))
+pool = vt.WorkerPool(8)
+vt.set_deref_pool(pool)
+concurrent_person = vt.get_person(uri, get_publications=True,
+                                  get_grants=True)
+print datetime.now(), "Concurrent", len(concurrent_person['publications']), \
+    "publications", len(concurrent_person['grants']), "grants"
+print "Same person:", person == concurrent_person
+vt.set_deref_pool(None)
+pool.close(wait=True)
+
+print datetime.now(),"Finish"
@@ -0,0 +1,29 @@
+"""
+    test_disk_query_cache.py -- build the UFID dictionary twice using a disk
+    cache.  The second build is served from the cache
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+cache = vt.DiskQueryCache("test_disk_query_cache.sqlite", max_age=3600.0)
+vt.set_disk_cache(cache)
+for i in range(2):
+    ufid_dictionary = vt.make_ufid_dictionary()
+    print datetime.now(), "UFID dictionary has", len(ufid_dictionary), \
+        "entries", cache.stats()
+vt.set_disk_cache(None)
+cache.invalidate()
+cache.close()
+
+print datetime.now(),"Finish"
@@ -0,0 +1,32 @@
+"""
+    test_get_graph.py -- fetch the graph of a person in a few queries and
+    assemble the person from it.  Compare to the person assembled one query
+    per entity
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+uri = "http://vivo.ufl.edu/individual/n25562" # Mike Conlon
+graph = vt.get_graph([uri], 'person', {'get_publications': True})
+print datetime.now(), "Graph has", len(graph), "entities"
+
+person = vt.get_person(uri, get_publications=True, prefetch=True)
+print datetime.now(), "Prefetched person has", len(person['publications']), \
+    "publications"
+person_by_entity = vt.get_person(uri, get_publications=True)
+print datetime.now(), "Person by entity has", \
+    len(person_by_entity['publications']), "publications"
+print "Same person:", person == person_by_entity
+
+print datetime.now(),"Finish"
@@ -0,0 +1,36 @@
+"""
+    test_get_person_async.py -- start fetching several people at once and
+    collect the results as they finish
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+def show(future):
+    person = future.result()
+    print datetime.now(), person['person_uri'], person.get('display_name')
+
+uris = ["http://vivo.ufl.edu/individual/n25562",
+        "http://vivo.ufl.edu/individual/n39051",
+        "http://vivo.ufl.edu/individual/n1770144435"]
+futures = []
+for uri in uris:
+    future = vt.get_person_async(uri, get_positions=True)
+    future.add_done_callback(show)
+    futures.append(future)
+for future in futures:
+    future.result()
+print datetime.now(), "Triples", \
+    len(vt.get_triples_async(uris[0]).result()["results"]["bindings"])
+
+print datetime.now(),"Finish"
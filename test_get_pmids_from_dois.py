@@ -0,0 +1,25 @@
+"""
+    test_get_pmids_from_dois.py -- Given a list of DOIs, find the PMID of
+    each with a few batched Entrez requests
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+pmids = vt.get_pmids_from_dois(["10.1016/j.arcmed.2006.09.002",
+                                "unfindable",
+                                "10.1111/j.1365-2036.2010.04512.x"],
+                               chunk_size=2)
+for doi, pmid in sorted(pmids.items()):
+    print doi, pmid
+print datetime.now(), vt.network_metrics.snapshot().get('entrez')
+print datetime.now(),"Finish"
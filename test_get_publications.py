@@ -0,0 +1,37 @@
+"""
+    test_get_publications.py -- Given a list of publication URIs, return a
+    dictionary of the publications keyed by URI
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+publication_uris = ["http://vivo.ufl.edu/individual/n2592711416",
+                    "http://vivo.ufl.edu/individual/n5988333327",
+                    "http://vivo.ufl.edu/individual/n697590874"]
+publications = vt.get_publications(publication_uris, chunk_size=2)
+for uri in publication_uris:
+    print "\n", uri
+    print vt.string_from_document(publications[uri])
+
+grant_uris = ["http://vivo.ufl.edu/individual/n614029206"]
+grants = vt.get_grants(grant_uris, get_investigators=True)
+for uri in grant_uris:
+    print "\n", uri
+    print vt.string_from_grant(grants[uri])
+
+people = vt.get_people(["http://vivo.ufl.edu/individual/n25562"],
+                       get_positions=True)
+print "\n", people
+
+print datetime.now(),"Finish"
@@ -0,0 +1,23 @@
+"""
+    test_get_pubmed_values_batch.py -- Given a list of PMIDs, get the PubMed
+    values of each with batched EFetch requests
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+values = vt.get_pubmed_values_batch(["17223399", "20716208", "0"],
+                                    chunk_size=2)
+for pmid in sorted(values):
+    print pmid, values[pmid]
+print datetime.now(), vt.network_metrics.snapshot().get('entrez')
+print datetime.now(),"Finish"
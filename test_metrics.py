@@ -0,0 +1,35 @@
+"""
+    test_metrics.py -- run some getters against the local stand-in endpoint
+    and show the network metrics recorded, as JSON and in Prometheus format
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+from datetime import datetime
+
+print datetime.now(),"Start"
+store = vivo_stand_in.TripleStore()
+store.load("data_test_vivo.nt")
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+
+vt.network_metrics.reset()
+vt.get_person("http://vivo.ufl.edu/individual/n25562", get_publications=True,
+              get_grants=True)
+vt.make_ufid_dictionary()
+vt.set_deref_pool(vt.WorkerPool(4))
+vt.get_grant("http://vivo.ufl.edu/individual/n5002", get_investigators=True)
+print vt.network_metrics.to_json()
+print vt.network_metrics.to_prometheus()
+
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
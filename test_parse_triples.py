@@ -0,0 +1,35 @@
+"""
+    test_parse_triples.py -- Given triples, set the fields of an entity
+    using the predicate tables of the accessors
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+triples = {"results": {"bindings": [
+    {"p": {"type": "uri",
+           "value": "http://www.w3.org/2000/01/rdf-schema#label"},
+     "o": {"type": "literal", "value": "Department of Medicine"}},
+    {"p": {"type": "uri",
+           "value": "http://vivoweb.org/ontology/core#hasSubOrganization"},
+     "o": {"type": "uri",
+           "value": "http://vivo.ufl.edu/individual/n1234"}},
+    {"p": {"type": "uri",
+           "value": "http://vivoweb.org/ontology/core#hasSubOrganization"},
+     "o": {"type": "uri",
+           "value": "http://vivo.ufl.edu/individual/n5678"}}]}}
+organization = {'sub_organization_within_uris': [],
+                'has_sub_organization_uris': []}
+print vt.parse_triples(organization, triples, 'organization')
+
+print datetime.now(),"Finish"
@@ -0,0 +1,29 @@
+"""
+    test_pubmed_articles.py -- get PubMed articles with the streaming
+    extractor and show their documents match those made from the records of
+    Entrez.parse
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+from Bio import Entrez
+
+print datetime.now(),"Start"
+pmids = ["18068940", "18089571", "19206997", "21822356", "19247798"]
+Entrez.email = 'mconlon@ufl.edu'
+handle = Entrez.efetch(db="pubmed", id=",".join(pmids), retmode="xml")
+records = list(Entrez.parse(handle))
+for article, record in zip(vt.get_pubmed_records(pmids), records):
+    doc = vt.document_from_pubmed(article)
+    print "\n", doc == vt.document_from_pubmed(record), \
+        vt.string_from_document(doc)
+print datetime.now(), vt.get_pubmed_values_batch(pmids)
+print datetime.now(),"Finish"
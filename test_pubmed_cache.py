@@ -0,0 +1,29 @@
+"""
+    test_pubmed_cache.py -- get PubMed values and documents twice through a
+    PubmedCache and show the second time is served from the cache
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import os, tempfile
+from datetime import datetime
+
+print datetime.now(),"Start"
+path = os.path.join(tempfile.mkdtemp(), "pubmed.sqlite")
+vt.set_pubmed_cache(vt.PubmedCache(path, refresh_age=7*86400))
+pmids = ["18068940", "18089571", "19206997"]
+for i in range(2):
+    values = vt.get_pubmed_values_batch(pmids)
+    print datetime.now(), [values[pmid].get('pmcid') for pmid in pmids]
+    print datetime.now(), vt.pubmed_cache.stats()
+for record in vt.get_pubmed_records(pmids):
+    print "\n", vt.document_from_pubmed(record)
+print datetime.now(), vt.pubmed_cache.stats()
+print datetime.now(),"Finish"
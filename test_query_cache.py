@@ -0,0 +1,29 @@
+"""
+    test_query_cache.py -- repeat get_grant with a query cache and show the
+    cache hits and misses
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+cache = vt.QueryCache(maxsize=500, ttl=600.0)
+vt.set_query_cache(cache)
+for i in range(3):
+    grant = vt.get_grant("http://vivo.ufl.edu/individual/n614029206",
+                         get_investigators=True)
+    print datetime.now(), "Grant", i, cache.stats()
+cache.invalidate()
+print datetime.now(), "After invalidate", cache.stats()
+vt.set_query_cache(None)
+
+print datetime.now(),"Finish"
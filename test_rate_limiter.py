@@ -0,0 +1,34 @@
+"""
+    test_rate_limiter.py -- take tokens from a RateLimiter in several threads
+    at once and show the requests stay within the rate
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import threading, time
+from datetime import datetime
+
+print datetime.now(),"Start"
+for rate in [3.0, 10.0]:
+    limiter = vt.RateLimiter(rate)
+    times = []
+    def take():
+        for i in range(5):
+            limiter.acquire()
+            times.append(time.time())
+    threads = [threading.Thread(target=take) for i in range(4)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print datetime.now(), rate, "per second:", len(times), "requests in", \
+        round(time.time() - start, 2), "seconds"
+print datetime.now(),"Finish"
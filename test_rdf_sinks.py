@@ -0,0 +1,58 @@
+"""
+    test_rdf_sinks.py -- write the RDF of remove_uri, merge_uri and
+    update_pubmed_pipeline on a synthetic VIVO to an RDFFileWriter and show
+    the files are RDF documents holding the RDF the functions return
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import os, tempfile
+from xml.etree import cElementTree as ElementTree
+from datetime import datetime
+
+print datetime.now(),"Start"
+[store, uris] = vivo_stand_in.synthetic_graph(50)
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+vt.make_concept_dictionary()
+concepts = sorted(vt.concept_dictionary.keys())
+vt.get_pmids_from_dois = lambda dois: dict((doi, "1") for doi in dois)
+vt.get_pubmed_values_batch = lambda pmids: dict((pmid, {'pmid': pmid,
+    'abstract': "Abstract", 'keyword_list': concepts[:2]}) for pmid in pmids)
+
+directory = tempfile.mkdtemp()
+add_path = os.path.join(directory, "add.rdf")
+sub_path = os.path.join(directory, "sub.rdf")
+sink = vt.RDFFileWriter(add_path, sub_path)
+ardf = ""
+srdf = ""
+for uri in uris['publication'][:20]:
+    vt.remove_uri(uri, sink)
+    srdf = srdf + vt.remove_uri(uri)
+people = uris['person'][:10]
+for i in range(0, len(people), 2):
+    vt.merge_uri(people[i], people[i+1], sink)
+    [add, sub] = vt.merge_uri(people[i], people[i+1])
+    ardf = ardf + add
+    srdf = srdf + sub
+vt.update_pubmed_pipeline(uris['publication'], sink=sink)
+[add, sub] = vt.update_pubmed_pipeline(uris['publication'])
+ardf = ardf + add
+srdf = srdf + sub
+sink.close()
+print datetime.now(), sink.add_bytes, "add bytes", sink.sub_bytes, "sub bytes"
+for path, rdf in [[add_path, ardf], [sub_path, srdf]]:
+    text = open(path).read()
+    print datetime.now(), path, text == vt.rdf_header() + rdf + \
+        vt.rdf_footer(), len(ElementTree.parse(path).getroot()), "elements"
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
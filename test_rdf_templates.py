@@ -0,0 +1,32 @@
+"""
+    test_rdf_templates.py -- show the fast assert_resource_property makes the
+    RDF the tempita template made, for str, unicode, None and numeric values
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import tempita
+from datetime import datetime
+
+print datetime.now(),"Start"
+template = tempita.Template("""    <rdf:Description rdf:about="{{uri}}">
+        <{{resource_property}} rdf:resource="{{resource_uri}}"/>
+    </rdf:Description>
+""")
+for [uri, resource_property, resource_uri] in [
+    ["http://a.b", "vivo:authorInAuthorship", "http://c.d"],
+    [u"http://a.b", "vivo:hasSubjectArea", u"http://c.d/\xe9"],
+    ["http://a.b", "vivo:webpage", None],
+    ["http://a.b", "vivo:authorinauthorlist", 42]]:
+    rdf = vt.assert_resource_property(uri, resource_property, resource_uri)
+    print rdf == template.substitute(uri=uri,
+        resource_property=resource_property, resource_uri=resource_uri), \
+        type(rdf)
+print datetime.now(),"Finish"
@@ -0,0 +1,115 @@
+"""
+    test_retry_policy.py -- query a dead endpoint and show that the retry
+    policy gives up quickly and then fails fast while its circuit is open.
+    Show each job has a retry budget of its own and does not close open
+    circuits, that a call does not sleep once its circuit opens, and that an
+    endpoint that never answers times out
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import os, tempfile, threading, socket, time
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+vt.set_retry_policy(vt.RetryPolicy(retries=3, base=0.1, cap=1.0, budget=10,
+                                   failure_threshold=4, reset_timeout=60.0))
+query = "SELECT ?s WHERE { ?s ?p ?o } LIMIT 1"
+for i in range(5):
+    result = vt.vivo_sparql_query(query, baseURL="http://localhost:1/sparql")
+    print datetime.now(), i, result, vt.retry_policy.stats()
+
+def not_found():
+    raise vt.HTTPStatusError(404)
+try:
+    vt.retry_policy.call("example.org", not_found)
+except vt.HTTPStatusError, error:
+    print datetime.now(), "Not retried", error.status, \
+        vt.retry_policy.stats()
+
+#   Each job run has its own budget of 4 retries.  Every call of the flaky
+#   service fails, so the first item spends 3 retries and the second the
+#   last one, whether the jobs run one after another or at once
+
+def unavailable():
+    raise vt.HTTPStatusError(503)
+def flaky_job(path):
+    retries_used = []
+    def flaky(i):
+        try:
+            vt.retry_policy.call("flaky.example.org", unavailable)
+        except vt.HTTPStatusError:
+            pass
+        retries_used.append(vt.retry_policy.stats()['retries_used'])
+        return ["", ""]
+    job = vt.BatchJob(path, flaky)
+    job.add([1, 2, 3])
+    return [job, retries_used]
+
+vt.set_retry_policy(vt.RetryPolicy(retries=3, budget=4,
+    failure_threshold=100, sleep=lambda seconds: None))
+directory = tempfile.mkdtemp()
+for i in range(2):
+    [job, retries_used] = flaky_job(os.path.join(directory, "job%d.sqlite" % i))
+    job.run()
+    job.close()
+    print datetime.now(), "Job", i, "retries used after each item", \
+        retries_used
+jobs = [flaky_job(os.path.join(directory, "both%d.sqlite" % i))
+        for i in range(2)]
+threads = [threading.Thread(target=job.run) for [job, retries_used] in jobs]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+for i, [job, retries_used] in enumerate(jobs):
+    job.close()
+    print datetime.now(), "Job", i, "at once, retries used after each item", \
+        retries_used
+print datetime.now(), "Retries used outside the jobs", \
+    vt.retry_policy.stats()['retries_used']
+
+#   The failure that opens a circuit throws CircuitOpen at once, after one
+#   sleep before the one retry.  A job starting leaves the circuit open
+
+slept = []
+vt.set_retry_policy(vt.RetryPolicy(retries=3, failure_threshold=2,
+                                   sleep=slept.append))
+try:
+    vt.retry_policy.call("dead.example.org", unavailable)
+except vt.CircuitOpen, error:
+    print datetime.now(), "CircuitOpen", error, "after", len(slept), "sleep"
+[job, retries_used] = flaky_job(os.path.join(directory, "circuit.sqlite"))
+job.run()
+job.close()
+print datetime.now(), "Open circuits after the job", \
+    vt.retry_policy.stats()['open_circuits']
+print datetime.now(), "Default budget", vt.RetryPolicy().budget
+
+#   An endpoint that takes the connection and never answers times out, and
+#   the timeout is retried, rather than blocking the call for ever
+
+silent = socket.socket()
+silent.bind(("localhost", 0))
+silent.listen(5)
+url = "http://localhost:%d/sparql" % silent.getsockname()[1]
+print datetime.now(), "Default timeout", vt.sparql_connection_pool.timeout
+pool = vt.set_connection_pool(vt.ConnectionPool(timeout=0.5))
+vt.set_retry_policy(vt.RetryPolicy(retries=2, sleep=lambda seconds: None))
+start = time.time()
+result = vt.vivo_sparql_query(query, baseURL=url)
+print datetime.now(), "Silent endpoint", result, "after", \
+    round(time.time() - start, 1), "seconds"
+vt.sparql_connection_pool.close()
+vt.set_connection_pool(pool)
+silent.close()
+
+print datetime.now(),"Finish"
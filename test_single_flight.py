@@ -0,0 +1,27 @@
+"""
+    test_single_flight.py -- ask the same query many times at once and show
+    how many requests to VIVO were saved
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+futures = [vt.get_triples_async("http://vivo.ufl.edu/individual/n378789540")
+           for i in range(10)]
+for future in futures:
+    future.result()
+vt.async_pool.close(wait=True)
+vt.sparql_connection_pool.close()
+print datetime.now(), vt.sparql_single_flight.stats()
+
+print datetime.now(),"Finish"
@@ -0,0 +1,46 @@
+"""
+    test_trace.py -- record the queries of get_person against the local
+    stand-in endpoint to a trace, stop the endpoint, and replay the trace to
+    get the same person with no endpoint at all
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import os, tempfile
+from datetime import datetime
+
+print datetime.now(),"Start"
+store = vivo_stand_in.TripleStore()
+store.load("data_test_vivo.nt")
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+uri = "http://vivo.ufl.edu/individual/n25562"
+path = os.path.join(tempfile.mkdtemp(), "trace.json.gz")
+
+vt.set_trace(vt.Trace(path, 'record'))
+recorded = vt.get_person(uri, get_publications=True, get_grants=True)
+dictionary = list(vt.vivo_sparql_bindings("SELECT ?x WHERE {?x a foaf:Person}"))
+vt.network_trace.close()
+print datetime.now(), vt.network_trace.stats(), os.path.getsize(path), "bytes"
+
+vt.sparql_connection_pool.close()
+server.shutdown()
+server.server_close()
+
+vt.set_trace(vt.Trace(path, 'replay'))
+replayed = vt.get_person(uri, get_publications=True, get_grants=True)
+print datetime.now(), "Same person:", replayed == recorded
+print datetime.now(), "Same bindings:", dictionary == \
+    list(vt.vivo_sparql_bindings("SELECT ?x WHERE {?x a foaf:Person}"))
+print datetime.now(), "Not in trace:", vt.get_triples(
+    "http://vivo.ufl.edu/individual/n1")
+print datetime.now(), vt.network_trace.stats()
+print datetime.now(),"Finish"
@@ -0,0 +1,63 @@
+"""
+    test_update_pubmed_pipeline.py -- update the PubMed attributes of the
+    publications of a synthetic VIVO with update_pubmed_pipeline and show the
+    RDF is that of update_pubmed for each publication.  PubMed values are
+    synthetic, so the test does not use Entrez
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import time
+from datetime import datetime
+
+print datetime.now(),"Start"
+[store, uris] = vivo_stand_in.synthetic_graph(50)
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+vt.make_concept_dictionary()
+concepts = sorted(vt.concept_dictionary.keys())
+
+def pmid_of(doi):
+    return str(40000000 + int(doi.split(".")[-1]))
+
+def values_of(pmid):
+    i = int(pmid)
+    return {'pmid': pmid, 'abstract': "Abstract of " + pmid,
+            'keyword_list': [concepts[i % len(concepts)]],
+            'grants_cited': ["R01 CA%06d" % (i % 7)]}
+
+vt.get_pubmed_values = lambda doi, pmid=None: values_of(pmid_of(doi))
+vt.get_pmids_from_dois = lambda dois: dict((doi, pmid_of(doi))
+                                           for doi in dois)
+vt.get_pubmed_values_batch = lambda pmids: dict((pmid, values_of(pmid))
+                                                for pmid in pmids)
+
+pub_uris = uris['publication']
+start = time.time()
+ardf = ""
+srdf = ""
+for uri in pub_uris:
+    [add, sub] = vt.update_pubmed(uri)
+    ardf = ardf + add
+    srdf = srdf + sub
+print datetime.now(), len(pub_uris), "update_pubmed", \
+    round(time.time() - start, 2), "seconds"
+for workers in [1, 4]:
+    start = time.time()
+    result = vt.update_pubmed_pipeline(iter(pub_uris), chunk_size=20,
+                                       workers=workers)
+    print datetime.now(), "pipeline", workers, "workers", \
+        round(time.time() - start, 2), "seconds, same RDF", \
+        result == [ardf, srdf]
+print len(ardf), "add", len(srdf), "sub"
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
@@ -0,0 +1,33 @@
+"""
+    test_vivo_sparql_bindings.py -- issue a SPARQL query to VIVO and process
+    the bindings one at a time as they are read
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+from datetime import datetime
+
+print datetime.now(),"Start"
+
+query = """
+    SELECT ?x ?label WHERE
+    {
+    ?x rdf:type bibo:Journal .
+    ?x rdfs:label ?label .
+    }
+    """
+count = 0
+for binding in vt.vivo_sparql_bindings(query):
+    count = count + 1
+    if count <= 10:
+        print binding['x']['value'], binding['label']['value']
+print datetime.now(), "Journals found = ", count
+
+print datetime.now(),"Finish"
@@ -0,0 +1,65 @@
+"""
+    test_vivo_sparql_bindings_errors.py -- stream the bindings of a query of
+    a synthetic VIVO and show that a failed query and a response cut short
+    throw SparqlQueryError rather than generating too few bindings
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+from datetime import datetime
+
+print datetime.now(),"Start"
+[store, uris] = vivo_stand_in.synthetic_graph(100)
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+vt.set_retry_policy(vt.RetryPolicy(retries=1, base=0.1, cap=0.1))
+query = """
+    SELECT ?s ?label WHERE {
+    ?s rdfs:label ?label .
+    }"""
+print datetime.now(), len(list(vt.vivo_sparql_bindings(query))), "bindings"
+
+try:
+    list(vt.vivo_sparql_bindings(query, baseURL="http://localhost:1/sparql"))
+except vt.SparqlQueryError, error:
+    print datetime.now(), "SparqlQueryError", error
+
+#   The response ends after 4096 bytes.  The rest is read on close, so the
+#   stand-in is not left writing to a closed connection
+
+class CutShort(object):
+    def __init__(self, response, size):
+        self.response = response
+        self.status = response.status
+        self.size = size
+    def read(self, size):
+        data = self.response.read(min(size, self.size))
+        self.size = self.size - len(data)
+        return data
+    def close(self):
+        self.response.read()
+        self.response.close()
+
+urlopen = vt.sparql_connection_pool.urlopen
+vt.sparql_connection_pool.urlopen = \
+    lambda *args: CutShort(urlopen(*args), 4096)
+count = 0
+try:
+    for binding in vt.vivo_sparql_bindings(query, read_size=1024):
+        count = count + 1
+except vt.SparqlQueryError, error:
+    print datetime.now(), "SparqlQueryError after", count, "bindings", error
+vt.sparql_connection_pool.urlopen = urlopen
+
+vt.set_retry_policy(vt.RetryPolicy())
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
@@ -0,0 +1,68 @@
+"""
+    test_vivo_sparql_pages.py -- page a query of a synthetic VIVO and show
+    the pages hold all the bindings, a failed page throws SparqlQueryError,
+    a query selecting * needs order_by, and a generator closed early leaves
+    no threads behind
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+import threading, time
+from datetime import datetime
+
+print datetime.now(),"Start"
+[store, uris] = vivo_stand_in.synthetic_graph(100)
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+query = """
+    SELECT ?s ?label WHERE {
+    ?s rdfs:label ?label .
+    }"""
+everything = vt.vivo_sparql_query(query)["results"]["bindings"]
+paged = list(vt.vivo_sparql_pages(query, page_size=50))
+print datetime.now(), len(everything), "bindings,", len(paged), "paged"
+
+try:
+    list(vt.vivo_sparql_pages("SELECT * WHERE { ?s ?p ?o }", page_size=50))
+except ValueError, error:
+    print datetime.now(), "ValueError", error
+print datetime.now(), len(list(vt.vivo_sparql_pages(
+    "SELECT * WHERE { ?s rdfs:label ?o }", page_size=50, order_by="?s"))), \
+    "paged with order_by"
+
+def workers():
+    return len([thread for thread in threading.enumerate()
+        if getattr(getattr(thread, "_Thread__target", None), "__name__",
+        None) == "_work"])
+
+pages = vt.vivo_sparql_pages(query, page_size=10)
+print datetime.now(), pages.next()['s']['value'], "first binding"
+print datetime.now(), workers(), "worker threads paging"
+pages.close()
+time.sleep(0.5)
+print datetime.now(), workers(), "worker threads left"
+
+vivo_sparql_query = vt.vivo_sparql_query
+def fails_on_third_page(query, **kwargs):
+    if "OFFSET 100" in query:
+        raise IOError("connection reset")
+    return vivo_sparql_query(query, **kwargs)
+vt.vivo_sparql_query = fails_on_third_page
+try:
+    list(vt.vivo_sparql_pages(query, page_size=50))
+except vt.SparqlQueryError, error:
+    print datetime.now(), "SparqlQueryError", error
+vt.vivo_sparql_query = vivo_sparql_query
+time.sleep(0.5) # for the pages in flight
+
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
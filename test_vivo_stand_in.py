@@ -0,0 +1,56 @@
+"""
+    test_vivo_stand_in.py -- load the test graph into the local stand-in
+    SPARQL endpoint and run getters and dictionary builders against it with
+    no network
+
+    Version 0.1 MC 2026-10-18
+    --  Initial version.
+"""
+
+__author__      = "Michael Conlon"
+__copyright__   = "Copyright 2014, University of Florida"
+__license__     = "BSD 3-Clause license"
+__version__     = "0.1"
+
+import vivotools as vt
+import vivo_stand_in
+from datetime import datetime
+
+print datetime.now(),"Start"
+store = vivo_stand_in.TripleStore()
+print datetime.now(), store.load("data_test_vivo.nt"), "triples loaded"
+server = vivo_stand_in.serve(store)
+vt.set_sparql_endpoint(server.url)
+print datetime.now(), "Stand-in at", server.url
+
+print "\n", vt.get_person("http://vivo.ufl.edu/individual/n25562",
+    get_publications=True, get_grants=True, get_positions=True,
+    get_degrees=True)
+print "\n", vt.get_grant("http://vivo.ufl.edu/individual/n5002",
+                         get_investigators=True)
+print "\n", vt.make_ufid_dictionary()
+print vt.make_deptid_dictionary()
+print vt.make_doi_dictionary(page_size=1)
+print vt.make_concept_dictionary()
+print vt.make_date_dictionary()
+print vt.vivo_find(), vt.vivo_find(label="Springer")
+print vt.get_vivo_uri()
+print vt.update_data_property("http://vivo.ufl.edu/individual/n25562",
+    "core:primaryEmail", "mconlon@ufl.edu", "conlon@ufl.edu")
+
+[add, uri] = vt.make_concept_rdf("Linked Data")
+print datetime.now(), store.load_rdf(add), "triples added"
+print vt.make_concept_dictionary()
+print datetime.now(), server.queries, "queries answered"
+
+#   Queries answered on many request threads at once are all counted
+
+queries = server.queries
+pool = vt.WorkerPool(8)
+pool.map(lambda i: vt.vivo_sparql_query("SELECT ?s WHERE { ?s a "
+    "foaf:Person } LIMIT %d" % (i + 1)), range(200))
+pool.close()
+print datetime.now(), server.queries - queries, "of 200 queries counted"
+vt.sparql_connection_pool.close()
+server.shutdown()
+print datetime.now(),"Finish"
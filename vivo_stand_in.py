@@ -0,0 +1,799 @@
+#!/usr/bin/env/python
+""" vivo_stand_in.py -- A local stand-in for the VIVO SPARQL endpoint
+
+    An in-memory triple store, loaded from N-Triples or from RDF/XML as
+    written by vivotools, and a small HTTP SPARQL endpoint that answers
+    SELECT queries with the same JSON results format as VIVO.  Point
+    vivotools at it with set_sparql_endpoint to run and time the getters,
+    dictionary builders and update functions with no network:
+
+        store = TripleStore()
+        store.load("data_test_vivo.nt")
+        server = serve(store)
+        vt.set_sparql_endpoint(server.url)
+
+    The stand-in understands the SPARQL that vivotools writes: PREFIX,
+    SELECT with DISTINCT, * or COUNT, a WHERE block of triple patterns with
+    ; and , and the keyword a, VALUES, ORDER BY, LIMIT and OFFSET.  It does
+    no inference, so every type a query asks for must be in the fixture.
+"""
+
+__author__ = "Michael Conlon"
+__copyright__ = "Copyright 2014, University of Florida"
+__license__ = "BSD 3-Clause license"
+__version__ = "0.1"
+
+import re, json, threading, urlparse, random
+import BaseHTTPServer, SocketServer
+from xml.etree import cElementTree as ElementTree
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+class QueryError(Exception):
+    """
+    The stand-in does not understand the query
+    """
+    pass
+
+#   Terms are tuples, so they can be kept in sets and dictionaries:
+#   ('uri', value), ('bnode', label) and ('literal', value, lang, datatype)
+
+def uri(value):
+    return ('uri', value)
+
+def literal(value, lang=None, datatype=None):
+    return ('literal', value, lang, datatype)
+
+def binding(term):
+    """
+    Given a term, return its value in the SPARQL JSON results format
+    """
+    if term[0] == 'uri':
+        return {'type': 'uri', 'value': term[1]}
+    elif term[0] == 'bnode':
+        return {'type': 'bnode', 'value': term[1]}
+    elif term[3] is not None:
+        return {'type': 'typed-literal', 'datatype': term[3],
+                'value': term[1]}
+    elif term[2] is not None:
+        return {'type': 'literal', 'xml:lang': term[2], 'value': term[1]}
+    else:
+        return {'type': 'literal', 'value': term[1]}
+
+class TripleStore(object):
+    """
+    Triples indexed by subject, by predicate and object, and by object, so
+    a triple pattern with any of its subject, predicate or object bound is
+    answered without a scan.
+    """
+    def __init__(self):
+        self._spo = {}
+        self._pos = {}
+        self._osp = {}
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, s, p, o):
+        """
+        Add the triple s p o.  Return True if it was not already present
+        """
+        with self._lock:
+            objects = self._spo.setdefault(s, {}).setdefault(p, set())
+            if o in objects:
+                return False
+            objects.add(o)
+            self._pos.setdefault(p, {}).setdefault(o, set()).add(s)
+            self._osp.setdefault(o, {}).setdefault(s, set()).add(p)
+            self._size = self._size + 1
+            return True
+
+    def remove(self, s, p, o):
+        """
+        Remove the triple s p o.  Return True if it was present
+        """
+        with self._lock:
+            objects = self._spo.get(s, {}).get(p)
+            if objects is None or o not in objects:
+                return False
+            objects.discard(o)
+            self._pos[p][o].discard(s)
+            self._osp[o][s].discard(p)
+            self._size = self._size - 1
+            return True
+
+    def match(self, s=None, p=None, o=None):
+        """
+        Return a list of the triples matching s p o.  None matches any term
+        """
+        with self._lock:
+            if s is not None:
+                predicates = self._spo.get(s, {})
+                if p is not None:
+                    objects = predicates.get(p, ())
+                    if o is not None:
+                        return [(s, p, o)] if o in objects else []
+                    return [(s, p, x) for x in objects]
+                return [(s, x, y) for x in predicates
+                        for y in predicates[x] if o is None or y == o]
+            if p is not None:
+                objects = self._pos.get(p, {})
+                if o is not None:
+                    return [(x, p, o) for x in objects.get(o, ())]
+                return [(x, p, y) for y in objects for x in objects[y]]
+            if o is not None:
+                subjects = self._osp.get(o, {})
+                return [(x, y, o) for x in subjects for y in subjects[x]]
+            return [(x, y, z) for x in self._spo for y in self._spo[x]
+                    for z in self._spo[x][y]]
+
+    def load(self, path):
+        """
+        Load the triples in the file at path.  Files ending in .nt are
+        N-Triples, others RDF/XML.  Return the number of triples added
+        """
+        f = open(path)
+        try:
+            if path.endswith(".nt"):
+                return self.load_ntriples(f)
+            return self.load_rdf(f.read())
+        finally:
+            f.close()
+
+    def load_ntriples(self, lines):
+        """
+        Given an iterable of lines of N-Triples, add their triples.  Return
+        the number of triples added
+        """
+        count = 0
+        for line in lines:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            [s, p, o] = _ntriples_terms(_tokenize(_unicode(line)))
+            if self.add(s, p, o):
+                count = count + 1
+        return count
+
+    def load_rdf(self, text):
+        """
+        Given RDF/XML made of rdf:Description elements, such as the RDF
+        written by vivotools, add its triples.  An rdf:RDF header and footer
+        are added if missing.  Return the number of triples added
+        """
+        if "<rdf:RDF" not in text:
+            text = '<rdf:RDF xmlns:rdf="' + RDF + '" ' + \
+                " ".join('xmlns:%s="%s"' % (prefix, namespace)
+                for [prefix, namespace] in rdf_namespaces) + \
+                ">" + text + "</rdf:RDF>"
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        count = 0
+        for description in ElementTree.fromstring(text):
+            about = description.get("{" + RDF + "}about")
+            if about is None:
+                continue
+            s = uri(about)
+            for element in description:
+                p = uri(element.tag[1:].replace("}", "", 1))
+                resource = element.get("{" + RDF + "}resource")
+                if resource is not None:
+                    o = uri(resource)
+                else:
+                    o = literal(element.text or u"", element.get(XML_LANG),
+                                element.get("{" + RDF + "}datatype"))
+                if self.add(s, p, o):
+                    count = count + 1
+        return count
+
+    def query(self, text):
+        """
+        Given a SPARQL SELECT query, return its result in the SPARQL JSON
+        results format
+        """
+        return Query(text).run(self)
+
+#   Namespaces declared when loading RDF/XML without an rdf:RDF header, as
+#   in the rdf_header of vivotools
+
+rdf_namespaces = [
+    ["rdfs", "http://www.w3.org/2000/01/rdf-schema#"],
+    ["xsd", XSD],
+    ["owl", "http://www.w3.org/2002/07/owl#"],
+    ["swrl", "http://www.w3.org/2003/11/swrl#"],
+    ["swrlb", "http://www.w3.org/2003/11/swrlb#"],
+    ["vitro1", "http://vitro.mannlib.cornell.edu/ns/vitro/0.7#"],
+    ["bibo", "http://purl.org/ontology/bibo/"],
+    ["c4o", "http://purl.org/spar/c4o/"],
+    ["dcelem", "http://purl.org/dc/elements/1.1/"],
+    ["dcterms", "http://purl.org/dc/terms/"],
+    ["event", "http://purl.org/NET/c4dm/event.owl#"],
+    ["foaf", "http://xmlns.com/foaf/0.1/"],
+    ["fabio", "http://purl.org/spar/fabio/"],
+    ["geo", "http://aims.fao.org/aos/geopolitical.owl#"],
+    ["pvs", "http://vivoweb.org/ontology/provenance-support#"],
+    ["ero", "http://purl.obolibrary.org/obo/"],
+    ["scires", "http://vivoweb.org/ontology/scientific-research#"],
+    ["skos", "http://www.w3.org/2004/02/skos/core#"],
+    ["ufVivo", "http://vivo.ufl.edu/ontology/vivo-ufl/"],
+    ["vitro2", "http://vitro.mannlib.cornell.edu/ns/vitro/public#"],
+    ["core", "http://vivoweb.org/ontology/core#"],
+    ["vivo", "http://vivoweb.org/ontology/core#"]]
+
+_token = re.compile(r'''
+    (<[^>]*>)                               # IRI
+  | ("""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | ("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')   # string
+  | (@[A-Za-z]+(?:-[A-Za-z0-9]+)*)          # language tag
+  | (\^\^)
+  | ([?$][A-Za-z0-9_]+)                     # variable
+  | (_:[A-Za-z0-9_]+)                       # blank node
+  | ([A-Za-z][\w-]*(?:\.[\w-]+)*:(?:[\w-]+(?:\.[\w-]+)*)?|:[\w-]*)
+  | ([+-]?\d+(?:\.\d+)?)                    # number
+  | ([A-Za-z]+)                             # keyword
+  | ([{}().;,*])
+  | (\S)
+    ''', re.X | re.S)
+
+def _tokenize(text):
+    return [match.group(0) for match in _token.finditer(text)]
+
+_escape = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)', re.S)
+_escapes = {'t': u'\t', 'n': u'\n', 'r': u'\r', 'b': u'\b', 'f': u'\f'}
+
+def _unescape(text):
+    def replace(match):
+        e = match.group(1)
+        if e[0] in 'uU':
+            return unichr(int(e[1:], 16))
+        return _escapes.get(e, e)
+    return _escape.sub(replace, _unicode(text))
+
+def _string(token):
+    if token[0:3] in ('"""', "'''"):
+        return _unescape(token[3:-3])
+    return _unescape(token[1:-1])
+
+def _unicode(text):
+    if isinstance(text, str):
+        return text.decode('utf-8')
+    return text
+
+def _ntriples_terms(tokens):
+    """
+    Given the tokens of a line of N-Triples, return its three terms
+    """
+    terms = []
+    i = 0
+    while i < len(tokens) and tokens[i] != ".":
+        token = tokens[i]
+        i = i + 1
+        if token.startswith("<"):
+            terms.append(uri(_unescape(token[1:-1])))
+        elif token.startswith("_:"):
+            terms.append(('bnode', token[2:]))
+        elif token.startswith('"'):
+            lang = None
+            datatype = None
+            if i < len(tokens) and tokens[i].startswith("@"):
+                lang = tokens[i][1:]
+                i = i + 1
+            elif i + 1 < len(tokens) and tokens[i] == "^^":
+                datatype = _unescape(tokens[i+1][1:-1])
+                i = i + 2
+            terms.append(literal(_string(token), lang, datatype))
+        else:
+            break
+    if len(terms) != 3 or tokens[i:] != ["."]:
+        raise ValueError("Not an N-Triple: " + " ".join(tokens))
+    return terms
+
+class Query(object):
+    """
+    A parsed SPARQL SELECT query.  Patterns are lists of three terms or
+    variable names, where variable names start with ?
+    """
+    def __init__(self, text):
+        self.tokens = _tokenize(_unicode(text))
+        self.i = 0
+        self.prefixes = {}
+        self.distinct = False
+        self.variables = None   # None for *
+        self.count = None       # [variable or '*', name] for COUNT
+        self.patterns = []
+        self.values = None      # [variable, list of terms]
+        self.order_by = []      # [variable, descending]
+        self.limit = None
+        self.offset = 0
+        self._parse()
+
+    def _peek(self):
+        if self.i < len(self.tokens):
+            return self.tokens[self.i]
+        return None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.i = self.i + 1
+        return token
+
+    def _expect(self, expected):
+        token = self._next()
+        if token.upper() != expected:
+            raise QueryError("Expected " + expected + ", found " + token)
+
+    def _keyword(self, keyword):
+        token = self._peek()
+        if token is not None and token.upper() == keyword:
+            self.i = self.i + 1
+            return True
+        return False
+
+    def _parse(self):
+        while self._keyword("PREFIX"):
+            prefix = self._next()
+            namespace = self._next()
+            self.prefixes[prefix[:-1]] = namespace[1:-1]
+        self._expect("SELECT")
+        self.distinct = self._keyword("DISTINCT")
+        self._keyword("REDUCED")
+        if self._keyword("*"):
+            pass
+        elif self._peek() is not None and \
+                self._peek().upper() in ("COUNT", "("):
+            self._parse_count()
+        else:
+            self.variables = []
+            while self._peek() is not None and self._peek()[0] in "?$":
+                self.variables.append(self._next()[1:])
+        self._keyword("WHERE")
+        self._parse_group()
+        while self._peek() is not None:
+            if self._keyword("ORDER"):
+                self._expect("BY")
+                self._parse_order_by()
+            elif self._keyword("LIMIT"):
+                self.limit = int(self._next())
+            elif self._keyword("OFFSET"):
+                self.offset = int(self._next())
+            else:
+                raise QueryError("Unexpected " + self._peek())
+
+    def _parse_count(self):
+        parenthesized = self._keyword("(")
+        self._expect("COUNT")
+        self._expect("(")
+        self._keyword("DISTINCT")
+        counted = self._next()
+        self._expect(")")
+        name = ".1"
+        if self._keyword("AS"):
+            name = self._next()[1:]
+        if parenthesized:
+            self._expect(")")
+        self.count = [counted if counted == "*" else counted[1:], name]
+
+    def _parse_order_by(self):
+        while self._peek() is not None:
+            token = self._peek().upper()
+            if token in ("ASC", "DESC"):
+                self.i = self.i + 1
+                self._expect("(")
+                self.order_by.append([self._next()[1:], token == "DESC"])
+                self._expect(")")
+            elif token[0] in "?$":
+                self.order_by.append([self._next()[1:], False])
+            else:
+                break
+
+    def _parse_group(self):
+        self._expect("{")
+        while not self._keyword("}"):
+            if self._keyword("VALUES"):
+                variable = self._next()[1:]
+                self._expect("{")
+                terms = []
+                while not self._keyword("}"):
+                    terms.append(self._term())
+                self.values = [variable, terms]
+            elif self._keyword("."):
+                pass
+            else:
+                self._parse_triples()
+
+    def _parse_triples(self):
+        s = self._term()
+        while True:
+            p = self._term(predicate=True)
+            while True:
+                self.patterns.append([s, p, self._term()])
+                if not self._keyword(","):
+                    break
+            if not self._keyword(";"):
+                break
+            if self._peek() in (".", "}"):
+                break
+
+    def _term(self, predicate=False):
+        """
+        Return the next term of the query, or the name of a variable
+        """
+        token = self._next()
+        if token[0] in "?$":
+            return "?" + token[1:]
+        if token.startswith("<"):
+            return uri(token[1:-1])
+        if token == "a" and predicate:
+            return uri(RDF + "type")
+        if token.startswith("_:"):
+            return ('bnode', token[2:])
+        if token[0] in "\"'":
+            value = _string(token)
+            lang = None
+            datatype = None
+            if self._peek() is not None and self._peek().startswith("@"):
+                lang = self._next()[1:]
+            elif self._keyword("^^"):
+                datatype = self._term()[1]
+            return literal(value, lang, datatype)
+        if re.match(r'[+-]?\d', token):
+            if "." in token:
+                return literal(token, datatype=XSD + "decimal")
+            return literal(token, datatype=XSD + "integer")
+        if ":" in token:
+            [prefix, local] = token.split(":", 1)
+            if prefix not in self.prefixes:
+                raise QueryError("Unknown prefix " + prefix)
+            return uri(self.prefixes[prefix] + local)
+        raise QueryError("Unexpected " + token)
+
+    def solutions(self, store):
+        """
+        Return a list of the solutions of the WHERE block, each a dictionary
+        of variable name (with ?) to term.  Patterns are joined one at a
+        time, the pattern with the most bound terms first
+        """
+        if self.values is None:
+            solutions = [{}]
+        else:
+            solutions = [{"?" + self.values[0]: term}
+                         for term in self.values[1]]
+        patterns = list(self.patterns)
+        bound = set(solutions[0].keys()) if solutions else set()
+        while patterns and solutions:
+            def unbound(pattern):
+                return len([t for t in pattern
+                            if isinstance(t, basestring) and t not in bound])
+            pattern = min(patterns, key=unbound)
+            patterns.remove(pattern)
+            joined = []
+            for solution in solutions:
+                terms = [solution.get(t) if isinstance(t, basestring) else t
+                         for t in pattern]
+                for triple in store.match(*terms):
+                    extended = dict(solution)
+                    for [t, value] in zip(pattern, triple):
+                        if isinstance(t, basestring):
+                            if extended.setdefault(t, value) != value:
+                                break   # same variable twice, no match
+                    else:
+                        joined.append(extended)
+            solutions = joined
+            bound.update(t for t in pattern if isinstance(t, basestring))
+        return solutions
+
+    def run(self, store):
+        """
+        Return the result of the query on the store in the SPARQL JSON
+        results format
+        """
+        solutions = self.solutions(store)
+        if self.count is not None:
+            [counted, name] = self.count
+            if counted == "*":
+                n = len(solutions)
+            else:
+                n = len([s for s in solutions if "?" + counted in s])
+            return {'head': {'vars': [name]},
+                    'results': {'bindings': [{name: binding(
+                        literal(str(n), datatype=XSD + "integer"))}]}}
+        variables = self.variables
+        if variables is None:
+            variables = []
+            for pattern in self.patterns:
+                for t in pattern:
+                    if isinstance(t, basestring) and t[1:] not in variables:
+                        variables.append(t[1:])
+        for [variable, descending] in reversed(self.order_by):
+            solutions.sort(key=lambda s: _sort_key(s.get("?" + variable)),
+                           reverse=descending)
+        rows = []
+        seen = set()
+        for solution in solutions:
+            row = tuple(solution.get("?" + v) for v in variables)
+            if self.distinct:
+                if row in seen:
+                    continue
+                seen.add(row)
+            rows.append(row)
+        if self.limit is None:
+            rows = rows[self.offset:]
+        else:
+            rows = rows[self.offset:self.offset + self.limit]
+        bindings = []
+        for row in rows:
+            bindings.append(dict((v, binding(t))
+                                 for [v, t] in zip(variables, row)
+                                 if t is not None))
+        return {'head': {'vars': variables},
+                'results': {'bindings': bindings}}
+
+def _sort_key(term):
+    """
+    Order terms as SPARQL does: unbound, blank nodes, URIs, then literals
+    """
+    if term is None:
+        return (0, u"")
+    if term[0] == 'bnode':
+        return (1, term[1])
+    if term[0] == 'uri':
+        return (2, term[1])
+    if term[3] in (XSD + "integer", XSD + "decimal", XSD + "int",
+                   XSD + "float", XSD + "double"):
+        try:
+            return (3, float(term[1]))
+        except ValueError:
+            pass
+    return (4, term[1])
+
+def synthetic_graph(people=100, publications=None, grants=None,
+                    authors_per_publication=3, investigators_per_grant=3,
+                    departments=None, seed=0, store=None):
+    """
+    Add to store (a new TripleStore if None) a synthetic VIVO graph of
+    people with positions, degrees and home departments, publications
+    with authorships, journals, concepts and dates, and grants with
+    investigator roles and date intervals.  publications defaults to two per
+    person, grants to one per two people and departments to one per ten
+    people.  The same seed makes the same graph.
+
+    Return the store and a dictionary of lists of the URIs made, by kind
+    """
+    rng = random.Random(seed)
+    if store is None:
+        store = TripleStore()
+    if publications is None:
+        publications = 2 * people
+    if grants is None:
+        grants = max(1, people / 2)
+    if departments is None:
+        departments = max(1, people / 10)
+    uris = dict((kind, []) for kind in ['person', 'organization',
+        'publication', 'grant', 'journal', 'concept', 'publisher',
+        'datetime_value'])
+    counter = [0]
+    core = "http://vivoweb.org/ontology/core#"
+    ufv = "http://vivo.ufl.edu/ontology/vivo-ufl/"
+    bibo = "http://purl.org/ontology/bibo/"
+    foaf = "http://xmlns.com/foaf/0.1/"
+    label = "http://www.w3.org/2000/01/rdf-schema#label"
+    rdf_type = RDF + "type"
+    words = ["Clinical", "Translational", "Genomic", "Network", "Semantic",
+             "Health", "Science", "Data", "Informatics", "Research",
+             "Outcomes", "Methods", "Biology", "Analysis", "Systems"]
+
+    def new(kind=None):
+        counter[0] = counter[0] + 1
+        node = uri("http://vivo.ufl.edu/individual/n%d" % (counter[0]))
+        if kind is not None:
+            uris[kind].append(node[1])
+        return node
+
+    def add(s, p, o):
+        if not isinstance(o, tuple):
+            o = literal(unicode(o))
+        store.add(s, uri(p), o)
+
+    def phrase(n):
+        return " ".join(rng.choice(words) for i in range(n))
+
+    def date_value(year, precision="yearMonthDayPrecision"):
+        node = new('datetime_value')
+        add(node, rdf_type, uri(core + "DateTimeValue"))
+        add(node, core + "dateTime", literal("%d-%02d-%02dT00:00:00" %
+            (year, rng.randint(1, 12), rng.randint(1, 28)),
+            datatype=XSD + "dateTime"))
+        add(node, core + "dateTimePrecision", uri(core + precision))
+        return node
+
+    def interval(year):
+        node = new()
+        add(node, rdf_type, uri(core + "DateTimeInterval"))
+        add(node, core + "start", date_value(year))
+        add(node, core + "end", date_value(year + rng.randint(1, 5)))
+        return node
+
+    university = new('organization')
+    add(university, rdf_type, uri(foaf + "Organization"))
+    add(university, label, "University of Florida")
+    for i in range(departments):
+        department = new('organization')
+        add(department, rdf_type, uri(foaf + "Organization"))
+        add(department, label, "Department of " + phrase(2))
+        add(department, ufv + "deptID", "%08d" % (10000000 + i))
+        add(department, core + "subOrganizationWithin", university)
+        add(university, core + "hasSubOrganization", department)
+    for i in range(max(1, publications / 20)):
+        journal = new('journal')
+        add(journal, rdf_type, uri(bibo + "Journal"))
+        add(journal, label, "Journal of " + phrase(2))
+        add(journal, bibo + "issn", "%04d-%04d" % (1000 + i, i))
+        publisher = new('publisher')
+        add(publisher, rdf_type, uri(core + "Publisher"))
+        add(publisher, label, phrase(1) + " Press " + str(i))
+    for i in range(max(1, publications / 10)):
+        concept = new('concept')
+        add(concept, rdf_type,
+            uri("http://www.w3.org/2004/02/skos/core#Concept"))
+        add(concept, label, phrase(2) + " " + str(i))
+
+    for i in range(people):
+        person = new('person')
+        first = rng.choice(["Ann", "Bob", "Carla", "Dev", "Eve", "Femi"])
+        last = "Person%d" % i
+        add(person, rdf_type, uri(foaf + "Person"))
+        add(person, label, last + ", " + first)
+        add(person, foaf + "firstName", first)
+        add(person, foaf + "lastName", last)
+        add(person, core + "primaryEmail", last.lower() + "@ufl.edu")
+        add(person, ufv + "ufid", "%08d" % (20000000 + i))
+        department = uri(rng.choice(uris['organization'][1:] or
+                                    uris['organization']))
+        add(person, ufv + "homeDept", department)
+        position = new()
+        add(person, core + "personInPosition", position)
+        add(position, rdf_type, uri(core + "FacultyPosition"))
+        add(position, label, "Professor of " + phrase(1))
+        add(position, core + "hrJobTitle", "PROFESSOR")
+        add(position, core + "positionForPerson", person)
+        add(position, core + "positionInOrganization", department)
+        add(position, core + "dateTimeInterval",
+            interval(rng.randint(1990, 2010)))
+        degree = new()
+        add(person, core + "educationalTraining", degree)
+        add(degree, rdf_type, uri(core + "EducationalTraining"))
+        add(degree, core + "majorField", phrase(1))
+        add(degree, core + "trainingAtOrganization", university)
+
+    for i in range(publications):
+        publication = new('publication')
+        add(publication, rdf_type, uri(bibo + "AcademicArticle"))
+        add(publication, rdf_type, uri(bibo + "Document"))
+        add(publication, label, phrase(6))
+        add(publication, bibo + "doi", "10.1000/synthetic.%d" % i)
+        add(publication, bibo + "pmid", str(30000000 + i))
+        add(publication, bibo + "volume", str(rng.randint(1, 40)))
+        add(publication, bibo + "pageStart", "1")
+        add(publication, bibo + "pageEnd", str(rng.randint(2, 20)))
+        add(publication, core + "hasPublicationVenue",
+            uri(rng.choice(uris['journal'])))
+        add(publication, core + "hasSubjectArea",
+            uri(rng.choice(uris['concept'])))
+        add(publication, core + "dateTimeValue",
+            date_value(rng.randint(1990, 2014), "yearMonthPrecision"))
+        authors = rng.sample(uris['person'],
+                             min(authors_per_publication, people))
+        for rank, author in enumerate(authors):
+            authorship = new()
+            add(authorship, rdf_type, uri(core + "Authorship"))
+            add(authorship, core + "authorRank",
+                literal(str(rank + 1), datatype=XSD + "int"))
+            add(authorship, core + "linkedAuthor", uri(author))
+            add(authorship, core + "linkedInformationResource", publication)
+            add(uri(author), core + "authorInAuthorship", authorship)
+            add(publication, core + "informationResourceInAuthorship",
+                authorship)
+
+    roles = [[core + "PrincipalInvestigatorRole",
+              "principalInvestigatorRoleOf", "hasPrincipalInvestigatorRole"],
+             [core + "InvestigatorRole",
+              "investigatorRoleOf", "hasInvestigatorRole"]]
+    for i in range(grants):
+        grant = new('grant')
+        add(grant, rdf_type, uri(core + "Grant"))
+        add(grant, label, phrase(5))
+        add(grant, core + "sponsorAwardId", "R01%06d" % i)
+        add(grant, core + "totalAwardAmount", literal(
+            str(rng.randint(10, 5000) * 1000), datatype=XSD + "float"))
+        add(grant, core + "administeredBy",
+            uri(rng.choice(uris['organization'])))
+        add(grant, core + "grantAwardedBy", university)
+        add(grant, core + "dateTimeInterval",
+            interval(rng.randint(2000, 2012)))
+        investigators = rng.sample(uris['person'],
+                                   min(investigators_per_grant, people))
+        for j, investigator in enumerate(investigators):
+            [role_type, role_of, has_role] = roles[min(j, 1)]
+            role = new()
+            add(role, rdf_type, uri(role_type))
+            add(role, core + role_of, uri(investigator))
+            add(role, core + "roleContributesTo", grant)
+            add(uri(investigator), core + has_role, role)
+            add(grant, core + "contributingRole", role)
+    return [store, uris]
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Answer GET and form POST requests carrying a query parameter, as the
+    VIVO SPARQL endpoint does.  Connections are kept alive.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._answer(urlparse.urlsplit(self.path).query)
+
+    def do_POST(self):
+        length = int(self.headers.getheader('content-length') or 0)
+        self._answer(self.rfile.read(length))
+
+    def _answer(self, form):
+        params = urlparse.parse_qs(form)
+        if 'query' not in params:
+            self._send(400, "No query")
+            return
+        try:
+            result = self.server.store.query(params['query'][0])
+        except QueryError, error:
+            self._send(400, str(error))
+            return
+        self.server.count_query()
+        self._send(200, json.dumps(result),
+                   "application/sparql-results+json")
+
+    def _send(self, status, body, content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    A threaded HTTP SPARQL endpoint for a TripleStore.  url is the URL to
+    give to set_sparql_endpoint.  queries counts the queries answered, by
+    all the request threads
+    """
+    daemon_threads = True
+
+    def __init__(self, store, host="localhost", port=0):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port), StandInHandler)
+        self.store = store
+        self.queries = 0
+        self.url = "http://%s:%d/VIVO/sparql" % (host, self.server_port)
+        self._lock = threading.Lock()
+
+    def count_query(self):
+        with self._lock:
+            self.queries = self.queries + 1
+
+def serve(store, host="localhost", port=0):
+    """
+    Given a TripleStore, start a StandInServer for it in a background thread
+    and return the server.  Port 0 picks a free port.  Call shutdown on the
+    server to stop it
+    """
+    server = StandInServer(store, host, port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -7,7 +7,7 @@
 __author__ = "Michael Conlon"
 __copyright__ = "Copyright 2014, University of Florida"
 __license__ = "BSD 3-Clause license"
-__version__ = "1.59"
+__version__ = "1.84"
 
 concept_dictionary = {}
 
@@ -15,8 +15,11 @@ import urllib, urllib2, json, random
 import string
 from datetime import datetime, date
 import time
-from xml.dom.minidom import parseString
+from xml.etree import cElementTree as ElementTree
+from xml.sax.saxutils import escape
 import sys, httplib
+import socket, threading, urlparse, collections
+import sqlite3, zlib, hashlib, codecs, re, Queue, cStringIO, gzip
 import tempita
 import csv
 from Bio import Entrez
@@ -28,6 +31,39 @@ class UnknownDateTimePrecision(Exception):
     """
     pass
 
+class SparqlQueryError(Exception):
+    """
+    Functions that must have a complete result, such as vivo_sparql_bindings
+    and vivo_sparql_pages, will throw this exception if a query to VIVO
+    fails.
+    """
+    pass
+
+class HTTPStatusError(Exception):
+    """
+    A network call got a response with an HTTP error status.  status holds
+    the status code.
+    """
+    def __init__(self, status, url=None):
+        Exception.__init__(self, status, url)
+        self.status = status
+        self.url = url
+
+class CircuitOpen(Exception):
+    """
+    RetryPolicy throws this exception, without making the call, while the
+    circuit for a service is open.
+    """
+    pass
+
+class PubmedUnavailable(Exception):
+    """
+    Functions getting values from PubMed, such as get_pubmed_values and
+    update_pubmed, throw this exception if Entrez does not answer, so a
+    paper that could not be looked up is not taken for one not in PubMed.
+    """
+    pass
+
 def repair_phone_number(phone, debug=False):
     """
     Given an arbitrary string that attempts to represent a phone number,
@@ -236,6 +272,30 @@ def hr_abbrev_to_words(s):
     t = t.replace(" #", "-") # restore -
     return t[:-1] # Take off the trailing space
 
+#   The hottest RDF emitters, assert_data_property and
+#   assert_resource_property, format with % rather than tempita
+
+_data_property_rdf = """    <rdf:Description rdf:about="%s">
+        <%s%s>%s</%s>
+    </rdf:Description>
+"""
+
+_resource_property_rdf = """    <rdf:Description rdf:about="%s">
+        <%s rdf:resource="%s"/>
+    </rdf:Description>
+"""
+
+def _template_text(value):
+    """
+    Return value as tempita substitutes it in a template:  None is empty and
+    unicode is UTF-8 encoded
+    """
+    if value is None:
+        return ""
+    elif isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
 def assert_data_property(uri, data_property, value):
     """
     Given a uri, a data_property name, and a value, generate rdf to assert
@@ -248,21 +308,17 @@ def assert_data_property(uri, data_property, value):
     Note:
     This function does not check that the data property name is valid
     """
-    from xml.sax.saxutils import escape
+    attributes = ""
     if isinstance(value, dict):
         val = escape(value['value'])
+        if 'xml:lang' in value:
+            attributes = ' xml:lang="' + value['xml:lang'] + '"'
+        if 'datatype' in value:
+            attributes = attributes + ' datatype="' + value['datatype'] + '"'
     else:
         val = escape(value)
-
-    rdf = '    <rdf:Description rdf:about="' + uri + '">'
-    rdf = rdf + '\n        <' + data_property
-    if isinstance(value, dict) and 'xml:lang' in value:
-        rdf = rdf + ' xml:lang="' + value['xml:lang'] + '"'
-    if isinstance(value, dict) and 'datatype' in value:
-        rdf = rdf + ' datatype="' + value['datatype'] + '"'
-    rdf = rdf + '>' + val + '</' + data_property + '>'
-    rdf = rdf + '\n    </rdf:Description>\n'
-    return rdf
+    return _data_property_rdf % (uri, data_property, attributes, val,
+                                 data_property)
 
 def assert_resource_property(uri, resource_property, resource_uri):
     """
@@ -275,14 +331,8 @@ def assert_resource_property(uri, resource_property, resource_uri):
     This is often called in invertable pairs -- each uri has the other as
     a resource. Example: homeDept and homeDeptFor
     """
-    resource_property_template = tempita.Template(
-    """    <rdf:Description rdf:about="{{uri}}">
-        <{{resource_property}} rdf:resource="{{resource_uri}}"/>
-    </rdf:Description>
-""")
-    rdf = resource_property_template.substitute(uri=uri, \
-        resource_property=resource_property, resource_uri=resource_uri)
-    return rdf
+    return _resource_property_rdf % (_template_text(uri),
+        _template_text(resource_property), _template_text(resource_uri))
 
 def update_data_property(uri, data_property, vivo_value, source_value):
     """
@@ -411,6 +461,7 @@ def untag_predicate(p):
     ns = {
     "rdf:":"http://www.w3.org/1999/02/22-rdf-syntax-ns#",
     "vivo:":"http://vivoweb.org/ontology/core#",
+    "core:":"http://vivoweb.org/ontology/core#",
     "ufVivo:":"http://vivo.ufl.edu/ontology/vivo-ufl/",
     "rdfs:":"http://www.w3.org/2000/01/rdf-schema#",
     "foaf:":"http://xmlns.com/foaf/0.1/",
@@ -439,14 +490,19 @@ def untag_predicate(p):
     else:
         return None
 
-def merge_uri(from_uri, to_uri):
+def merge_uri(from_uri, to_uri, sink=None):
     """
     Given a from URI and to URI, generate the add and subtract RDF to merge
     all the triples from the from_uri to the to_uri.
 
     Merge does not allow values of from_uri to be applied to to_uri if the
     predicate is single valued.  This could result in loss of information.
+
+    With a sink, such as an RDFFileWriter, the RDF is written to the sink as
+    it is made and the sink is returned.
     """
+    if sink is None:
+        return merge_uri(from_uri, to_uri, RDFBuffer()).rdf()
 
     single_valued_predicates = [
         "rdfs:label",
@@ -455,10 +511,8 @@ def merge_uri(from_uri, to_uri):
         "foaf:lastName",
         "bibo:middlename"
         ]
-    srdf = ""
-    ardf = ""
     if from_uri == to_uri:
-        return [ardf, srdf]
+        return sink
 
     # merge triples
 
@@ -466,6 +520,7 @@ def merge_uri(from_uri, to_uri):
     for triple in triples:
         p = translate_predicate(triple["p"]["value"])
         o = triple["o"]
+        add = ""
         if o["type"] == "uri":
             sub = assert_resource_property(from_uri, p, o["value"])
             if p not in single_valued_predicates:
@@ -474,8 +529,8 @@ def merge_uri(from_uri, to_uri):
             sub = assert_data_property(from_uri, p, o)
             if p not in single_valued_predicates:
                 add = assert_data_property(to_uri, p, o)
-        srdf = srdf + sub
-        ardf = ardf + add
+        sink.sub(sub)
+        sink.add(add)
 
     # merge references
 
@@ -484,17 +539,21 @@ def merge_uri(from_uri, to_uri):
         s = triple["s"]["value"]
         p = translate_predicate(triple["p"]["value"])
         [add, sub] = update_resource_property(s, p, from_uri, to_uri)
-        srdf = srdf + sub
-        ardf = ardf + add
+        sink.sub(sub)
+        sink.add(add)
 
-    return [ardf, srdf]
+    return sink
 
-def remove_uri(uri):
+def remove_uri(uri, sink=None):
     """
     Given a URI, generate subtraction URI to remove all triples containing
-    the URI as either a subject or object
+    the URI as either a subject or object.
+
+    With a sink, such as an RDFFileWriter, the RDF is written to the sink as
+    it is made and the sink is returned.
     """
-    srdf = ""
+    if sink is None:
+        return remove_uri(uri, RDFBuffer()).rdf()[1]
 
     # Remove triples
 
@@ -506,7 +565,7 @@ def remove_uri(uri):
             [add, sub] = update_resource_property(uri, p, o["value"], None)
         else:
             [add, sub] = update_data_property(uri, p, o, None)
-        srdf = srdf + sub
+        sink.sub(sub)
 
     # Remove references
 
@@ -515,8 +574,8 @@ def remove_uri(uri):
         s = triple["s"]["value"]
         p = translate_predicate(triple["p"]["value"])
         [add, sub] = update_resource_property(s, p, uri, None)
-        srdf = srdf + sub
-    return srdf
+        sink.sub(sub)
+    return sink
 
 
 def make_datetime_interval_rdf(start_date, end_date):
@@ -531,12 +590,7 @@ def make_datetime_interval_rdf(start_date, end_date):
     rdf = start_date_rdf + end_date_rdf + datetime_interval_rdf
     return [rdf, datetime_interval_uri]
 
-def make_datetime_rdf(datetime, precision="yearMonthDay"):
-    """
-    Given a datetime string in isoformat, create the RDF for a datetime object
-    """
-    datetime_template = tempita.Template(
-    """
+_datetime_template = tempita.Template("""
     <rdf:Description rdf:about="{{datetime_uri}}">
         <rdf:type rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
         <rdf:type rdf:resource="http://vivoweb.org/ontology/core#DateTimeValue"/>
@@ -544,6 +598,11 @@ def make_datetime_rdf(datetime, precision="yearMonthDay"):
         <core:dateTime>{{datetime}}</core:dateTime>
     </rdf:Description>
     """)
+
+def make_datetime_rdf(datetime, precision="yearMonthDay"):
+    """
+    Given a datetime string in isoformat, create the RDF for a datetime object
+    """
     if datetime == "" or datetime is None:
         datetime_uri = None
         rdf = ""
@@ -552,13 +611,13 @@ def make_datetime_rdf(datetime, precision="yearMonthDay"):
             precision == "yearMonthDay":
             datetime = datetime[0:datetime.index('T')]+"T00:00:00"
             datetime_uri = get_vivo_uri()
-            rdf = datetime_template.substitute(datetime_uri=datetime_uri,
+            rdf = _datetime_template.substitute(datetime_uri=datetime_uri,
                                                datetime=datetime,
                                                precision=precision)
         elif precision == "yearMonthDayTime":
             print datetime
             datetime_uri = get_vivo_uri()
-            rdf = datetime_template.substitute(datetime_uri=datetime_uri,
+            rdf = _datetime_template.substitute(datetime_uri=datetime_uri,
                                                datetime=datetime,
                                                precision=precision)
         else:
@@ -566,12 +625,7 @@ def make_datetime_rdf(datetime, precision="yearMonthDay"):
             raise UnknownDateTimePrecision(precision)
     return [rdf, datetime_uri]
 
-def make_dt_interval_rdf(start_uri, end_uri):
-    """
-    Given a start and end uri, return the rdf for a datetime interval with the
-    given start and end uris. Either may be empty.
-    """
-    dt_interval_template = tempita.Template("""
+_dt_interval_template = tempita.Template("""
     <rdf:Description rdf:about="{{interval_uri}}">
         <rdf:type rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
         <rdf:type rdf:resource="http://vivoweb.org/ontology/core#DateTimeInterval"/>
@@ -583,13 +637,19 @@ def make_dt_interval_rdf(start_uri, end_uri):
         {{endif}}
     </rdf:Description>
     """)
+
+def make_dt_interval_rdf(start_uri, end_uri):
+    """
+    Given a start and end uri, return the rdf for a datetime interval with the
+    given start and end uris. Either may be empty.
+    """
     if (start_uri == "" or start_uri is None) and \
         (end_uri == "" or end_uri is None):
         rdf = ""
         interval_uri = None
     else:
         interval_uri = get_vivo_uri()
-        rdf = dt_interval_template.substitute(interval_uri=interval_uri,
+        rdf = _dt_interval_template.substitute(interval_uri=interval_uri,
                                               start_uri=start_uri,
                                               end_uri=end_uri)
     return [rdf, interval_uri]
@@ -688,36 +748,449 @@ def get_pmid_from_doi(doi, email='mconlon@ufl.edu', tool='PythonQuery',
     http://simon.net.nz/articles/query-pubmed-for-citation-information-
         using-a-doi-and-python/
     """
+    try:
+        return _pmid_from_doi(doi, email, tool, database)
+    except PubmedUnavailable:
+        return None
+
+def _pmid_from_doi(doi, email='mconlon@ufl.edu', tool='PythonQuery',
+                   database='pubmed'):
+    """
+    Given a DOI, return the PMID of the corresponding PubMed Article, or
+    None if not found in PubMed.  Throw PubmedUnavailable if Entrez does not
+    answer
+    """
     params = {'db':database, 'tool':tool, 'email':email, 'term': doi,
         'usehistory':'y', 'retmax':1}
+    if entrez_api_key is not None:
+        params['api_key'] = entrez_api_key
     url = 'http://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?' + \
         urllib.urlencode(params)
 
-    # Get data from Entrez.  Retry if Entrez does not respond
+    # Get data from Entrez.  Retry as retry_policy allows
 
-    start = 2.0
-    retries = 10
-    count = 0
-    while True:
-        try:
-            data = urllib.urlopen(url).read()
-            xmldoc = parseString(data)
-            ids = xmldoc.getElementsByTagName('Id')
-            if len(ids) == 0:
-                pmid = None
+    def search():
+        [status, data] = sparql_connection_pool.request("GET", url)
+        if status >= 400:
+            raise HTTPStatusError(status, url)
+        return data
+    try:
+        [ids, count] = _esearch_ids(_network_call('entrez', _service(url), url,
+                                                  search))
+    except Exception, e:
+        raise PubmedUnavailable("ESearch of " + doi + " failed: " + repr(e))
+    if len(ids) == 0:
+        pmid = None
+    else:
+        pmid = ids[0]
+    return pmid
+
+eutils_url = "http://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+def _eutils(utility, params):
+    """
+    Post params to the Entrez utility (such as "esearch.fcgi") and return
+    the text of the response.  Retry as retry_policy allows
+    """
+    url = eutils_url + utility
+    if entrez_api_key is not None:
+        params = dict(params, api_key=entrez_api_key)
+    body = urllib.urlencode(params)
+    def post():
+        [status, data] = sparql_connection_pool.request("POST", url, body,
+            {"Content-Type": "application/x-www-form-urlencoded"})
+        if status >= 400:
+            raise HTTPStatusError(status, url)
+        return data
+    return _network_call('entrez', _service(url), url + "?" + body, post)
+
+def _iterparse(data, tags):
+    """
+    Given the text of an XML document, return a generator of its elements
+    with a tag in tags, each complete with its children.  The document is
+    parsed incrementally and each element is discarded, with everything
+    before it, once it has been handled, so the whole tree is never built
+    """
+    root = None
+    for event, element in ElementTree.iterparse(cStringIO.StringIO(data),
+                                                events=("start", "end")):
+        if root is None:
+            root = element
+        elif event == "end" and element.tag in tags:
+            yield element
+            root.clear()
+
+def _esearch_ids(data):
+    """
+    Given an ESearch response, return the list of ids it found and the
+    count of all the ids matching the search
+    """
+    ids = []
+    count = None
+    for element in _iterparse(data, ('Id', 'Count')):
+        if element.tag == 'Id':
+            ids.append(element.text.strip())
+        elif count is None:
+            count = int(element.text)
+    return [ids, count]
+
+def _pmids_of_dois(dois, email, tool, database):
+    """
+    Given a list of DOIs, search PubMed for all of them at once.  Return a
+    dictionary of the PMIDs found for each DOI, keyed by lower case DOI, and
+    True if PubMed found more PMIDs than it returned.  Return None if
+    Entrez does not respond
+    """
+    term = " OR ".join('"' + doi.replace('"', '') + '"[doi]' for doi in dois)
+    try:
+        [ids, count] = _esearch_ids(_eutils("esearch.fcgi", {'db':database,
+            'tool':tool, 'email':email, 'term':term,
+            'retmax':5*len(dois)}))
+        found = {}
+        if len(ids) > 0:
+            data = _eutils("esummary.fcgi", {'db':database, 'tool':tool,
+                'email':email, 'id':",".join(ids)})
+            for docsum in _iterparse(data, ('DocSum',)):
+                pmid = docsum.findtext('Id').strip()
+                for item in docsum.iter('Item'):
+                    if item.get('Name', '').lower() == 'doi':
+                        doi = (item.text or "").strip().lower()
+                        found.setdefault(doi, set()).add(pmid)
+    except Exception:
+        return None
+    return [found, count > len(ids)]
+
+def get_pmids_from_dois(dois, chunk_size=50, email='mconlon@ufl.edu',
+                        tool='PythonQuery', database='pubmed'):
+    """
+    Given an iterable of DOIs, return a dictionary of the PMID of each, as
+    get_pmid_from_doi would, or None if not found in PubMed.
+
+    DOIs are looked up chunk_size at a time, each chunk with one ESearch of
+    its DOIs OR'ed together as [doi] terms and one ESummary to match the
+    PMIDs found to their DOIs.  A DOI is searched for alone, as
+    get_pmid_from_doi does, only if it matches more than one PMID, or is not
+    matched in a chunk whose search found more PMIDs than it returned.
+    Throw PubmedUnavailable if Entrez does not answer a chunk
+    """
+    dois = list(dois)
+    pmids = {}
+    for i in range(0, len(dois), chunk_size):
+        chunk = dois[i:i+chunk_size]
+        result = _pmids_of_dois(chunk, email, tool, database)
+        if result is None:
+            raise PubmedUnavailable("ESearch of " + str(len(chunk)) +
+                                    " DOIs failed")
+        [found, truncated] = result
+        for doi in chunk:
+            matches = found.get(doi.strip().lower(), set())
+            if len(matches) == 1:
+                pmids[doi] = list(matches)[0]
+            elif len(matches) > 1 or truncated:
+                pmids[doi] = _pmid_from_doi(doi, email, tool, database)
             else:
-                pmid = ids[0].childNodes[0].data
-            return pmid
-        except:
-            count = count + 1
-            if count > retries:
-                return None
-            sleep_seconds = start**count
-            print "<!-- Failed Entrez PMID query. Count = "+str(count)+ \
-                " Will sleep now for "+str(sleep_seconds)+ \
-                " seconds and retry -->"
-            time.sleep(sleep_seconds) # increase the wait time with each retry
+                pmids[doi] = None
+    return pmids
+
+
+class PubmedCache(object):
+    """
+    A persistent cache of PubMed records in an sqlite database at path,
+    keyed by PMID.  Each record is the XML of one PubmedArticle as returned
+    by EFetch, stored zlib compressed with the time it was fetched.  Records
+    fetched more than refresh_age seconds ago are not served, so they are
+    fetched again.
+    """
+    def __init__(self, path, refresh_age=30*86400.0):
+        self.path = path
+        self.refresh_age = refresh_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS records
+            (pmid TEXT PRIMARY KEY, fetched REAL, prolog TEXT, data BLOB)""")
+        self._db.commit()
+
+    def get(self, pmids):
+        """
+        Given a list of PMIDs, return a dictionary of the cached record of
+        each that has one fresh enough to serve.  Each is a list of the
+        prolog (the XML declaration and DOCTYPE) of the EFetch response it
+        came from and the XML of the record
+        """
+        records = {}
+        oldest = time.time() - self.refresh_age
+        with self._lock:
+            for pmid in pmids:
+                row = self._db.execute("""SELECT fetched, prolog, data
+                    FROM records WHERE pmid = ?""", (str(pmid),)).fetchone()
+                if row is None or row[0] < oldest:
+                    self.misses = self.misses + 1
+                    continue
+                self.hits = self.hits + 1
+                records[str(pmid)] = [str(row[1]),
+                                      zlib.decompress(str(row[2]))]
+        return records
+
+    def put(self, prolog, records):
+        """
+        Given the prolog of an EFetch response and a dictionary of the XML
+        of its records keyed by PMID, store the records
+        """
+        now = time.time()
+        with self._lock:
+            for pmid, data in records.items():
+                self._db.execute("""INSERT OR REPLACE INTO records
+                    (pmid, fetched, prolog, data) VALUES (?, ?, ?, ?)""",
+                    (pmid, now, prolog,
+                     sqlite3.Binary(zlib.compress(data))))
+            self._db.commit()
+
+    def invalidate(self, pmids=None, max_age=None):
+        """
+        Remove the records of pmids, or the records fetched more than
+        max_age seconds ago.  With no arguments, remove all of them
+        """
+        with self._lock:
+            if pmids is not None:
+                self._db.executemany("DELETE FROM records WHERE pmid = ?",
+                                     [(str(pmid),) for pmid in pmids])
+            elif max_age is not None:
+                self._db.execute("DELETE FROM records WHERE fetched < ?",
+                                 (time.time() - max_age,))
+            else:
+                self._db.execute("DELETE FROM records")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            [count, oldest] = self._db.execute(
+                "SELECT COUNT(*), MIN(fetched) FROM records").fetchone()
+            return {'size': count, 'oldest': oldest, 'hits': self.hits,
+                    'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+pubmed_cache = None
+
+def set_pubmed_cache(cache):
+    """
+    Use cache, a PubmedCache, for the PubMed records fetched by
+    get_pubmed_values, get_pubmed_values_batch and get_pubmed_records.
+    None turns caching off.  Returns the previous PubmedCache.
+    """
+    global pubmed_cache
+    previous = pubmed_cache
+    pubmed_cache = cache
+    return previous
+
+_pubmed_article = re.compile(
+    r'<(PubmedArticle|PubmedBookArticle)\b[^>]*>.*?</\1>', re.S)
+_pubmed_pmid = re.compile(r'<PMID\b[^>]*>\s*(\d+)\s*</PMID>')
+
+def _split_pubmed(data):
+    """
+    Given an EFetch response, return its prolog and a dictionary of the XML
+    of each of its records keyed by PMID
+    """
+    start = data.find("<PubmedArticleSet")
+    prolog = data[:start] if start >= 0 else ""
+    records = {}
+    for match in _pubmed_article.finditer(data):
+        pmid = _pubmed_pmid.search(match.group(0))
+        if pmid is not None:
+            records[pmid.group(1)] = match.group(0)
+    return [prolog, records]
+
+def _efetch_pubmed(pmids):
+    """
+    Given a list of PMIDs, return the text of their PubMed records from
+    EFetch, or None if Entrez does not respond.  Retry as retry_policy
+    allows.  With a pubmed_cache, only records not in the cache are fetched.
+    If that fetch fails, None is returned, whatever the cache holds, so the
+    records not fetched are not taken as not in PubMed
+    """
+    cache = pubmed_cache
+    cached = {}
+    if cache is not None:
+        cached = cache.get(pmids)
+    missing = [pmid for pmid in pmids if str(pmid) not in cached]
+    data = None
+    if len(missing) > 0:
+        try:
+            data = _eutils("efetch.fcgi", {'db':"pubmed", 'tool':'PythonQuery',
+                'email':Entrez.email or 'mconlon@ufl.edu', 'retmode':"xml",
+                'id':",".join(str(pmid) for pmid in missing)})
+        except Exception:
+            return None
+    if cache is None:
+        return data
+    if data is not None:
+        [prolog, records] = _split_pubmed(data)
+        cache.put(prolog, records)
+        if len(cached) == 0:
+            return data
+        for pmid, record in records.items():
+            cached[pmid] = [prolog, record]
+    if len(cached) == 0:
+        return None
+
+    #   Put the records, cached and fetched, in one response, in the order
+    #   of pmids
+
+    prolog = cached.values()[0][0]
+    return prolog + "<PubmedArticleSet>\n" + "\n".join(cached[str(pmid)][1]
+        for pmid in pmids if str(pmid) in cached) + "\n</PubmedArticleSet>\n"
+
+def _pubmed_text(element, path):
+    """
+    Given an element and a path below it, return the text of the first
+    element on the path, with any markup within it (such as <i> or <sub>)
+    kept as Entrez.parse keeps it, or None if there is no such element
+    """
+    node = element.find(path)
+    if node is None:
+        return None
+    text = node.text or ""
+    if len(node) == 0:
+        return text
+    return text + "".join(ElementTree.tostring(child, "utf-8").decode("utf-8")
+                          for child in node)
+
+def _article_from_element(element):
+    """
+    Given a PubmedArticle element, return a dictionary of the values of the
+    article used by vivotools:  pmid, title, journal, issn, volume, issue,
+    pages, date, authors, abstract, keywords (MeSH descriptors), grants and
+    ids (the article ids keyed by IdType)
+    """
+    journal = 'MedlineCitation/Article/Journal/'
+    article = {
+        'pmid': (element.findtext('MedlineCitation/PMID') or "").strip(),
+        'title': _pubmed_text(element, 'MedlineCitation/Article/ArticleTitle'),
+        'journal': _pubmed_text(element, journal + 'Title'),
+        'issn': _pubmed_text(element, journal + 'ISSN'),
+        'volume': _pubmed_text(element, journal + 'JournalIssue/Volume'),
+        'issue': _pubmed_text(element, journal + 'JournalIssue/Issue'),
+        'pages': _pubmed_text(element,
+                              'MedlineCitation/Article/Pagination/MedlinePgn'),
+        'abstract': _pubmed_text(element,
+            'MedlineCitation/Article/Abstract/AbstractText'),
+        'date': None, 'authors': [], 'keywords': [], 'grants': [], 'ids': {}}
+    history = element.find('PubmedData/History/PubMedPubDate')
+    if history is not None:
+        article['date'] = {'month': history.findtext('Month'),
+                           'day': history.findtext('Day'),
+                           'year': history.findtext('Year')}
+    for author in element.iterfind('MedlineCitation/Article/AuthorList/Author'):
+        article['authors'].append({'first': author.findtext('ForeName'),
+                                   'last': author.findtext('LastName'),
+                                   'initials': author.findtext('Initials')})
+    for keyword in element.iterfind(
+        'MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName'):
+        article['keywords'].append("".join(keyword.itertext()))
+    for grant in element.iterfind('MedlineCitation/Article/GrantList/Grant'):
+        grant_id = grant.findtext('GrantID')
+        if grant_id is not None:
+            article['grants'].append(grant_id)
+    for article_id in element.iterfind('PubmedData/ArticleIdList/ArticleId'):
+        article['ids'][article_id.get('IdType')] = \
+            "".join(article_id.itertext()).strip()
+    return article
+
+def _article_from_record(record):
+    """
+    Given a record returned by Entrez.parse, return the dictionary of its
+    values as _article_from_element would
+    """
+    citation = record['MedlineCitation']
+    source = citation.get('Article', {})
+    journal = source.get('Journal', {})
+    journal_issue = journal.get('JournalIssue', {})
+    article = {'pmid': str(citation['PMID']),
+        'title': source.get('ArticleTitle'),
+        'journal': journal.get('Title'),
+        'issn': journal.get('ISSN'),
+        'volume': journal_issue.get('Volume'),
+        'issue': journal_issue.get('Issue'),
+        'pages': source.get('Pagination', {}).get('MedlinePgn'),
+        'abstract': source.get('Abstract', {}).get('AbstractText', [None])[0],
+        'date': None, 'authors': [], 'keywords': [], 'grants': [], 'ids': {}}
+    history = record.get('PubmedData', {}).get('History', [])
+    if len(history) > 0:
+        article['date'] = {'month': history[0].get('Month'),
+                           'day': history[0].get('Day'),
+                           'year': history[0].get('Year')}
+    for author in source.get('AuthorList', []):
+        article['authors'].append({'first': author.get('ForeName'),
+                                   'last': author.get('LastName'),
+                                   'initials': author.get('Initials')})
+    for keyword in citation.get('MeshHeadingList', []):
+        article['keywords'].append(str(keyword['DescriptorName']))
+    for grant in source.get('GrantList', []):
+        if 'GrantID' in grant:
+            article['grants'].append(grant['GrantID'])
+    for article_id in record.get('PubmedData', {}).get('ArticleIdList', []):
+        if 'IdType' in article_id.attributes:
+            article['ids'][article_id.attributes['IdType']] = str(article_id)
+    return article
+
+def _pubmed_articles(data):
+    """
+    Given an EFetch response, return a generator of the values of each of
+    its articles, as returned by _article_from_element.  The response is
+    parsed incrementally, one PubmedArticle at a time
+    """
+    for element in _iterparse(data, ('PubmedArticle',)):
+        yield _article_from_element(element)
+
+def get_pubmed_records(pmids, chunk_size=200):
+    """
+    Given an iterable of PMIDs, return a generator of their articles, the
+    values of each as extracted from the PubMed XML, for
+    document_from_pubmed.  Records are fetched chunk_size PMIDs at a time,
+    or served from pubmed_cache if set.  PMIDs with no record, or in a chunk
+    Entrez does not answer, are skipped
+    """
+    pmids = list(pmids)
+    for i in range(0, len(pmids), chunk_size):
+        data = _efetch_pubmed(pmids[i:i+chunk_size])
+        if data is None:
+            continue
+        for article in _pubmed_articles(data):
+            yield article
+
+def _add_pubmed_values(values, article, debug=False):
+    """
+    Given a dictionary of values and an article as returned by
+    _pubmed_articles, add the values of the article for get_pubmed_values
+    to the dictionary
+    """
+    if debug:
+        print "PubMed article:", article
+    ids = article['ids']
+    if 'pmc' in ids:
+        values["pmcid"] = ids['pmc']
+    if 'mid' in ids:
+        values["nihmsid"] = ids['mid']
+    if article['abstract'] is not None:
+        values['abstract'] = article['abstract']
+    if len(article['keywords']) > 0:
+        values["keyword_list"] = values.get("keyword_list", []) + \
+            article['keywords']
+    if len(article['grants']) > 0:
+        values["grants_cited"] = values.get("grants_cited", []) + \
+            article['grants']
+
+    # If we found a pmcid, construct the full text uri by formula
 
+    if 'pmcid' in values:
+        values["full_text_uri"] = \
+            "http://www.ncbi.nlm.nih.gov/pmc/articles/" + \
+            values["pmcid"].upper()+ "/pdf"
 
 def get_pubmed_values(doi, pmid= None, debug=False):
     """
@@ -726,79 +1199,56 @@ def get_pubmed_values(doi, pmid= None, debug=False):
     the paper in PubMed Central.
 
     Return items in a dictionary.  Grants_cited and keywod_list are
-    lists of strings.
+    lists of strings.  Return {} if the paper is not in PubMed.  Throw
+    PubmedUnavailable if Entrez does not answer.
     """
     Entrez.email = 'mconlon@ufl.edu'
     values = {}
-    grants_cited = []
-    keyword_list = []
     if pmid is None:
-        pmid = get_pmid_from_doi(doi)
+        pmid = _pmid_from_doi(doi)
         if pmid is None:
             return {}
-    else:
-        values['pmid'] = pmid
+    values['pmid'] = pmid
 
-    # Get record(s) from Entrez.  Retry if Entrez does not respond
+    # Get record(s) from Entrez.  Retry as retry_policy allows
 
-    start = 2.0
-    retries = 10
-    count = 0
-    while True:
-        try:
-            handle = Entrez.efetch(db="pubmed", id=pmid, retmode="xml")
-            records = Entrez.parse(handle)
-            break
-        except:
-            count = count + 1
-            if count > retries:
-                return {}
-            sleep_seconds = start**count
-            print "<!-- Failed Entrez query. Count = "+str(count)+ \
-                " Will sleep now for "+str(sleep_seconds)+ \
-                " seconds and retry -->"
-            time.sleep(sleep_seconds) # increase the wait time with each retry
-
-    # Find the desired attributes in the record structures returned by Entrez
-
-    for record in records:
-        if debug:
-            print "Entrez record:", record
-        article_id_list = record['PubmedData']['ArticleIdList']
-        for article_id in article_id_list:
-            attributes = article_id.attributes
-            if 'IdType' in attributes:
-                if attributes['IdType'] == 'pmc':
-                    values["pmcid"] = str(article_id)
-                if attributes['IdType'] == 'mid':
-                    values["nihmsid"] = str(article_id)
-        try:
-            values['abstract'] = \
-                record['MedlineCitation']['Article']['Abstract']\
-                ['AbstractText'][0]
-        except:
-            pass
-        try:
-            keywords = record['MedlineCitation']['MeshHeadingList']
-            for keyword in keywords:
-                keyword_list.append(str(keyword['DescriptorName']))
-            values["keyword_list"] = keyword_list
-        except:
-            pass
-        try:
-            grants = record['MedlineCitation']['Article']['GrantList']
-            for grant in grants:
-                grants_cited.append(grant['GrantID'])
-            values["grants_cited"] = grants_cited
-        except:
-            pass
+    data = _efetch_pubmed([pmid])
+    if data is None:
+        raise PubmedUnavailable("EFetch of " + str(pmid) + " failed")
 
-    # If we found a pmcid, construct the full text uri by formula
+    # Find the desired attributes in the articles of the response
 
-    if 'pmcid' in values:
-        values["full_text_uri"] = \
-            "http://www.ncbi.nlm.nih.gov/pmc/articles/" + \
-            values["pmcid"].upper()+ "/pdf"
+    for article in _pubmed_articles(data):
+        _add_pubmed_values(values, article, debug)
+    return values
+
+def get_pubmed_values_batch(pmids, chunk_size=200, debug=False):
+    """
+    Given an iterable of PMIDs, return a dictionary keyed by PMID of the
+    values get_pubmed_values returns for each, including the PMID.  Records
+    are fetched chunk_size PMIDs at a time, one EFetch of a comma separated
+    list of PMIDs per chunk, rather than one EFetch per PMID.
+
+    A PMID with no record has the value {}.  Throw PubmedUnavailable if
+    Entrez does not answer a chunk
+    """
+    Entrez.email = 'mconlon@ufl.edu'
+    pmids = list(pmids)
+    keys = dict((str(pmid), pmid) for pmid in pmids)
+    values = dict((pmid, {}) for pmid in pmids)
+    for i in range(0, len(pmids), chunk_size):
+        data = _efetch_pubmed(pmids[i:i+chunk_size])
+        if data is None:
+            raise PubmedUnavailable("EFetch of " +
+                str(len(pmids[i:i+chunk_size])) + " PMIDs failed")
+        for article in _pubmed_articles(data):
+            try:
+                pmid = keys[article['pmid']]
+            except KeyError:
+                continue
+            if values[pmid] == {}:
+                values[pmid]['pmid'] = pmid
+            _add_pubmed_values(values[pmid], article, debug)
     return values
 
 def rdf_header():
@@ -847,6 +1297,70 @@ def rdf_footer():
 """
     return rdf_footer
 
+#   RDF sinks.  merge_uri, remove_uri, update_pubmed and
+#   update_pubmed_pipeline write the RDF they make to a sink, an object with
+#   add(text) for add RDF and sub(text) for sub RDF.  RDFBuffer keeps the RDF
+#   in memory.  RDFFileWriter writes it to files as it is made.
+
+class RDFBuffer(object):
+    """
+    An RDF sink keeping the add and sub RDF written to it in lists.  rdf
+    returns them joined, once, rather than concatenating string by string
+    """
+    def __init__(self):
+        self.ardf = []
+        self.srdf = []
+
+    def add(self, text):
+        self.ardf.append(text)
+
+    def sub(self, text):
+        self.srdf.append(text)
+
+    def rdf(self):
+        """
+        Return the add and sub RDF written so far
+        """
+        return ["".join(self.ardf), "".join(self.srdf)]
+
+class RDFFileWriter(object):
+    """
+    An RDF sink writing add RDF to a file at add_path and sub RDF to a file
+    at sub_path as it is written to the sink, each file an RDF document
+    beginning with rdf_header.  close ends each file with rdf_footer.
+    Memory does not grow with the RDF written.  Text is written UTF-8
+    encoded.
+    """
+    def __init__(self, add_path, sub_path):
+        self.add_path = add_path
+        self.sub_path = sub_path
+        self.add_bytes = 0
+        self.sub_bytes = 0
+        self._lock = threading.Lock()
+        self._add_file = open(add_path, "w")
+        self._sub_file = open(sub_path, "w")
+        self._add_file.write(rdf_header())
+        self._sub_file.write(rdf_header())
+
+    def add(self, text):
+        text = _utf8(text)
+        with self._lock:
+            self._add_file.write(text)
+            self.add_bytes = self.add_bytes + len(text)
+
+    def sub(self, text):
+        text = _utf8(text)
+        with self._lock:
+            self._sub_file.write(text)
+            self.sub_bytes = self.sub_bytes + len(text)
+
+    def close(self):
+        with self._lock:
+            for f in [self._add_file, self._sub_file]:
+                if not f.closed:
+                    f.write(rdf_footer())
+                    f.close()
+
 def make_rdf_uri(uri):
     """
     Given a uri of a VIVO profile, generate the URI of the corresponding
@@ -869,19 +1383,215 @@ def key_string(s):
     k = k.lower()
     return k
 
-def get_triples(uri):
-    """
-    Given a VIVO URI, return all the triples referencing that URI as subject
-    """
-    query = tempita.Template("""
+_get_triples_query = tempita.Template("""
     SELECT ?p ?o WHERE
     {
     <{{uri}}> ?p ?o .
     }""")
-    query = query.substitute(uri=uri)
+
+def get_triples(uri):
+    """
+    Given a VIVO URI, return all the triples referencing that URI as subject
+    """
+    triples = _graph_triples(uri)
+    if triples is not None:
+        return triples
+    query = _get_triples_query.substitute(uri=uri)
     result = vivo_sparql_query(query)
     return result
 
+_get_triples_batch_query = tempita.Template("""
+    SELECT ?s ?p ?o WHERE
+    {
+    VALUES ?s { {{for uri in uris}}<{{uri}}> {{endfor}}}
+    ?s ?p ?o .
+    }""")
+
+def get_triples_batch(uris, chunk_size=100):
+    """
+    Given an iterable of VIVO URIs, return a dictionary keyed by URI.  Each
+    value is the triples referencing that URI as subject, in the form
+    returned by get_triples.  The triples are fetched chunk_size URIs at a
+    time, one SPARQL query per chunk.
+
+    URIs in a chunk whose query fails are left out of the dictionary
+    """
+    uris = list(uris)
+    triples = {}
+    i = 0
+    while i < len(uris):
+        chunk = uris[i:i+chunk_size]
+        i = i + chunk_size
+        query = _get_triples_batch_query.substitute(uris=chunk)
+        result = vivo_sparql_query(query)
+        if result is None or 'results' not in result:
+            continue
+        for uri in chunk:
+            triples[uri] = {"head": {"vars": ["p", "o"]},
+                            "results": {"bindings": []}}
+        for b in result["results"]["bindings"]:
+            triples[b['s']['value']]["results"]["bindings"].append(
+                {'p': b['p'], 'o': b['o']})
+    return triples
+
+#   The predicates followed from each kind of entity when fetching the graph
+#   an accessor will dereference.  Each entry is predicate : kind of the
+#   object, or predicate : [kind, option].  An entry with an option is
+#   followed only if the option is True.
+
+graph_edges = {
+    'person': {
+        "http://vivo.ufl.edu/ontology/vivo-ufl/homeDept": 'organization',
+        "http://vivoweb.org/ontology/core#authorInAuthorship":
+            ['person_authorship', 'get_publications'],
+        "http://vivoweb.org/ontology/core#hasPrincipalInvestigatorRole":
+            ['person_role', 'get_grants'],
+        "http://vivoweb.org/ontology/core#hasCo-PrincipalInvestigatorRole":
+            ['person_role', 'get_grants'],
+        "http://vivoweb.org/ontology/core#hasInvestigatorRole":
+            ['person_role', 'get_grants'],
+        "http://vivoweb.org/ontology/core#personInPosition":
+            ['position', 'get_positions'],
+        "http://vivoweb.org/ontology/core#educationalTraining":
+            ['degree', 'get_degrees']},
+    'investigator': {
+        "http://vivo.ufl.edu/ontology/vivo-ufl/homeDept": 'organization'},
+    'person_authorship': {
+        "http://vivoweb.org/ontology/core#linkedInformationResource":
+            'publication'},
+    'person_role': {
+        "http://vivoweb.org/ontology/core#roleIn": 'grant',
+        "http://vivoweb.org/ontology/core#roleContributesTo": 'grant'},
+    'publication': {
+        "http://vivoweb.org/ontology/core#webPage": 'webpage',
+        "http://vivoweb.org/ontology/core#hasPublicationVenue":
+            'publication_venue',
+        "http://vivoweb.org/ontology/core#dateTimeValue": 'datetime_value',
+        "http://vivoweb.org/ontology/core#informationResourceInAuthorship":
+            ['authorship', 'get_authors']},
+    'authorship': {
+        "http://vivoweb.org/ontology/core#linkedAuthor": 'author'},
+    'grant': {
+        "http://vivoweb.org/ontology/core#administeredBy": 'organization',
+        "http://vivoweb.org/ontology/core#grantAwardedBy": 'organization',
+        "http://vivoweb.org/ontology/core#dateTimeInterval":
+            'datetime_interval',
+        "http://vivoweb.org/ontology/core#contributingRole": 'grant_role'},
+    'grant_role': {
+        "http://vivoweb.org/ontology/core#principalInvestigatorRoleOf":
+            ['investigator', 'get_investigators'],
+        "http://vivoweb.org/ontology/core#co-PrincipalInvestigatorRoleOf":
+            ['investigator', 'get_investigators'],
+        "http://vivoweb.org/ontology/core#investigatorRoleOf":
+            ['investigator', 'get_investigators']},
+    'position': {
+        "http://vivoweb.org/ontology/core#positionInOrganization":
+            'organization',
+        "http://vivoweb.org/ontology/core#dateTimeInterval":
+            'datetime_interval'},
+    'degree': {
+        "http://vivoweb.org/ontology/core#degreeEarned": 'academic_degree',
+        "http://vivoweb.org/ontology/core#trainingAtOrganization":
+            'organization',
+        "http://vivoweb.org/ontology/core#dateTimeInterval":
+            'datetime_interval'},
+    'datetime_interval': {
+        "http://vivoweb.org/ontology/core#start": 'datetime_value',
+        "http://vivoweb.org/ontology/core#end": 'datetime_value'}
+    }
+
+def get_graph(uris, kind, options=None, chunk_size=100):
+    """
+    Given VIVO URIs of entities of one kind (a key of graph_edges), return
+    the triples of the entities and of every entity the accessor for that
+    kind will dereference, as a dictionary keyed by URI in the form returned
+    by get_triples_batch.
+
+    The graph is fetched a level at a time.  Each level is one query per
+    chunk_size URIs, so the number of queries depends on the depth of the
+    graph, not on the number of entities in it.  options are the
+    dereference flags of the accessor, such as get_publications=True.
+    """
+    flags = {'get_publications': False, 'get_grants': False,
+             'get_positions': False, 'get_degrees': False,
+             'get_authors': True, 'get_investigators': False}
+    if options is not None:
+        flags.update(options)
+    graph = {}
+    seen = set()
+    frontier = []
+    for uri in uris:
+        if (uri, kind) not in seen:
+            seen.add((uri, kind))
+            frontier.append((uri, kind))
+    while len(frontier) > 0:
+        needed = []
+        for (uri, uri_kind) in frontier:
+            if uri not in graph and uri not in needed:
+                needed.append(uri)
+        graph.update(get_triples_batch(needed, chunk_size))
+        next_frontier = []
+        for (uri, uri_kind) in frontier:
+            edges = graph_edges.get(uri_kind, {})
+            if uri not in graph or len(edges) == 0:
+                continue
+            for b in graph[uri]["results"]["bindings"]:
+                if b['o']['type'] != 'uri' or b['p']['value'] not in edges:
+                    continue
+                edge = edges[b['p']['value']]
+                if isinstance(edge, list):
+                    if not flags[edge[1]]:
+                        continue
+                    edge = edge[0]
+                child = (b['o']['value'], edge)
+                if child not in seen:
+                    seen.add(child)
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return graph
+
+_local_graph = threading.local()
+
+def _graph_triples(uri):
+    """
+    Return the triples for uri from the graph of the current prefetch, or
+    None if there is no prefetch or uri is not in it
+    """
+    graph = getattr(_local_graph, 'graph', None)
+    if graph is None:
+        return None
+    return graph.get(uri)
+
+def _graph_value(uri, predicate):
+    """
+    Return the first object of the tagged predicate for uri from the graph
+    of the current prefetch.  Return False if the graph can not answer,
+    so the caller will query VIVO
+    """
+    triples = _graph_triples(uri)
+    if triples is None:
+        return False
+    predicate = untag_predicate(predicate)
+    if predicate is None:
+        return False
+    for b in triples["results"]["bindings"]:
+        if b['p']['value'] == predicate:
+            return b['o']
+    return None
+
+def with_graph(graph, function, *args, **kwargs):
+    """
+    Call function with get_triples, get_vivo_value and get_value answering
+    from graph, a dictionary of triples as returned by get_graph.  URIs not
+    in the graph are queried from VIVO as usual.
+    """
+    previous = getattr(_local_graph, 'graph', None)
+    _local_graph.graph = graph
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _local_graph.graph = previous
+
 def get_types(uri):
     """
     Given a VIVO URI, return a list of its types
@@ -897,20 +1607,30 @@ def get_types(uri):
                 types.append(o)
     return types
 
+_get_references_query = tempita.Template("""
+    SELECT ?s ?p WHERE
+    {
+    ?s ?p <{{uri}}> .
+    }""")
+
 def get_references(uri):
     """
     Given a VIVO uri, return all the triples that have the given uri as an
     object
     """
-    query = tempita.Template("""
-    SELECT ?s ?p WHERE
-    {
-    ?s ?p <{{uri}}> .
-    }""")
-    query = query.substitute(uri=uri)
+    query = _get_references_query.substitute(uri=uri)
     result = vivo_sparql_query(query)
     return result
 
+#   The query of get_vivo_value and get_value
+
+_get_value_query = tempita.Template("""
+    SELECT ?o WHERE
+    {
+    <{{uri}}> {{predicate}} ?o .
+    }
+    """)
+
 def get_vivo_value(uri, predicate):
     """
     Given a VIVO URI, and a predicate, get a value for the rpedicate.  Assumes
@@ -923,13 +1643,12 @@ def get_vivo_value(uri, predicate):
     --  this function is very inefficient, making a SPARQL query for every
         value. Use only when strictly needed!
     """
-    query = tempita.Template("""
-    SELECT ?o WHERE
-    {
-    <{{uri}}> {{predicate}} ?o .
-    }
-    """)
-    query = query.substitute(uri=uri, predicate=predicate)
+    o = _graph_value(uri, predicate)
+    if o is None:
+        return None
+    elif o is not False:
+        return o['value']
+    query = _get_value_query.substitute(uri=uri, predicate=predicate)
     result = vivo_sparql_query(query)
     try:
         b = result["results"]["bindings"][0]
@@ -951,13 +1670,10 @@ def get_value(uri, predicate):
     --  this function is very inefficient, making a SPARQL query for every
         value. Use only when strictly needed!
     """
-    query = tempita.Template("""
-    SELECT ?o WHERE
-    {
-    <{{uri}}> {{predicate}} ?o .
-    }
-    """)
-    query = query.substitute(uri=uri, predicate=predicate)
+    o = _graph_value(uri, predicate)
+    if o is not False:
+        return o
+    query = _get_value_query.substitute(uri=uri, predicate=predicate)
     result = vivo_sparql_query(query)
     try:
         b = result["results"]["bindings"][0]
@@ -966,6 +1682,14 @@ def get_value(uri, predicate):
     except:
         return None
 
+_find_vivo_uri_query = tempita.Template("""
+    SELECT ?uri WHERE
+    {
+    ?uri {{predicate}} "{{value}}" .
+    }
+    LIMIT 1
+    """)
+
 def find_vivo_uri(predicate, value):
     """
     Given a VIVO predicate, and a value, return the first uri in VIVO that
@@ -979,14 +1703,8 @@ def find_vivo_uri(predicate, value):
     --  this function is very inefficient, making a SPARQL query for every
         value. Use only when strictly needed!
     """
-    query = tempita.Template("""
-    SELECT ?uri WHERE
-    {
-    ?uri {{predicate}} "{{value}}" .
-    }
-    LIMIT 1
-    """)
-    query = query.substitute(predicate=predicate,value=value)
+    query = _find_vivo_uri_query.substitute(predicate=predicate,
+                                            value=value)
     result = vivo_sparql_query(query)
     try:
         b = result["results"]["bindings"][0]
@@ -1014,6 +1732,496 @@ def show_triples(triples):
         i = i + 1
     return
 
+def parse_triples(entity, triples, kind):
+    """
+    Given an entity dictionary, triples as returned by get_triples, and the
+    kind of the entity (a key of entity_predicates), set the fields of the
+    entity from the triples and return it.
+
+    Each triple costs one lookup of its predicate in entity_predicates and,
+    if its object is a URI, one lookup of the object in entity_objects.
+    """
+    predicates = entity_predicates[kind]
+    objects = entity_objects.get(kind, {})
+    try:
+        bindings = triples["results"]["bindings"]
+    except:
+        bindings = []
+    for b in bindings:
+        o = b['o']
+        entry = predicates.get(b['p']['value'])
+        if entry is not None:
+            [field, value, deref] = entry
+            if value == 'value':
+                entity[field] = o['value']
+            elif value == 'list':
+                entity[field].append(o['value'])
+            elif value == 'node':
+                entity[field] = o
+            if deref is not None:
+                deref(entity, o['value'])
+        if o['type'] == 'uri' and o['value'] in objects:
+            [field, value] = objects[o['value']]
+            entity[field] = value
+    return entity
+
+def _deref_label(field):
+    """
+    Return a deref function that sets field to the label of the organization
+    """
+    def deref(entity, uri):
+        organization = get_organization(uri)
+        if 'label' in organization: # organization might be incomplete
+            entity[field] = organization['label']
+    return deref
+
+def _deref_datetime_interval(entity, uri):
+    datetime_interval = get_datetime_interval(uri)
+    entity['datetime_interval'] = datetime_interval
+    if 'start_date' in datetime_interval:
+        entity['start_date'] = datetime_interval['start_date']
+    if 'end_date' in datetime_interval:
+        entity['end_date'] = datetime_interval['end_date']
+
+def _deref_degree_earned(degree, uri):
+    degree['degree_name'] = get_vivo_value(uri, 'core:abbreviation')
+
+def _deref_webpage(publication, uri):
+    # does not handle multiple web pages
+    web_page = get_webpage(uri)
+    publication['web_page'] = web_page
+    if 'link_type' in web_page and web_page['link_type'] == 'full_text_uri':
+        publication['full_text_uri'] = web_page['link_uri']
+
+def _deref_publication_venue(publication, uri):
+    publication_venue = get_publication_venue(uri)
+    if 'label' in publication_venue:
+        publication['journal'] = publication_venue['label']
+
+def _deref_datetime_value(publication, uri):
+    datetime_value = get_datetime_value(uri)
+    if 'date' in datetime_value:
+        publication['date'] = datetime_value['date']
+
+def _deref_start(datetime_interval, uri):
+    datetime_interval['start_date'] = get_datetime_value(uri)
+
+def _deref_end(datetime_interval, uri):
+    datetime_interval['end_date'] = get_datetime_value(uri)
+
+#   Predicate mapping for the get_* accessors.  For each kind of entity,
+#   predicate : [field, value, deref].  value is 'value' to set the field to
+#   the value of the object, 'list' to append the value to the field, 'node'
+#   to set the field to the object itself (with any lang and datatype) or
+#   None to leave the entity alone.  deref, if not None, is called with the
+#   entity and the value of the object to dereference it.
+
+CORE = "http://vivoweb.org/ontology/core#"
+UFV = "http://vivo.ufl.edu/ontology/vivo-ufl/"
+BIBO = "http://purl.org/ontology/bibo/"
+FOAF = "http://xmlns.com/foaf/0.1/"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+
+entity_predicates = {
+    'organization': {
+        RDFS_LABEL: ['label', 'value', None],
+        CORE+"subOrganizationWithin":
+            ['sub_organization_within_uris', 'list', None],
+        CORE+"hasSubOrganization": ['has_sub_organization_uris', 'list', None],
+        CORE+"overview": ['overview', 'value', None]},
+    'person': {
+        CORE+"primaryPhoneNumber": ['primary_phone_number', 'value', None],
+        CORE+"primaryEmail": ['primary_email', 'value', None],
+        CORE+"faxNumber": ['fax_number', 'value', None],
+        UFV+"ufid": ['ufid', 'value', None],
+        UFV+"gatorlink": ['gatorlink', 'value', None],
+        CORE+"eRACommonsId": ['era_commons', 'value', None],
+        CORE+"overview": ['overview', 'value', None],
+        FOAF+"firstName": ['first_name', 'value', None],
+        FOAF+"lastName": ['last_name', 'value', None],
+        CORE+"middleName": ['middle_name', 'value', None],
+        "http://purl.org/ontology/bibo#prefixName":
+            ['name_prefix', 'value', None],
+        "http://purl.org/ontology/bibo#suffixName":
+            ['name_suffix', 'value', None],
+        RDFS_LABEL: ['display_name', 'value', None],
+        CORE+"preferredTitle": ['preferred_title', 'value', None],
+        CORE+"educationalTraining": ['degree_uris', 'list', None],
+        CORE+"authorInAuthorship": ['authorship_uris', 'list', None],
+        CORE+"hasPrincipalInvestigatorRole": ['pi_role_uris', 'list', None],
+        CORE+"hasCo-PrincipalInvestigatorRole":
+            ['coi_role_uris', 'list', None],
+        CORE+"hasInvestigatorRole": ['inv_role_uris', 'list', None],
+        CORE+"hasTeacherRole": ['teaching_role_uris', 'list', None],
+        CORE+"personInPosition": ['position_uris', 'list', None],
+        UFV+"homeDept": ['home_dept_uri', 'value',
+                         _deref_label('home_department_name')]},
+    'degree': {
+        CORE+"majorField": ['major_field', 'value', None],
+        CORE+"degreeEarned": ['earned_uri', 'value', _deref_degree_earned],
+        CORE+"trainingAtOrganization": ['training_institution_uri', 'value',
+                                        _deref_label('institution_name')],
+        CORE+"dateTimeInterval": [None, None, _deref_datetime_interval]},
+    'role': {
+        CORE+"roleIn": ['grant_uri', 'value', None],
+        CORE+"roleContributesTo": ['grant_uri', 'value', None],
+        CORE+"co-PrincipalInvestigatorRoleOf":
+            ['co_principal_investigator_role_of', 'value', None],
+        CORE+"principalInvestigatorRoleOf":
+            ['principal_investigator_role_of', 'value', None],
+        CORE+"investigatorRoleOf": ['investigator_role_of', 'value', None]},
+    'authorship': {
+        CORE+"authorRank": ['author_rank', 'value', None],
+        CORE+"linkedAuthor": ['author_uri', 'value', None],
+        CORE+"linkedInformationResource": ['publication_uri', 'value', None],
+        CORE+"isCorrespondingAuthor": ['corresponding_author', 'value', None]},
+    'webpage': {
+        CORE+"webpageOf": ['webpage_of', 'value', None],
+        CORE+"rank": ['rank', 'value', None],
+        CORE+"linkURI": ['link_uri', 'value', None],
+        CORE+"linkAnchorText": ['link_anchor_text', 'value', None]},
+    'position': {
+        CORE+"positionForPerson": ['person_uri', 'value', None],
+        CORE+"hrJobTitle": ['hr_title', 'value', None],
+        RDFS_LABEL: ['position_label', 'value', None],
+        CORE+"positionInOrganization": ['org_uri', 'value',
+                                        _deref_label('org_name')],
+        CORE+"dateTimeInterval": [None, None, _deref_datetime_interval]},
+    'publication': {
+        BIBO+"doi": ['doi', 'value', None],
+        BIBO+"pmid": ['pmid', 'value', None],
+        BIBO+"abstract": ['abstract', 'value', None],
+        CORE+"pmcid": ['pmcid', 'value', None],
+        CORE+"nihmsid": ['nihmsid', 'value', None],
+        CORE+"freeTextKeyword": ['keyword_list', 'list', None],
+        "http://vivoweb.org/ontology/ufVivo#grantCited":
+            ['grants_cited', 'list', None],
+        CORE+"hasSubjectArea": ['concept_uris', 'list', None],
+        CORE+"informationResourceInAuthorship":
+            ['authorship_uris', 'list', None],
+        CORE+"webPage": [None, None, _deref_webpage],
+        BIBO+"pageStart": ['page_start', 'value', None],
+        BIBO+"pageEnd": ['page_end', 'value', None],
+        RDFS_LABEL: ['title', 'value', None],
+        BIBO+"volume": ['volume', 'value', None],
+        BIBO+"number": ['number', 'value', None],
+        CORE+"hasPublicationVenue": [None, None, _deref_publication_venue],
+        CORE+"dateTimeValue": [None, None, _deref_datetime_value]},
+    'datetime_value': {
+        CORE+"dateTime": ['datetime', 'value', None],
+        CORE+"dateTimePrecision": ['datetime_precision', 'value', None]},
+    'datetime_interval': {
+        CORE+"start": [None, None, _deref_start],
+        CORE+"end": [None, None, _deref_end]},
+    'publication_venue': {
+        BIBO+"issn": ['issn', 'value', None],
+        RDFS_LABEL: ['label', 'value', None]},
+    'grant': {
+        RDFS_LABEL: ['title', 'node', None],
+        CORE+"totalAwardAmount": ['total_award_amount', 'node', None],
+        CORE+"grantDirectCosts": ['grant_direct_costs', 'node', None],
+        BIBO+"abstract": ['abstract', 'node', None],
+        CORE+"sponsorAwardId": ['sponsor_award_id', 'node', None],
+        UFV+"dsrNumber": ['dsr_number', 'node', None],
+        UFV+"psContractNumber": ['pcn', 'node', None],
+        UFV+"dateHarvested": ['date_harvested', 'node', None],
+        UFV+"harvestedBy": ['harvested_by', 'node', None],
+        UFV+"localAwardId": ['local_award_id', 'node', None],
+        CORE+"contributingRole": ['contributing_role_uris', 'list', None],
+        CORE+"administeredBy": ['administered_by_uri', 'value',
+                                _deref_label('administered_by')],
+        CORE+"grantAwardedBy": ['sponsor_uri', 'value',
+                                _deref_label('awarded_by')],
+        CORE+"dateTimeInterval": ['dti_uri', 'value',
+                                  _deref_datetime_interval]}
+    }
+
+datetime_precisions = {
+    CORE+"yearPrecision": 'year',
+    CORE+"yearMonthPrecision": 'year_month',
+    CORE+"yearMonthDayPrecision": 'year_month_day'}
+
+#   Object mapping for the get_* accessors.  For each kind of entity, object
+#   URI (typically a type) : [field, value to set]
+
+entity_objects = {
+    'webpage': {
+        "http://vivoweb.org/ontology/ufVivo#FullTextURI":
+            ['link_type', 'full_text']},
+    'position': {
+        CORE+"FacultyPosition": ['position_type', 'faculty'],
+        CORE+"Non-FacultyAcademicPosition": ['position_type', 'non-faculty'],
+        "http://vivoweb.org/ontology/ufVivo#ClinicalFacultyPosition":
+            ['position_type', 'clinical-faculty'],
+        "http://vivoweb.org/ontology/ufVivo#PostDocPosition":
+            ['position_type', 'post-doc'],
+        CORE+"LibrarianPosition": ['position_type', 'librarian'],
+        CORE+"Non-AcademicPosition": ['position_type', 'non-academic'],
+        "http://vivoweb.org/ontology/ufVivo#StudentAssistant":
+            ['position_type', 'student-assistant'],
+        "http://vivoweb.org/ontology/ufVivo#GraduateAssistant":
+            ['position_type', 'graduate-assistant'],
+        "http://vivoweb.org/ontology/ufVivo#Housestaff":
+            ['position_type', 'housestaff'],
+        "http://vivoweb.org/ontology/ufVivo#TemporaryFaculty":
+            ['position_type', 'temp-faculty'],
+        CORE+"FacultyAdministrativePosition":
+            ['position_type', 'faculty-administrative']},
+    'publication': {
+        BIBO+"AcademicArticle": ['publication_type', 'academic-article'],
+        BIBO+"Book": ['publication_type', 'book'],
+        BIBO+"Chapter": ['publication_type', 'chapter'],
+        CORE+"ConferencePaper": ['publication_type', 'conference-paper'],
+        CORE+"ConferencePoster": ['publication_type', 'conference-poster']}
+    }
+
+class Future(object):
+    """
+    A call of function with args and kwargs, run once by whichever thread
+    claims it first: a WorkerPool worker, or a thread asking for its result
+    before any worker has started it.  The prefetched graph and retry
+    budget of the thread creating the future are used while it runs.
+    """
+    def __init__(self, function, args=(), kwargs=None):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.graph = getattr(_local_graph, 'graph', None)
+        self.budget = getattr(_local_budget, 'budget', None)
+        self.caller = None
+        if network_metrics is not None:
+            self.caller = _caller()
+        self.claimed = False
+        self.value = None
+        self.error = None
+        self.callbacks = []
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            if self.claimed:
+                return
+            self.claimed = True
+        previous = getattr(_local_graph, 'graph', None)
+        previous_caller = getattr(_local_caller, 'name', None)
+        previous_budget = getattr(_local_budget, 'budget', None)
+        _local_graph.graph = self.graph
+        _local_caller.name = self.caller
+        _local_budget.budget = self.budget
+        try:
+            self.value = self.function(*self.args, **self.kwargs)
+        except:
+            self.error = sys.exc_info()
+        finally:
+            _local_graph.graph = previous
+            _local_caller.name = previous_caller
+            _local_budget.budget = previous_budget
+        with self._lock:
+            self._done.set()
+            callbacks = self.callbacks
+            self.callbacks = []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except:
+                pass
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self):
+        """
+        Return the value of the call, running it now if no worker has
+        started it, or waiting for it to finish if one has.  If the call
+        threw an exception, throw it again.
+        """
+        self.run() # does nothing if already claimed
+        self._done.wait()
+        if self.error is not None:
+            raise self.error[0], self.error[1], self.error[2]
+        return self.value
+
+    def add_done_callback(self, callback):
+        """
+        Call callback with the future when it is done, from the thread that
+        ran it.  If it is already done, call callback now.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+class WorkerPool(object):
+    """
+    A fixed number of worker threads for dereferencing entities and
+    running queries concurrently.  map calls a function on each of a list of
+    items and returns the results in the order of the items.  submit queues
+    one call and returns a Future.
+
+    map may be called from inside a function being mapped.  The calling
+    thread runs any of its items not yet started by a worker, so nested
+    calls share the one set of workers and can not deadlock waiting for
+    them.
+    """
+    def __init__(self, workers=8):
+        self.workers = workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            future = self._queue.get()
+            if future is None:
+                return
+            future.run()
+
+    def map(self, function, items):
+        futures = [Future(function, (item,)) for item in items]
+        for future in futures:
+            self._queue.put(future)
+        return [future.result() for future in futures]
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Queue function(*args, **kwargs) to run on a worker.  Return a Future
+        """
+        future = Future(function, args, kwargs)
+        self._queue.put(future)
+        return future
+
+    def close(self, wait=False):
+        """
+        Stop the worker threads once the tasks already queued are done.  If
+        wait, return only when they have stopped
+        """
+        for i in range(self.workers):
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+deref_pool = None
+
+def set_deref_pool(pool):
+    """
+    Use pool, a WorkerPool, to dereference the entities referred to by an
+    entity concurrently in get_person and get_grant.  None, the default,
+    dereferences them one at a time.  Returns the previous pool, which is
+    not closed.
+
+    Each worker needs a connection to VIVO.  Allow for the workers in
+    the maxsize_per_host of the connection pool.
+    """
+    global deref_pool
+    previous = deref_pool
+    deref_pool = pool
+    return previous
+
+def _deref_map(function, items):
+    """
+    Return [function(item) for item in items], using deref_pool if set
+    """
+    pool = deref_pool
+    if pool is None or len(items) < 2:
+        return [function(item) for item in items]
+    return pool.map(function, items)
+
+def _publication_of_authorship(authorship_uri):
+    authorship = get_authorship(authorship_uri)
+    if 'publication_uri' in authorship: # authorship might be incomplete
+        return get_publication(authorship['publication_uri'])
+    return None
+
+def _grant_of_role(role):
+    [role_uri, role_name] = role
+    role = get_role(role_uri)
+    if 'grant_uri' in role:  # some roles are broken
+        grant = get_grant(role['grant_uri'])
+        grant['role'] = role_name
+        return grant
+    return None
+
+def _investigator(investigator):
+    [person_uri, role_name] = investigator
+    person = get_person(person_uri)
+    person['role'] = role_name
+    return person
+
+async_pool = None
+_async_pool_lock = threading.Lock()
+
+def set_async_pool(pool):
+    """
+    Use pool, a WorkerPool, to run the *_async functions.  The number of
+    workers bounds the number of calls in progress at once.  Returns the
+    previous pool, which is not closed.
+    """
+    global async_pool
+    with _async_pool_lock:
+        previous = async_pool
+        async_pool = pool
+    return previous
+
+def submit(function, *args, **kwargs):
+    """
+    Run function(*args, **kwargs) on async_pool, creating a pool of 16
+    workers if none has been set.  Return a Future of the result.
+
+    All the *_async functions use submit, so their calls share the workers
+    of async_pool and the connections of sparql_connection_pool.
+    """
+    global async_pool
+    with _async_pool_lock:
+        if async_pool is None:
+            async_pool = WorkerPool(16)
+        pool = async_pool
+    return pool.submit(function, *args, **kwargs)
+
+def vivo_sparql_query_async(query, **kwargs):
+    """
+    Given a SPARQL query string, return a Future of the result of
+    vivo_sparql_query
+    """
+    return submit(vivo_sparql_query, query, **kwargs)
+
+def get_triples_async(uri):
+    """
+    Given a VIVO URI, return a Future of the result of get_triples
+    """
+    return submit(get_triples, uri)
+
+def get_references_async(uri):
+    """
+    Given a VIVO URI, return a Future of the result of get_references
+    """
+    return submit(get_references, uri)
+
+def get_person_async(person_uri, **kwargs):
+    """
+    Given a person URI, return a Future of the result of get_person
+    """
+    return submit(get_person, person_uri, **kwargs)
+
+def get_publication_async(publication_uri, **kwargs):
+    """
+    Given a publication URI, return a Future of the result of
+    get_publication
+    """
+    return submit(get_publication, publication_uri, **kwargs)
+
+def get_grant_async(grant_uri, **kwargs):
+    """
+    Given a grant URI, return a Future of the result of get_grant
+    """
+    return submit(get_grant, grant_uri, **kwargs)
+
 def get_organization(organization_uri):
     """
     Given the URI of an organnization, return an object that contains the
@@ -1026,35 +2234,28 @@ def get_organization(organization_uri):
     organization['sub_organization_within_uris'] = []
     organization['has_sub_organization_uris'] = []
     triples = get_triples(organization_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            organization['label'] = o
-        if p == "http://vivoweb.org/ontology/core#subOrganizationWithin":
-            organization['sub_organization_within_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#hasSubOrganization":
-            organization['has_sub_organization_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#overview":
-            organization['overview'] = o
-        i = i + 1
-    return organization
+    return parse_triples(organization, triples, 'organization')
 
 def get_person(person_uri, get_publications=False, get_grants=False,
-               get_positions=False, get_degrees=False):
+               get_positions=False, get_degrees=False, prefetch=False):
     """
     Given a person URI, return an object that ccontains the person it
     represents.
 
     Optionally dereference publications, grants, positions, courses.  Each may
     add significant run time
-    """
+
+    With prefetch=True, the person and everything to be dereferenced are
+    fetched with get_graph in a few queries, rather than one query per
+    entity, and the person is assembled from the fetched triples.
+    """
+    if prefetch:
+        options = {'get_publications': get_publications,
+                   'get_grants': get_grants, 'get_positions': get_positions,
+                   'get_degrees': get_degrees}
+        graph = get_graph([person_uri], 'person', options)
+        return with_graph(graph, get_person, person_uri, get_publications,
+                          get_grants, get_positions, get_degrees)
     person = {'person_uri':person_uri}
     person['authorship_uris'] = []
     person['pi_role_uris'] = []
@@ -1068,114 +2269,36 @@ def get_person(person_uri, get_publications=False, get_grants=False,
     person['positions'] = []
     person['degrees'] = []
     triples = get_triples(person_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#primaryPhoneNumber":
-            person['primary_phone_number'] = o
-        if p == "http://vivoweb.org/ontology/core#primaryEmail":
-            person['primary_email'] = o
-        if p == "http://vivoweb.org/ontology/core#faxNumber":
-            person['fax_number'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/ufid":
-            person['ufid'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/gatorlink":
-            person['gatorlink'] = o
-        if p == "http://vivoweb.org/ontology/core#eRACommonsId":
-            person['era_commons'] = o
-        if p == "http://vivoweb.org/ontology/core#overview":
-            person['overview'] = o
-        if p == "http://xmlns.com/foaf/0.1/firstName":
-            person['first_name'] = o
-        if p == "http://xmlns.com/foaf/0.1/lastName":
-            person['last_name'] = o
-        if p == "http://vivoweb.org/ontology/core#middleName":
-            person['middle_name'] = o
-        if p == "http://purl.org/ontology/bibo#prefixName":
-            person['name_prefix'] = o
-        if p == "http://purl.org/ontology/bibo#suffixName":
-            person['name_suffix'] = o
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            person['display_name'] = o
-        if p == "http://vivoweb.org/ontology/core#preferredTitle":
-            person['preferred_title'] = o
-        if p == "http://vivoweb.org/ontology/core#faxNumber":
-            person['fax_number'] = o
-        if p == "http://vivoweb.org/ontology/core#educationalTraining":
-            person['degree_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#authorInAuthorship":
-            person['authorship_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#hasPrincipalInvestigatorRole":
-            person['pi_role_uris'].append(o)
-        if p == \
-            "http://vivoweb.org/ontology/core#hasCo-PrincipalInvestigatorRole":
-            person['coi_role_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#hasInvestigatorRole":
-            person['inv_role_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#hasTeacherRole":
-            person['teaching_role_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#personInPosition":
-            person['position_uris'].append(o)
-
-        # deref the home department
-
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/homeDept":
-            person['home_dept_uri'] = o
-            home_department = get_organization(o)
-            if 'label' in home_department: # home department might be incomplete
-                person['home_department_name'] = home_department['label']
-        i = i + 1
+    parse_triples(person, triples, 'person')
 
     # deref the authorships
 
     if get_publications:
-        for authorship_uri in person['authorship_uris']:
-            authorship = get_authorship(authorship_uri)
-            if 'publication_uri' in authorship: # authorship might be incomplete
-                publication = get_publication(authorship['publication_uri'])
+        for publication in _deref_map(_publication_of_authorship,
+                                      person['authorship_uris']):
+            if publication is not None:
                 person['publications'].append(publication)
 
     # deref the investigator roles
 
     if get_grants:
-        for role_uri in person['pi_role_uris']:
-            role = get_role(role_uri)
-            if 'grant_uri' in role:  # some roles are broken
-                grant = get_grant(role['grant_uri'])
-                grant['role'] = 'pi'
-                person['grants'].append(grant)
-        for role_uri in person['coi_role_uris']:
-            role = get_role(role_uri)
-            if 'grant_uri' in role:  # some roles are broken
-                grant = get_grant(role['grant_uri'])
-                grant['role'] = 'coi'
-                person['grants'].append(grant)
-        for role_uri in person['inv_role_uris']:
-            role = get_role(role_uri)
-            if 'grant_uri' in role:  # some roles are broken
-                grant = get_grant(role['grant_uri'])
-                grant['role'] = 'inv'
+        roles = [[role_uri, 'pi'] for role_uri in person['pi_role_uris']] + \
+            [[role_uri, 'coi'] for role_uri in person['coi_role_uris']] + \
+            [[role_uri, 'inv'] for role_uri in person['inv_role_uris']]
+        for grant in _deref_map(_grant_of_role, roles):
+            if grant is not None:
                 person['grants'].append(grant)
 
     # deref the positions
 
     if get_positions:
-        for position_uri in person['position_uris']:
-            position = get_position(position_uri)
-            person['positions'].append(position)
+        person['positions'] = _deref_map(get_position,
+                                         person['position_uris'])
 
     # deref the degrees
 
     if get_degrees:
-        for degree_uri in person['degree_uris']:
-            degree = get_degree(degree_uri)
-            person['degrees'].append(degree)
+        person['degrees'] = _deref_map(get_degree, person['degree_uris'])
 
     # deref the teaching roles
     return person
@@ -1188,42 +2311,7 @@ def get_degree(degree_uri):
     """
     degree = {'degree_uri':degree_uri}
     triples = get_triples(degree_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#majorField":
-            degree['major_field'] = o
-
-        # deref the academic degree
-
-        if p == "http://vivoweb.org/ontology/core#degreeEarned":
-            degree['earned_uri'] = o
-            degree['degree_name'] = get_vivo_value(o, 'core:abbreviation')
-
-        # deref the Institution
-
-        if p == "http://vivoweb.org/ontology/core#trainingAtOrganization":
-            degree['training_institution_uri'] = o
-            institution = get_organization(o)
-            if 'label' in institution: # home department might be incomplete
-                degree['institution_name'] = institution['label']
-
-        # deref the datetime interval
-
-        if p == "http://vivoweb.org/ontology/core#dateTimeInterval":
-            datetime_interval = get_datetime_interval(o)
-            degree['datetime_interval'] = datetime_interval
-            if 'start_date' in datetime_interval:
-                degree['start_date'] = datetime_interval['start_date']
-            if 'end_date' in datetime_interval:
-                degree['end_date'] = datetime_interval['end_date']
-        i = i + 1
+    parse_triples(degree, triples, 'degree')
     return degree
 
 def get_role(role_uri):
@@ -1235,29 +2323,7 @@ def get_role(role_uri):
     """
     role = {'role_uri':role_uri}
     triples = get_triples(role_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#roleIn":
-            role['grant_uri'] = o
-        if p == "http://vivoweb.org/ontology/core#roleContributesTo":
-            role['grant_uri'] = o
-        if p == 'http://vivoweb.org/ontology/core#' \
-            'co-PrincipalInvestigatorRoleOf':
-            role['co_principal_investigator_role_of'] = o
-        if p == 'http://vivoweb.org/ontology/core#' \
-            'principalInvestigatorRoleOf':
-            role['principal_investigator_role_of'] = o
-        if p == 'http://vivoweb.org/ontology/core#' \
-            'investigatorRoleOf':
-            role['investigator_role_of'] = o
-        i = i + 1
+    parse_triples(role, triples, 'role')
     return role
 
 
@@ -1267,24 +2333,7 @@ def get_authorship(authorship_uri):
     """
     authorship = {'authorship_uri':authorship_uri}
     triples = get_triples(authorship_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#authorRank":
-            authorship['author_rank'] = o
-        if p == "http://vivoweb.org/ontology/core#linkedAuthor":
-            authorship['author_uri'] = o
-        if p == "http://vivoweb.org/ontology/core#linkedInformationResource":
-            authorship['publication_uri'] = o
-        if p == "http://vivoweb.org/ontology/core#isCorrespondingAuthor":
-            authorship['corresponding_author'] = o
-        i = i + 1
+    parse_triples(authorship, triples, 'authorship')
     return authorship
 
 def get_webpage(webpage_uri):
@@ -1293,28 +2342,7 @@ def get_webpage(webpage_uri):
     """
     webpage = {'webpage_uri':webpage_uri}
     triples = get_triples(webpage_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#webpageOf":
-            webpage['webpage_of'] = o
-        if p == "http://vivoweb.org/ontology/core#rank":
-            webpage['rank'] = o
-        if p == "http://vivoweb.org/ontology/core#linkURI":
-            webpage['link_uri'] = o
-        if p == "http://vivoweb.org/ontology/core#rank":
-            webpage['rank'] = o
-        if p == "http://vivoweb.org/ontology/core#linkAnchorText":
-            webpage['link_anchor_text'] = o
-        if o == "http://vivoweb.org/ontology/ufVivo#FullTextURI":
-            webpage['link_type'] = "full_text"
-        i = i + 1
+    parse_triples(webpage, triples, 'webpage')
     return webpage
 
 def get_position(position_uri):
@@ -1323,75 +2351,25 @@ def get_position(position_uri):
     """
     position = {'position_uri':position_uri} # include position_uri
     triples = get_triples(position_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#positionForPerson":
-            position['person_uri'] = o
-        if p == "http://vivoweb.org/ontology/core#hrJobTitle":
-            position['hr_title'] = o
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            position['position_label'] = o
-        if o == "http://vivoweb.org/ontology/core#FacultyPosition":
-            position['position_type'] = 'faculty'
-        if o == "http://vivoweb.org/ontology/core#Non-FacultyAcademicPosition":
-            position['position_type'] = 'non-faculty'
-        if o == "http://vivoweb.org/ontology/ufVivo#ClinicalFacultyPosition":
-            position['position_type'] = 'clinical-faculty'
-        if o == "http://vivoweb.org/ontology/ufVivo#PostDocPosition":
-            position['position_type'] = 'post-doc'
-        if o == "http://vivoweb.org/ontology/core#LibrarianPosition":
-            position['position_type'] = 'librarian'
-        if o == "http://vivoweb.org/ontology/core#Non-AcademicPosition":
-            position['position_type'] = 'non-academic'
-        if o == "http://vivoweb.org/ontology/ufVivo#StudentAssistant":
-            position['position_type'] = 'student-assistant'
-        if o == "http://vivoweb.org/ontology/ufVivo#GraduateAssistant":
-            position['position_type'] = 'graduate-assistant'
-        if o == "http://vivoweb.org/ontology/ufVivo#Housestaff":
-            position['position_type'] = 'housestaff'
-        if o == "http://vivoweb.org/ontology/ufVivo#TemporaryFaculty":
-            position['position_type'] = 'temp-faculty'
-        if o == "http://vivoweb.org/ontology/ufVivo#Housestaff":
-            position['position_type'] = 'housestaff'
-        if o == \
-            "http://vivoweb.org/ontology/core#FacultyAdministrativePosition":
-            position['position_type'] = 'faculty-administrative'
-
-        # deref the Organization
-
-        if p == "http://vivoweb.org/ontology/core#positionInOrganization":
-            position['org_uri'] = o
-            org = get_organization(o)
-            if 'label' in org: # org might be incomplete
-                position['org_name'] = org['label']
-
-        # deref datetime interval
-
-        if p == "http://vivoweb.org/ontology/core#dateTimeInterval":
-            datetime_interval = get_datetime_interval(o)
-            position['datetime_interval'] = datetime_interval
-            if 'start_date' in datetime_interval:
-                position['start_date'] = datetime_interval['start_date']
-            if 'end_date' in datetime_interval:
-                position['end_date'] = datetime_interval['end_date']
-        i = i + 1
+    parse_triples(position, triples, 'position')
     return position
 
-def get_publication(publication_uri, get_authors=True):
+def get_publication(publication_uri, get_authors=True, prefetch=False):
     """
     Given a URI, return an object that contains the publication it represents.
     We have to dereference the publication venue to get the journal name, and
     the datetime value to get the date of publication.
 
     The resulting object can be displayed using string_from_document
+
+    With prefetch=True, the publication and the entities it dereferences are
+    fetched with get_graph in a few queries
     """
+    if prefetch:
+        graph = get_graph([publication_uri], 'publication',
+                          {'get_authors': get_authors})
+        return with_graph(graph, get_publication, publication_uri,
+                          get_authors)
     publication = {'publication_uri':publication_uri} #include the uri
     triples = get_triples(publication_uri)
     publication['grants_cited'] = []
@@ -1400,84 +2378,7 @@ def get_publication(publication_uri, get_authors=True):
     publication['authorship_uris'] = []
     publication['author_uris'] = []
     publication['authors'] = []
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-
-        if p == "http://purl.org/ontology/bibo/doi":
-            publication['doi'] = o
-        if p == "http://purl.org/ontology/bibo/pmid":
-            publication['pmid'] = o
-        if p == "http://purl.org/ontology/bibo/abstract":
-            publication['abstract'] = o
-        if p == "http://vivoweb.org/ontology/core#pmcid":
-            publication['pmcid'] = o
-        if p == "http://vivoweb.org/ontology/core#nihmsid":
-            publication['nihmsid'] = o
-        if o == "http://purl.org/ontology/bibo/AcademicArticle":
-            publication['publication_type'] = 'academic-article'
-        if o == "http://purl.org/ontology/bibo/Book":
-            publication['publication_type'] = 'book'
-        if o == "http://purl.org/ontology/bibo/Chapter":
-            publication['publication_type'] = 'chapter'
-        if o == "http://vivoweb.org/ontology/core#ConferencePaper":
-            publication['publication_type'] = 'conference-paper'
-        if o == "http://vivoweb.org/ontology/core#ConferencePoster":
-            publication['publication_type'] = 'conference-poster'
-        if p == "http://vivoweb.org/ontology/core#freeTextKeyword":
-            publication['keyword_list'].append(o)
-        if p == "http://vivoweb.org/ontology/ufVivo#grantCited":
-            publication['grants_cited'].append(o)
-        if p == "http://vivoweb.org/ontology/core#hasSubjectArea":
-            publication['concept_uris'].append(o)
-        if p == \
-            "http://vivoweb.org/ontology/core#informationResourceInAuthorship":
-            publication['authorship_uris'].append(o)
-        if p == "http://vivoweb.org/ontology/core#webPage":
-            publication['web_page'] = o
-        if p == "http://purl.org/ontology/bibo/pageStart":
-            publication['page_start'] = o
-        if p == "http://purl.org/ontology/bibo/pageEnd":
-            publication['page_end'] = o
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            publication['title'] = o
-        if p == "http://purl.org/ontology/bibo/volume":
-            publication['volume'] = o
-        if p == "http://purl.org/ontology/bibo/number":
-            publication['number'] = o
-
-        # deref the web page (does not handle multiple web pages)
-
-        if p == "http://vivoweb.org/ontology/core#webPage":
-            publication['web_page'] = get_webpage(o)
-            if 'link_type' in web_page and web_page['link_type'] == \
-               'full_text_uri':
-                publication['full_text_uri'] = web_page['link_uri']
-
-        # deref the publication_venue
-
-        if p == "http://vivoweb.org/ontology/core#hasPublicationVenue":
-            publication_venue = get_publication_venue(o)
-            try:
-                publication['journal'] = publication_venue['label']
-            except:
-                pass
-
-        # deref the datetime
-
-        if p == "http://vivoweb.org/ontology/core#dateTimeValue":
-            datetime_value = get_datetime_value(o)
-            try:
-                publication['date'] = datetime_value['date']
-            except:
-                pass
-        i = i + 1
+    parse_triples(publication, triples, 'publication')
 
     # deref the authorships
 
@@ -1509,40 +2410,23 @@ def get_datetime_value(datetime_value_uri):
     """
     datetime_value = {'datetime_value_uri':datetime_value_uri}
     triples = get_triples(datetime_value_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#dateTime":
-            datetime_value['datetime'] = o
-            year = o[0:4]
-            month = o[5:7]
-            day = o[8:10]
-        if p == "http://vivoweb.org/ontology/core#dateTimePrecision":
-            datetime_value['datetime_precision'] = o
-            if datetime_value['datetime_precision'] == \
-                "http://vivoweb.org/ontology/core#yearPrecision":
-                datetime_value['datetime_precision'] = 'year'
-            if datetime_value['datetime_precision'] == \
-                "http://vivoweb.org/ontology/core#yearMonthPrecision":
-                datetime_value['datetime_precision'] = 'year_month'
-            if datetime_value['datetime_precision'] == \
-                "http://vivoweb.org/ontology/core#yearMonthDayPrecision":
-                datetime_value['datetime_precision'] = 'year_month_day'
-        if 'datetime' in datetime_value and 'datetime_precision' in \
-            datetime_value:
-            if datetime_value['datetime_precision'] == "year":
-                datetime_value['date'] = {'year':year}
-            if datetime_value['datetime_precision'] == "year_month":
-                datetime_value['date'] = {'year':year, 'month':month}
-            if datetime_value['datetime_precision'] == "year_month_day":
-                datetime_value['date'] = {'year':year, 'month':month, 'day':day}
-        i = i + 1
+    parse_triples(datetime_value, triples, 'datetime_value')
+    if 'datetime_precision' in datetime_value:
+        precision = datetime_value['datetime_precision']
+        datetime_value['datetime_precision'] = \
+            datetime_precisions.get(precision, precision)
+    if 'datetime' in datetime_value and 'datetime_precision' in \
+        datetime_value:
+        o = datetime_value['datetime']
+        year = o[0:4]
+        month = o[5:7]
+        day = o[8:10]
+        if datetime_value['datetime_precision'] == "year":
+            datetime_value['date'] = {'year':year}
+        if datetime_value['datetime_precision'] == "year_month":
+            datetime_value['date'] = {'year':year, 'month':month}
+        if datetime_value['datetime_precision'] == "year_month_day":
+            datetime_value['date'] = {'year':year, 'month':month, 'day':day}
     return datetime_value
 
 def get_datetime_interval(datetime_interval_uri):
@@ -1552,22 +2436,7 @@ def get_datetime_interval(datetime_interval_uri):
     """
     datetime_interval = {'datetime_interval_uri':datetime_interval_uri}
     triples = get_triples(datetime_interval_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://vivoweb.org/ontology/core#start":
-            datetime_value = get_datetime_value(o)
-            datetime_interval['start_date'] = datetime_value
-        if p == "http://vivoweb.org/ontology/core#end":
-            datetime_value = get_datetime_value(o)
-            datetime_interval['end_date'] = datetime_value
-        i = i + 1
+    parse_triples(datetime_interval, triples, 'datetime_interval')
     return datetime_interval
 
 
@@ -1578,26 +2447,20 @@ def get_publication_venue(publication_venue_uri):
     """
     publication_venue = {'publication_venue_uri':publication_venue_uri}
     triples = get_triples(publication_venue_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']['value']
-        if p == "http://purl.org/ontology/bibo/issn":
-            publication_venue['issn'] = o
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            publication_venue['label'] = o
-        i = i + 1
+    parse_triples(publication_venue, triples, 'publication_venue')
     return publication_venue
 
-def get_grant(grant_uri, get_investigators=False):
+def get_grant(grant_uri, get_investigators=False, prefetch=False):
     """
     Given a URI, return an object that contains the grant it represents
+
+    With prefetch=True, the grant and the entities it dereferences are
+    fetched with get_graph in a few queries
     """
+    if prefetch:
+        graph = get_graph([grant_uri], 'grant',
+                          {'get_investigators': get_investigators})
+        return with_graph(graph, get_grant, grant_uri, get_investigators)
     grant = {'grant_uri':grant_uri}
     grant['contributing_role_uris'] = []
     grant['pi_uris'] = []
@@ -1606,71 +2469,13 @@ def get_grant(grant_uri, get_investigators=False):
     grant['role_uris'] = {}
     grant['investigators'] = []
     triples = get_triples(grant_uri)
-    try:
-        count = len(triples["results"]["bindings"])
-    except:
-        count = 0
-    i = 0
-    while i < count:
-        b = triples["results"]["bindings"][i]
-        p = b['p']['value']
-        o = b['o']
-        if p == "http://www.w3.org/2000/01/rdf-schema#label":
-            grant['title'] = o
-        if p == "http://vivoweb.org/ontology/core#totalAwardAmount":
-            grant['total_award_amount'] = o
-        if p == "http://vivoweb.org/ontology/core#grantDirectCosts":
-            grant['grant_direct_costs'] = o
-        if p == "http://purl.org/ontology/bibo/abstract":
-            grant['abstract'] = o
-        if p == "http://vivoweb.org/ontology/core#sponsorAwardId":
-            grant['sponsor_award_id'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/dsrNumber":
-            grant['dsr_number'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/psContractNumber":
-            grant['pcn'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/dateHarvested":
-            grant['date_harvested'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/harvestedBy":
-            grant['harvested_by'] = o
-        if p == "http://vivo.ufl.edu/ontology/vivo-ufl/localAwardId":
-            grant['local_award_id'] = o
-        if p == "http://vivoweb.org/ontology/core#contributingRole":
-            grant['contributing_role_uris'].append(o['value'])
-        
-        # deref administered by
-
-        if p == "http://vivoweb.org/ontology/core#administeredBy":
-            grant['administered_by_uri'] = o['value']
-            administered_by = get_organization(o['value'])
-            if 'label' in administered_by:
-                grant['administered_by'] = administered_by['label']
-
-        # deref awarded by
-
-        if p == "http://vivoweb.org/ontology/core#grantAwardedBy":
-            grant['sponsor_uri'] = o['value']
-            awarded_by = get_organization(o['value'])
-            if 'label' in awarded_by:
-                grant['awarded_by'] = awarded_by['label']
-
-        # deref the datetime interval
-
-        if p == "http://vivoweb.org/ontology/core#dateTimeInterval":
-            grant['dti_uri'] = o['value']
-            datetime_interval = get_datetime_interval(o['value'])
-            grant['datetime_interval'] = datetime_interval
-            if 'start_date' in datetime_interval:
-                grant['start_date'] = datetime_interval['start_date']
-            if 'end_date' in datetime_interval:
-                grant['end_date'] = datetime_interval['end_date']
-
-        i = i + 1
+    parse_triples(grant, triples, 'grant')
 
     # deref the roles
 
-    for role_uri in grant['contributing_role_uris']:
-        role = get_role(role_uri)
+    roles = _deref_map(get_role, grant['contributing_role_uris'])
+    for role in roles:
+        role_uri = role['role_uri']
         if 'principal_investigator_role_of' in role:
             pi_uri = role['principal_investigator_role_of']
             if pi_uri not in grant['pi_uris']:
@@ -1690,25 +2495,70 @@ def get_grant(grant_uri, get_investigators=False):
     # deref the investigators
 
     if get_investigators == True:
-        for role_uri in grant['contributing_role_uris']:
-            role = get_role(role_uri)
+        investigators = []
+        for role in roles:
             if 'co_principal_investigator_role_of' in role:
-                person = \
-                    get_person(role['co_principal_investigator_role_of'])
-                person['role'] = 'co_principal_investigator'
-                grant['investigators'].append(person)
+                investigators.append([
+                    role['co_principal_investigator_role_of'],
+                    'co_principal_investigator'])
             if 'principal_investigator_role_of' in role:
-                person = \
-                    get_person(role['principal_investigator_role_of'])
-                person['role'] = 'principal_investigator'
-                grant['investigators'].append(person)
+                investigators.append([role['principal_investigator_role_of'],
+                                      'principal_investigator'])
             if 'investigator_role_of' in role:
-                person = \
-                    get_person(role['investigator_role_of'])
-                person['role'] = 'investigator'
-                grant['investigators'].append(person)
+                investigators.append([role['investigator_role_of'],
+                                      'investigator'])
+        grant['investigators'] = _deref_map(_investigator, investigators)
     return grant
 
+def _get_many(function, uris, kind, options, chunk_size):
+    """
+    Given an accessor function and an iterable of URIs of the kind it
+    accesses, return a dictionary of the entities keyed by URI.  The URIs
+    are taken chunk_size at a time and the graph of each chunk is fetched
+    with get_graph, so memory is bounded by the size of a chunk.
+    """
+    uris = list(uris)
+    entities = {}
+    i = 0
+    while i < len(uris):
+        chunk = uris[i:i+chunk_size]
+        i = i + chunk_size
+        graph = get_graph(chunk, kind, options, chunk_size)
+        for uri in chunk:
+            entities[uri] = with_graph(graph, function, uri, **options)
+    return entities
+
+def get_people(person_uris, get_publications=False, get_grants=False,
+               get_positions=False, get_degrees=False, chunk_size=100):
+    """
+    Given an iterable of person URIs, return a dictionary keyed by URI of the
+    people they represent, each as returned by get_person.  Triples are
+    fetched for chunk_size URIs at a time rather than one query per URI
+    """
+    options = {'get_publications': get_publications,
+               'get_grants': get_grants, 'get_positions': get_positions,
+               'get_degrees': get_degrees}
+    return _get_many(get_person, person_uris, 'person', options, chunk_size)
+
+def get_publications(publication_uris, get_authors=True, chunk_size=100):
+    """
+    Given an iterable of publication URIs, return a dictionary keyed by URI of
+    the publications they represent, each as returned by get_publication.
+    Triples are fetched for chunk_size URIs at a time rather than one query
+    per URI
+    """
+    return _get_many(get_publication, publication_uris, 'publication',
+                     {'get_authors': get_authors}, chunk_size)
+
+def get_grants(grant_uris, get_investigators=False, chunk_size=100):
+    """
+    Given an iterable of grant URIs, return a dictionary keyed by URI of the
+    grants they represent, each as returned by get_grant.  Triples are
+    fetched for chunk_size URIs at a time rather than one query per URI
+    """
+    return _get_many(get_grant, grant_uris, 'grant',
+                     {'get_investigators': get_investigators}, chunk_size)
+
 def string_from_grant(grant):
     """
     Given a grant object, return a string representing the grant
@@ -1737,82 +2587,80 @@ def string_from_grant(grant):
         s = s + '\n' + grant['title']
     return s
 
-def make_concept_dictionary(debug=False):
+def _scan_bindings(query, page_size=None):
     """
-    Make a dictionary for concepts in UF VIVO.  Key is label.  Value is URI.
+    Return a generator of the bindings of a query.  The results are
+    streamed, or, given a page_size, fetched a page at a time
     """
+    if page_size is None:
+        return vivo_sparql_bindings(query)
+    else:
+        return vivo_sparql_pages(query, page_size)
 
-    global concept_dictionary
-    concept_dictionary = {}
-
-    query = tempita.Template("""
+_make_concept_dictionary_query = tempita.Template("""
         SELECT ?uri ?label WHERE
         {
         ?uri a skos:Concept .
         ?uri rdfs:label ?label .
         }""")
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+
+def make_concept_dictionary(debug=False, page_size=None):
+    """
+    Make a dictionary for concepts in UF VIVO.  Key is label.  Value is URI.
+    """
+
+    global concept_dictionary
+    concept_dictionary = {}
+
+    query = _make_concept_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+        print query
+    for b in _scan_bindings(query, page_size):
         label = b['label']['value']
         uri = b['uri']['value']
         concept_dictionary[label] = uri
-        i = i + 1
+    if debug:
+        print len(concept_dictionary), "entries"
     return concept_dictionary
 
 
-def make_concept_rdf(label):
-    """
-    Given a concept label, create a concept in VIVO
-    """
-    concept_template = tempita.Template("""
+_concept_template = tempita.Template("""
     <rdf:Description rdf:about="{{concept_uri}}">
         <rdf:type rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
         <rdf:type rdf:resource="http://www.w3.org/2004/02/skos/core#Concept"/>
         <rdfs:label>{{label}}</rdfs:label>
     </rdf:Description>""")
+
+def make_concept_rdf(label):
+    """
+    Given a concept label, create a concept in VIVO
+    """
     concept_uri = get_vivo_uri()
-    rdf = concept_template.substitute(concept_uri=concept_uri, \
+    rdf = _concept_template.substitute(concept_uri=concept_uri, \
         label=label)
     return [rdf, concept_uri]
 
-def make_deptid_dictionary(debug=False):
-    """
-    Make a dictionary for orgs in UF VIVO.  Key is DeptID.  Value is URI.
-    """
-    query = tempita.Template("""
+_make_deptid_dictionary_query = tempita.Template("""
     SELECT ?x ?deptid WHERE
     {
     ?x rdf:type foaf:Organization .
     ?x ufVivo:deptID ?deptid .
     }""")
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+
+def make_deptid_dictionary(debug=False, page_size=None):
+    """
+    Make a dictionary for orgs in UF VIVO.  Key is DeptID.  Value is URI.
+    """
+    query = _make_deptid_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     deptid_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         deptid = b['deptid']['value']
         uri = b['x']['value']
         deptid_dictionary[deptid] = uri
-        i = i + 1
+    if debug:
+        print len(deptid_dictionary), "entries"
     return deptid_dictionary
 
 def find_deptid(deptid, deptid_dictionary):
@@ -1829,33 +2677,26 @@ def find_deptid(deptid, deptid_dictionary):
     return [found, uri]
 
 
-def make_ufid_dictionary(debug=False):
-    """
-    Make a dictionary for people in UF VIVO.  Key is UFID.  Value is URI.
-    """
-    query = tempita.Template("""
+_make_ufid_dictionary_query = tempita.Template("""
     SELECT ?x ?ufid WHERE
     {
     ?x ufVivo:ufid ?ufid .
     }""")
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+
+def make_ufid_dictionary(debug=False, page_size=None):
+    """
+    Make a dictionary for people in UF VIVO.  Key is UFID.  Value is URI.
+    """
+    query = _make_ufid_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     ufid_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         ufid = b['ufid']['value']
         uri = b['x']['value']
         ufid_dictionary[ufid] = uri
-        i = i + 1
+    if debug:
+        print len(ufid_dictionary), "entries"
     return ufid_dictionary
 
 def find_person(ufid, ufid_dictionary):
@@ -1871,69 +2712,55 @@ def find_person(ufid, ufid_dictionary):
         found = False
     return [found, uri]
 
-def make_doi_dictionary(debug=False):
-    """
-    Extract all the dois of documents in VIVO and organize them into a
-    dictionary keyed by prepared label with value URI
-    """
-    query = tempita.Template("""
+_make_doi_dictionary_query = tempita.Template("""
     SELECT ?x ?doi WHERE
     {
     ?x rdf:type bibo:Document .
     ?x bibo:doi ?doi .
     }""")
+
+def make_doi_dictionary(debug=False, page_size=None):
+    """
+    Extract all the dois of documents in VIVO and organize them into a
+    dictionary keyed by prepared label with value URI
+    """
     doi_dictionary = {}
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+    query = _make_doi_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     doi_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         doi = b['doi']['value']
         uri = b['x']['value']
         doi_dictionary[doi] = uri
-        i = i + 1
+    if debug:
+        print len(doi_dictionary), "entries"
     return doi_dictionary
 
-def make_title_dictionary(debug=False):
-    """
-    Extract all the titles of documents in VIVO and organize them into a
-    dictionary keyed by prepared label with value URI
-    """
-    query = tempita.Template("""
+_make_title_dictionary_query = tempita.Template("""
     SELECT ?x ?label WHERE
     {
     ?x rdf:type bibo:Document .
     ?x rdfs:label ?label .
     }""")
+
+def make_title_dictionary(debug=False, page_size=None):
+    """
+    Extract all the titles of documents in VIVO and organize them into a
+    dictionary keyed by prepared label with value URI
+    """
     title_dictionary = {}
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+    query = _make_title_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     title_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         title = b['label']['value']
         key = key_string(title)
         uri = b['x']['value']
         title_dictionary[key] = uri
-        i = i + 1
+    if debug:
+        print len(title_dictionary), "entries"
     return title_dictionary
 
 def find_title(title, title_dictionary):
@@ -1950,36 +2777,29 @@ def find_title(title, title_dictionary):
         found = False
     return [found, uri]
 
-def make_publisher_dictionary(debug=False):
-    """
-    Extract all the publishers from VIVO and organize them into a dictionary
-    keyed by prepared label with value URI
-    """
-    query = tempita.Template("""
+_make_publisher_dictionary_query = tempita.Template("""
     SELECT ?x ?label WHERE
     {
     ?x rdf:type core:Publisher .
     ?x rdfs:label ?label .
     }""")
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+
+def make_publisher_dictionary(debug=False, page_size=None):
+    """
+    Extract all the publishers from VIVO and organize them into a dictionary
+    keyed by prepared label with value URI
+    """
+    query = _make_publisher_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     publisher_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         publisher = b['label']['value']
         key = key_string(publisher)
         uri = b['x']['value']
         publisher_dictionary[key] = uri
-        i = i + 1
+    if debug:
+        print len(publisher_dictionary), "entries"
     return publisher_dictionary
 
 def find_publisher(publisher, publisher_dictionary):
@@ -1997,35 +2817,28 @@ def find_publisher(publisher, publisher_dictionary):
         found = False
     return [found, uri]
 
-def make_journal_dictionary(debug=False):
-    """
-    Extract all the journals from VIVO and organize them into a dictionary
-    keyed by ISSN with value URI
-    """
-    query = tempita.Template("""
+_make_journal_dictionary_query = tempita.Template("""
     SELECT ?x ?issn WHERE
     {
     ?x rdf:type bibo:Journal .
     ?x bibo:issn ?issn .
     }""")
-    query = query.substitute()
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+
+def make_journal_dictionary(debug=False, page_size=None):
+    """
+    Extract all the journals from VIVO and organize them into a dictionary
+    keyed by ISSN with value URI
+    """
+    query = _make_journal_dictionary_query.substitute()
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
+        print query
     journal_dictionary = {}
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+    for b in _scan_bindings(query, page_size):
         issn = b['issn']['value']
         uri = b['x']['value']
         journal_dictionary[issn] = uri
-        i = i + 1
+    if debug:
+        print len(journal_dictionary), "entries"
     return journal_dictionary
 
 def find_journal(issn, journal_dictionary):
@@ -2041,32 +2854,25 @@ def find_journal(issn, journal_dictionary):
         found = False
     return [found, uri]
 
+_make_date_dictionary_query = tempita.Template("""
+    SELECT ?uri ?dt
+    WHERE {
+      ?uri vivo:dateTimePrecision {{datetime_precision}} .
+      ?uri vivo:dateTime ?dt .
+    }""")
+
 def make_date_dictionary(datetime_precision="vivo:yearMonthDayPrecision",
-                              debug=False):
+                              debug=False, page_size=None):
     """
     Given a VIVO datetime precision, return a dictionary of the URI for each
     date value.
     """
     date_dictionary = {}
-    query = tempita.Template("""
-    SELECT ?uri ?dt
-    WHERE {
-      ?uri vivo:dateTimePrecision {{datetime_precision}} .
-      ?uri vivo:dateTime ?dt .
-    }""")
-    query = query.substitute(datetime_precision=datetime_precision)
-    result = vivo_sparql_query(query)
-    try:
-        count = len(result["results"]["bindings"])
-    except:
-        count = 0
+    query = _make_date_dictionary_query.substitute(
+        datetime_precision=datetime_precision)
     if debug:
-        print query, count, result["results"]["bindings"][0], \
-            result["results"]["bindings"][1]
-    #
-    i = 0
-    while i < count:
-        b = result["results"]["bindings"][i]
+        print query
+    for b in _scan_bindings(query, page_size):
         if datetime_precision == "vivo:yearPrecision":
             dt = b['dt']['value'][0:4]
             dtv = datetime.strptime(dt, '%Y')
@@ -2078,20 +2884,11 @@ def make_date_dictionary(datetime_precision="vivo:yearMonthDayPrecision",
             dtv = datetime.strptime(dt, '%Y-%m-%d')
         uri = b['uri']['value']
         date_dictionary[dtv] = uri
-        i = i + 1
+    if debug:
+        print len(date_dictionary), "entries"
     return date_dictionary
 
-def make_webpage_rdf(full_text_uri, \
-    uri_type="http://vivo.ufl.edu/ontology/vivo-ufl/FullTextURL", \
-    link_anchor_text="PubMed Central Full Text Link", rank="1", \
-    harvested_by="Python PubMed 1.0"):
-    """
-    Given a uri, create a web page entity with the uri, rank and
-    anchor text, harvested_by specified
-    """
-    if full_text_uri is None:
-        return ["", None]
-    full_text_url_rdf_template = tempita.Template("""
+_full_text_url_rdf_template = tempita.Template("""
     <rdf:Description rdf:about="{{webpage_uri}}">
         <rdf:type rdf:resource="http://www.w3.org/2002/07/owl#Thing"/>
         <rdf:type rdf:resource="http://vivoweb.org/ontology/core#URLLink"/>
@@ -2102,9 +2899,20 @@ def make_webpage_rdf(full_text_uri, \
         <ufVivo:harvestedBy>{{harvested_by}}</ufVivo:harvestedBy>
         <ufVivo:dateHarvested>{{harvest_datetime}}</ufVivo:dateHarvested>
     </rdf:Description>""")
+
+def make_webpage_rdf(full_text_uri, \
+    uri_type="http://vivo.ufl.edu/ontology/vivo-ufl/FullTextURL", \
+    link_anchor_text="PubMed Central Full Text Link", rank="1", \
+    harvested_by="Python PubMed 1.0"):
+    """
+    Given a uri, create a web page entity with the uri, rank and
+    anchor text, harvested_by specified
+    """
+    if full_text_uri is None:
+        return ["", None]
     webpage_uri = get_vivo_uri()
     harvest_datetime = make_harvest_datetime()
-    rdf = full_text_url_rdf_template.substitute(webpage_uri=webpage_uri, \
+    rdf = _full_text_url_rdf_template.substitute(webpage_uri=webpage_uri, \
         full_text_uri=full_text_uri, \
         rank=rank, \
         uri_type=uri_type, \
@@ -2113,15 +2921,7 @@ def make_webpage_rdf(full_text_uri, \
         harvest_datetime=harvest_datetime)
     return [rdf, webpage_uri]
 
-def catalyst_pmid_request(first, middle, last, email, debug=False):
-    """
-    Give an author name at the University of Florida, return the PMIDs of
-    papers that are likely to be the works of the author.  The Harvard
-    Catalyst GETPMIDS service is called.
-
-    Uses HTTP XML Post request, by www.forceflow.be
-    """
-    request = tempita.Template("""
+_catalyst_request = tempita.Template("""
         <?xml version="1.0"?>
         <FindPMIDs>
             <Name>
@@ -2141,10 +2941,20 @@ def catalyst_pmid_request(first, middle, last, email, debug=False):
             <RequireFirstName>false</RequireFirstName>
             <MatchThreshold>0.98</MatchThreshold>
         </FindPMIDs>""")
+
+def catalyst_pmid_request(first, middle, last, email, debug=False):
+    """
+    Give an author name at the University of Florida, return the PMIDs of
+    papers that are likely to be the works of the author.  The Harvard
+    Catalyst GETPMIDS service is called.
+
+    Uses HTTP XML Post request, by www.forceflow.be
+    """
     HOST = "profiles.catalyst.harvard.edu"
     API_URL = "/services/GETPMIDs/default.asp"
-    request = request.substitute(first=first, middle=middle, last=last, \
-        email=email)
+    request = _catalyst_request.substitute(first=first, middle=middle,
+        last=last, email=email)
+    start = time.time()
     webservice = httplib.HTTP(HOST)
     webservice.putrequest("POST", API_URL)
     webservice.putheader("Host", HOST)
@@ -2155,6 +2965,9 @@ def catalyst_pmid_request(first, middle, last, email, debug=False):
     webservice.send(request)
     statuscode, statusmessage, header = webservice.getreply()
     result = webservice.getfile().read()
+    if network_metrics is not None:
+        network_metrics.record('catalyst', _caller(), time.time() - start,
+                               len(result), 0, statuscode != 200)
     if debug:
         print "Request", request
         print "StatusCode, Messgage,header", statuscode, statusmessage, header
@@ -2163,26 +2976,29 @@ def catalyst_pmid_request(first, middle, last, email, debug=False):
 
 def document_from_pubmed(record):
     """
-    Given a record returned by Entrez for a document in pubmed, pull it apart
-    keeping only the data elements useful for VIVO
+    Given a record for a document in pubmed, either an article as returned
+    by get_pubmed_records or a record returned by Entrez.parse, pull it
+    apart keeping only the data elements useful for VIVO
     """
+    if 'MedlineCitation' in record:
+        article = _article_from_record(record)
+    else:
+        article = record
     d = {}
-    d['title'] = record['MedlineCitation']['Article']['ArticleTitle']
-    d['date'] = {'month': record['PubmedData']['History'][0]['Month'],
-        'day'  : record['PubmedData']['History'][0]['Day'],
-        'year' : record['PubmedData']['History'][0]['Year']}
-    d['journal'] = record['MedlineCitation']['Article']['Journal']['Title']
+    d['title'] = article['title']
+    if article['date'] is not None:
+        d['date'] = article['date']
+    d['journal'] = article['journal']
 
-    author_list = list(record['MedlineCitation']['Article']['AuthorList'])
     authors = {}
     i = 0
-    for author in author_list:
+    for author in article['authors']:
         i = i + 1
-        first = author['ForeName']
+        first = author['first'] or ""
         if first.find(' ') >= 0:
             first = first[:first.find(' ')]
-        last = author['LastName']
-        middle = author['Initials']
+        last = author['last']
+        middle = author['initials'] or ""
         if len(middle) == 2:
             middle = str(middle[1])
         else:
@@ -2191,25 +3007,19 @@ def document_from_pubmed(record):
         authors[key] = {'first':first, 'middle':middle, 'last':last}
     d['authors'] = authors
 
-    d['volume'] = record['MedlineCitation']['Article']\
-        ['Journal']['JournalIssue']['Volume']
-    try:
-        d['issue'] = record['MedlineCitation']['Article']['Journal']\
-            ['JournalIssue']['Issue']
-    except:
-        pass
-    d['issn'] = str(record['MedlineCitation']['Article']['Journal']['ISSN'])
-
-    article_id_list = record['PubmedData']['ArticleIdList']
-    for article_id in article_id_list:
-        attributes = article_id.attributes
-        if 'IdType' in attributes:
-            if attributes['IdType'] == 'pubmed':
-                d['pmid'] = str(article_id)
-            elif attributes['IdType'] == 'doi':
-                d['doi'] = str(article_id)
-
-    pages = record['MedlineCitation']['Article']['Pagination']['MedlinePgn']
+    if article['volume'] is not None:
+        d['volume'] = article['volume']
+    if article['issue'] is not None:
+        d['issue'] = article['issue']
+    if article['issn'] is not None:
+        d['issn'] = str(article['issn'])
+
+    if 'pubmed' in article['ids']:
+        d['pmid'] = article['ids']['pubmed']
+    if 'doi' in article['ids']:
+        d['doi'] = article['ids']['doi']
+
+    pages = article['pages'] or ""
     pages_list = pages.split('-')
     try:
         start = pages_list[0]
@@ -2291,50 +3101,63 @@ def make_harvest_datetime():
     dt = datetime.now()
     return dt.isoformat()
 
-def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
+def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True, sink=None):
     """
     Given the uri of a pub in VIVO and a module concept dictionary,
     update the PubMed attributes for the paper, and include RDF
-    to add to the concept dictionary if necessary
+    to add to the concept dictionary if necessary.
+
+    With a sink, such as an RDFFileWriter, the RDF is written to the sink as
+    it is made and the sink is returned.
+
+    A paper not in PubMed has no RDF.  If Entrez does not answer,
+    PubmedUnavailable is thrown, so the paper can be tried again.
     """
-    ardf = ""
-    srdf = ""
+    if sink is None:
+        return update_pubmed(pub_uri, doi, pmid, inVivo, RDFBuffer()).rdf()
     if inVivo:
 
     # Get the paper's attributes from VIVO
 
         pub = get_publication(pub_uri)
         if 'doi' not in pub and doi is None:
-            return ["", ""]
+            return sink
         elif doi is None:
             doi = pub['doi']
-        if 'pmid' not in pub:
-            pub['pmid'] = None
-        if 'pmcid' not in pub:
-            pub['pmcid'] = None
-        if 'nihmsid' not in pub:
-            pub['nihmsid'] = None
-        if 'abstract' not in pub:
-            pub['abstract'] = None
 
     else:
         pub = {}
         pub['pmid'] = pmid
         pub['doi'] = doi
         pub['pub_uri'] = pub_uri
-        pub['pmcid'] = None
-        pub['nihmsid'] = None
-        pub['abstract'] = None
 
     # Get the paper's attributes from PubMed
 
-    try:
-        values = get_pubmed_values(doi, pmid)
-    except:
-        return {}
+    values = get_pubmed_values(doi, pmid)
+    _update_pubmed_rdf(pub_uri, pub, values, sink)
+    return sink
+
+_concept_lock = threading.Lock()
 
+def _update_pubmed_rdf(pub_uri, pub, values, sink):
+    """
+    Given the uri of a pub in VIVO, the pub as returned by get_publication
+    and its values as returned by get_pubmed_values, write the add and sub
+    RDF to update the PubMed attributes of the pub to sink, including RDF
+    to add new concepts to VIVO and the concept dictionary.  values is {}
+    for a pub not in PubMed, which has no RDF.  None means PubMed was not
+    reached:  throw PubmedUnavailable
+    """
+    if values is None:
+        raise PubmedUnavailable("No PubMed values for " + pub_uri)
     if values == {}:
-        return ["", ""]
+        return
+
+    pub = dict(pub)
+    values = dict(values)
+    for key in ['pmid', 'pmcid', 'nihmsid', 'abstract']:
+        if key not in pub:
+            pub[key] = None
 
     if 'pmid' not in values:
         values['pmid'] = None
@@ -2347,43 +3170,43 @@ def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
 
     [add, sub] = update_data_property(pub_uri, "bibo:pmid", pub['pmid'],
                                           values['pmid'])
-    ardf = ardf + add
-    srdf = srdf + sub
+    sink.add(add)
+    sink.sub(sub)
 
     [add, sub] = update_data_property(pub_uri, "vivo:pmcid", pub['pmcid'],
                                           values['pmcid'])
-    ardf = ardf + add
-    srdf = srdf + sub
+    sink.add(add)
+    sink.sub(sub)
 
     [add, sub] = update_data_property(pub_uri, "vivo:nihmsid", pub['nihmsid'],
                                           values['nihmsid'])
-    ardf = ardf + add
-    srdf = srdf + sub
+    sink.add(add)
+    sink.sub(sub)
 
     [add, sub] = update_data_property(pub_uri, "bibo:abstract", pub['abstract'],
                                           values['abstract'])
-    ardf = ardf + add
-    srdf = srdf + sub
+    sink.add(add)
+    sink.sub(sub)
 
     # Process the keyword_list and link to concepts in VIVO. If the
     # concept is not in VIVO, add it
 
     if 'keyword_list' in values:
         for keyword in values['keyword_list']:
-            if keyword in concept_dictionary:
-                keyword_uri = concept_dictionary[keyword]
-                [add, sub] = update_resource_property(pub_uri, \
-                    "vivo:hasSubjectArea", None, keyword_uri)
-                ardf = ardf + add
-                srdf = srdf + sub
-            else:
-                [add, keyword_uri] = make_concept_rdf(keyword)
-                ardf = ardf + add
-                concept_dictionary[keyword] = keyword_uri
-                [add, sub] = update_resource_property(pub_uri, \
-                    "vivo:hasSubjectArea", None, keyword_uri)
-                ardf = ardf + add
-                srdf = srdf + sub
+
+            # One thread at a time, so a new concept is made only once
+
+            with _concept_lock:
+                if keyword in concept_dictionary:
+                    keyword_uri = concept_dictionary[keyword]
+                else:
+                    [add, keyword_uri] = make_concept_rdf(keyword)
+                    sink.add(add)
+                    concept_dictionary[keyword] = keyword_uri
+            [add, sub] = update_resource_property(pub_uri, \
+                "vivo:hasSubjectArea", None, keyword_uri)
+            sink.add(add)
+            sink.sub(sub)
 
     # Process the grants cited lists -- VIVO and PubMed
 
@@ -2397,21 +3220,21 @@ def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
             for grant in pub['grants_cited']:
                 [add, sub] = update_data_property(pub_uri, 'ufVivo:grantCited',
                                                     grant, None)
-                ardf = ardf + add
-                srdf = srdf + sub
+                sink.add(add)
+                sink.sub(sub)
         else:                                # Compare lists
             for grant in pub['grants_cited']:
                 if grant not in pubmed_grants_cited:
                     [add, sub] = update_data_property(pub_uri, \
                         'ufVivo:grantCited', grant, None) # remove from VIVO
-                    ardf = ardf + add
-                    srdf = srdf + sub
+                    sink.add(add)
+                    sink.sub(sub)
             for grant in pubmed_grants_cited:
                 if grant not in pub['grants_cited']:
                     [add, sub] = update_data_property(pub_uri, \
                         'ufVivo:grantCited', None, grant) # add to VIVO
-                    ardf = ardf + add
-                    srdf = srdf + sub
+                    sink.add(add)
+                    sink.sub(sub)
     else:
         if pubmed_grants_cited is None:    # No grants cited
             pass
@@ -2419,8 +3242,8 @@ def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
             for grant in pubmed_grants_cited:
                 [add, sub] = update_data_property(pub_uri, 'ufVivo:grantCited',
                                                     None, grant)
-                ardf = ardf + add
-                srdf = srdf + sub
+                sink.add(add)
+                sink.sub(sub)
 
     #  Web page for full text
 
@@ -2429,8 +3252,7 @@ def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
         if pub['full_text_uri'] == values['full_text_uri']:
             pass # both have same URI for full text, nothing to do
         else:
-            sub = remove_uri(pub['webpage']['webpage_uri'])
-            srdf = srdf + sub
+            remove_uri(pub['webpage']['webpage_uri'], sink)
 
     elif 'full_text_uri' in pub and 'full_text_uri' not in values:
         pass  # keep the VIVO full text URI, might not be PubMed Central
@@ -2441,34 +3263,352 @@ def update_pubmed(pub_uri, doi=None, pmid=None, inVivo=True):
 
         [add, webpage_uri] = \
             make_webpage_rdf(values['full_text_uri'])
-        ardf = ardf + add
+        sink.add(add)
 
         # Point the pub at the web page
 
         [add, sub] = update_resource_property(pub_uri, 'vivo:webpage', None,
             webpage_uri)
-        ardf = ardf + add
-        srdf = srdf + sub
+        sink.add(add)
+        sink.sub(sub)
 
         # Point the web page at the pub
 
         [add, sub] = update_resource_property(webpage_uri, 'vivo:webpageOf',
             None, pub_uri)
-        ardf = ardf + add
-        srdf = srdf + sub
+        sink.add(add)
+        sink.sub(sub)
 
     else:
         pass # Full text URI is not in VIVO and not in PubMed
 
-    return [ardf, srdf]
 
+_end_of_stream = object()
+
+def _pipeline_source(items, chunk_size, outbox, errors):
+    """
+    Put the items in outbox, chunk_size at a time, then the end of the
+    stream.  After an error, stop
+    """
+    try:
+        chunk = []
+        for item in items:
+            if len(errors) > 0:
+                break
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                outbox.put(chunk)
+                chunk = []
+        if len(chunk) > 0:
+            outbox.put(chunk)
+    except:
+        errors.append(sys.exc_info())
+    outbox.put(_end_of_stream)
+
+def _pipeline_stage(function, inbox, outbox, errors, budget):
+    """
+    Put function(chunk) in outbox for each chunk taken from inbox, then the
+    end of the stream.  After an error in any stage, chunks are taken and
+    dropped, so no stage waits on a full queue.  Retries are spent from
+    budget, the RetryBudget of the pipeline
+    """
+    _local_budget.budget = budget
+    while True:
+        chunk = inbox.get()
+        if chunk is _end_of_stream:
+            break
+        if len(errors) > 0:
+            continue
+        try:
+            outbox.put(function(chunk))
+        except:
+            errors.append(sys.exc_info())
+    outbox.put(_end_of_stream)
+
+def _pipeline_publications(uris):
+    publications = get_publications(uris, get_authors=False,
+                                    chunk_size=len(uris))
+    return [[uri, publications[uri]] for uri in uris]
+
+def _pipeline_pmids(pubs):
+    pmids = get_pmids_from_dois([pub['doi'] for [uri, pub] in pubs
+                                 if 'doi' in pub])
+    return [[uri, pub, pmids[pub['doi']]] for [uri, pub] in pubs
+            if 'doi' in pub and pmids[pub['doi']] is not None]
+
+def _pipeline_values(pubs):
+    values = get_pubmed_values_batch([pmid for [uri, pub, pmid] in pubs])
+    return [[uri, pub, values[pmid]] for [uri, pub, pmid] in pubs]
+
+def _pipeline_rdf(pub):
+    [uri, pub, values] = pub
+    buffer = RDFBuffer()
+    _update_pubmed_rdf(uri, pub, values, buffer)
+    return buffer.rdf()
+
+def update_pubmed_pipeline(pub_uris, chunk_size=100, workers=4,
+                           queue_size=2, sink=None):
+    """
+    Given an iterable of the uris of pubs in VIVO, return the add and sub
+    RDF to update the PubMed attributes of all of them, the RDF
+    update_pubmed would return for each pub, combined in the order of the
+    uris.  With a sink, such as an RDFFileWriter, the RDF of each chunk is
+    written to the sink as it is made and the sink is returned.
+
+    The pubs are taken chunk_size at a time through four stages, each on
+    its own thread:  fetch the pubs from VIVO with get_publications, find
+    the PMIDs of their DOIs with get_pmids_from_dois, get the PubMed values
+    of the PMIDs with get_pubmed_values_batch, and make the RDF for the pubs
+    of the chunk on a WorkerPool of workers threads.  Stages are connected
+    by queues of at most queue_size chunks, so VIVO and Entrez work at once
+    and memory is bounded however many uris there are.  Entrez requests, a
+    few per chunk, wait on entrez_rate_limiter.  The pipeline is a job with
+    a RetryBudget of its own, of retry_policy.budget retries.
+
+    If a stage throws an exception, the pipeline stops and the exception
+    is thrown again here.
+    """
+    if sink is None:
+        return update_pubmed_pipeline(pub_uris, chunk_size, workers,
+                                      queue_size, RDFBuffer()).rdf()
+    budget = RetryBudget(retry_policy.budget)
+    queues = [Queue.Queue(queue_size) for i in range(4)]
+    errors = []
+    threads = [threading.Thread(target=_pipeline_source,
+                                args=(pub_uris, chunk_size, queues[0], errors))]
+    for i, function in enumerate([_pipeline_publications, _pipeline_pmids,
+                                  _pipeline_values]):
+        threads.append(threading.Thread(target=_pipeline_stage,
+            args=(function, queues[i], queues[i+1], errors, budget)))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    pool = WorkerPool(workers)
+    previous_budget = getattr(_local_budget, 'budget', None)
+    _local_budget.budget = budget
+    try:
+        while True:
+            chunk = queues[3].get()
+            if chunk is _end_of_stream:
+                break
+            if len(errors) > 0:
+                continue
+            try:
+                for [add, sub] in pool.map(_pipeline_rdf, chunk):
+                    sink.add(add)
+                    sink.sub(sub)
+            except:
+                errors.append(sys.exc_info())
+    finally:
+        _local_budget.budget = previous_budget
+        pool.close()
+    for thread in threads:
+        thread.join()
+    if len(errors) > 0:
+        raise errors[0][0], errors[0][1], errors[0][2]
+    return sink
+
+class BatchJob(object):
+    """
+    A resumable job calling function on each of a list of work items, such
+    as pub uris for update_pubmed, [from_uri, to_uri] pairs for merge_uri or
+    uris for remove_uri, with its progress kept in an sqlite database at
+    path.  An item that is a list is passed as the arguments of function.
+    function returns [add, sub] RDF, or sub RDF alone as remove_uri does.
+
+    Items are done chunk_size at a time.  The RDF of each item of a chunk is
+    stored zlib compressed and the chunk is marked done in one transaction,
+    so a job that dies loses at most the chunk in progress.  To resume, make
+    the job again with the same path and run it:  items already done are
+    not done again.  Adding items already in the job does nothing, so a
+    script may add all its items and run every time it starts.
+
+    dictionaries names module dictionaries function adds to, such as
+    'concept_dictionary' for update_pubmed.  Their new entries are stored
+    with each chunk and put back when the job is run again, so a concept
+    made before the job died is not made again.
+
+    An item whose function throws an exception, such as PubmedUnavailable
+    from update_pubmed when Entrez does not answer, is left not done, with
+    the error, and tried again by the next run.
+    """
+    def __init__(self, path, function, chunk_size=100, dictionaries=()):
+        self.path = path
+        self.function = function
+        self.chunk_size = chunk_size
+        self.dictionaries = list(dictionaries)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS items
+            (seq INTEGER PRIMARY KEY, item TEXT UNIQUE, done INTEGER,
+            error TEXT, ardf BLOB, srdf BLOB)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries
+            (name TEXT, key TEXT, value TEXT, PRIMARY KEY (name, key))""")
+        self._db.commit()
+
+    def add(self, items):
+        """
+        Add items to the job, in order.  Items already in the job are left
+        as they are.  Return the number of items added
+        """
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("""INSERT OR IGNORE INTO items
+                (item, done) VALUES (?, 0)""",
+                ((json.dumps(item),) for item in items))
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def _restore(self):
+        """
+        Put the stored entries of the job's dictionaries back in them.
+        Return a copy of each dictionary to find new entries against
+        """
+        saved = {}
+        for name in self.dictionaries:
+            dictionary = globals()[name]
+            for [key, value] in self._db.execute("""SELECT key, value
+                FROM entries WHERE name = ?""", (name,)):
+                dictionary[key] = json.loads(value)
+            saved[name] = dict(dictionary)
+        return saved
+
+    def _new_entries(self, saved):
+        entries = []
+        for name in self.dictionaries:
+            dictionary = globals()[name]
+            for key, value in dictionary.items():
+                if key not in saved[name] or saved[name][key] != value:
+                    entries.append((name, key, json.dumps(value)))
+                    saved[name][key] = value
+        return entries
+
+    def _call(self, item):
+        """
+        Return [add, sub, error] of function on item
+        """
+        try:
+            if isinstance(item, list):
+                result = self.function(*item)
+            else:
+                result = self.function(item)
+            if isinstance(result, basestring):
+                return ["", result, None]
+            return [result[0], result[1], None]
+        except Exception, e:
+            return ["", "", repr(e)]
+
+    def run(self, pool=None, debug=False):
+        """
+        Do the items not yet done, chunk_size at a time, using pool, a
+        WorkerPool, to do the items of a chunk concurrently if given.  Each
+        run has a RetryBudget of its own, of retry_policy.budget retries.
+        Return the stats of the job
+        """
+        previous_budget = getattr(_local_budget, 'budget', None)
+        _local_budget.budget = RetryBudget(retry_policy.budget)
+        try:
+            return self._run(pool, debug)
+        finally:
+            _local_budget.budget = previous_budget
+
+    def _run(self, pool, debug):
+        with self._lock:
+            saved = self._restore()
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute("""SELECT seq, item FROM items
+                    WHERE done = 0 AND seq > ? ORDER BY seq LIMIT ?""",
+                    (last, self.chunk_size)).fetchall()
+            if len(rows) == 0:
+                break
+            items = [json.loads(row[1]) for row in rows]
+            if pool is None:
+                results = [self._call(item) for item in items]
+            else:
+                results = pool.map(self._call, items)
+            updates = []
+            for [seq, item], [add, sub, error] in zip(rows, results):
+                updates.append((error is None, error,
+                    sqlite3.Binary(zlib.compress(_utf8(add))),
+                    sqlite3.Binary(zlib.compress(_utf8(sub))), seq))
+            with self._lock:
+                self._db.executemany("""UPDATE items SET done = ?, error = ?,
+                    ardf = ?, srdf = ? WHERE seq = ?""", updates)
+                self._db.executemany("""INSERT OR REPLACE INTO entries
+                    (name, key, value) VALUES (?, ?, ?)""",
+                    self._new_entries(saved))
+                self._db.commit()
+            last = rows[-1][0]
+            if debug:
+                print datetime.now(), self.stats()
+        return self.stats()
+
+    def results(self):
+        """
+        Return a generator of [item, add, sub] for each item done, in the
+        order the items were added.  RDF is UTF-8 encoded
+        """
+        with self._lock:
+            rows = self._db.execute("""SELECT seq FROM items WHERE done = 1
+                ORDER BY seq""").fetchall()
+        for [seq] in rows:
+            with self._lock:
+                [item, add, sub] = self._db.execute("""SELECT item, ardf,
+                    srdf FROM items WHERE seq = ?""", (seq,)).fetchone()
+            yield [json.loads(item), zlib.decompress(str(add)),
+                   zlib.decompress(str(sub))]
+
+    def rdf(self):
+        """
+        Return the add and sub RDF of all the items done, combined in the
+        order the items were added
+        """
+        return self.write(RDFBuffer()).rdf()
+
+    def write(self, sink):
+        """
+        Write the add and sub RDF of all the items done to sink, such as an
+        RDFFileWriter, in the order the items were added.  Return the sink
+        """
+        for [item, add, sub] in self.results():
+            sink.add(add)
+            sink.sub(sub)
+        return sink
+
+    def failed(self):
+        """
+        Return a list of [item, error] for each item whose last try failed
+        """
+        with self._lock:
+            return [[json.loads(item), error] for [item, error] in
+                self._db.execute("""SELECT item, error FROM items
+                WHERE done = 0 AND error IS NOT NULL ORDER BY seq""")]
+
+    def stats(self):
+        with self._lock:
+            [items, done, failed] = self._db.execute("""SELECT COUNT(*),
+                SUM(done), SUM(done = 0 AND error IS NOT NULL)
+                FROM items""").fetchone()
+            return {'items': items, 'done': done or 0, 'failed': failed or 0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def _utf8(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
 
 def vivo_find_result(type="core:Publisher", label="Humana Press", debug=False):
     """
     Look for entities having the specified type and the specifed label.
     If you find any, return the json object
     """
-    query_template = Template(
+    query_template = string.Template(
     """
     SELECT ?x WHERE {
       ?x rdf:type $type .
@@ -2490,7 +3630,7 @@ def vivo_find(type="core:Publisher", label="Humana Press", debug=False):
     Look for entities having the specified type and the specifed label.
     If you find any, return true (found).  Otherwise return false (not found)
     """
-    query_template = Template(
+    query_template = string.Template(
     """
     SELECT COUNT(?s) WHERE {
       ?s rdf:type $type .
@@ -2528,16 +3668,7 @@ def get_vivo_uri(prefix="http://vivo.ufl.edu/individual/n"):
         response = vivo_sparql_query(query)
     return test_uri
 
-def vivo_sparql_query(query,
-    baseURL="http://sparql.vivo.ufl.edu/VIVO/sparql",
-    format="application/sparql-results+json", debug=False):
-
-    """
-    Given a SPARQL query string return result set of the SPARQL query.  Default
-    is to call the UF VIVO SPAQRL endpoint and receive results in JSON format
-    """
-
-    prefix = """
+sparql_prefix = """
     PREFIX rdf:     <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs:    <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX xsd:     <http://www.w3.org/2001/XMLSchema#>
@@ -2560,13 +3691,893 @@ def vivo_sparql_query(query,
     PREFIX vivo:    <http://vivoweb.org/ontology/core#>
     PREFIX core:    <http://vivoweb.org/ontology/core#>
     """
+
+#   The SPARQL endpoint queried when no baseURL is given.  Point it at a
+#   local stand-in (see vivo_stand_in.py) to work without the network
+
+sparql_endpoint = "http://sparql.vivo.ufl.edu/VIVO/sparql"
+
+def set_sparql_endpoint(url):
+    """
+    Send the queries of vivo_sparql_query, vivo_sparql_bindings and
+    vivo_sparql_pages, and so of all the functions that use them, to the
+    SPARQL endpoint at url.  Returns the previous endpoint.
+    """
+    global sparql_endpoint
+    previous = sparql_endpoint
+    sparql_endpoint = url
+    return previous
+
+class ConnectionPool(object):
+    """
+    A pool of persistent (keep-alive) HTTP connections.  Connections are kept
+    open between requests and reused for later requests to the same host, so
+    a run of many queries pays the TCP (and TLS) handshake once per
+    connection rather than once per query.
+
+    maxsize is the most connections the pool will hold open across all hosts.
+    maxsize_per_host is the most connections in use at once for a single
+    host.  Callers wanting a connection to a host already at its limit wait
+    for one to be returned to the pool.  Idle connections unused for more
+    than idle_timeout seconds are closed.  timeout is the socket timeout in
+    seconds for each connection, for connecting and for each read, so a host
+    that stops answering fails the request with socket.timeout.  None waits
+    as long as the socket default.
+    """
+    def __init__(self, maxsize=10, maxsize_per_host=4, idle_timeout=60.0,
+                 timeout=60.0):
+        self.maxsize = maxsize
+        self.maxsize_per_host = maxsize_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = {}     # host key -> list of [connection, last used time]
+        self._active = {}   # host key -> number of connections in use
+        self._condition = threading.Condition()
+
+    def _open_count(self):
+        return sum(len(v) for v in self._idle.values()) + \
+            sum(self._active.values())
+
+    def _expire_idle(self):
+        now = time.time()
+        for key in self._idle.keys():
+            fresh = []
+            for connection, last_used in self._idle[key]:
+                if now - last_used > self.idle_timeout:
+                    connection.close()
+                else:
+                    fresh.append([connection, last_used])
+            self._idle[key] = fresh
+
+    def _close_oldest_idle(self):
+        oldest = None
+        for key, idle in self._idle.items():
+            if len(idle) > 0 and (oldest is None or
+                                  idle[0][1] < self._idle[oldest][0][1]):
+                oldest = key
+        if oldest is None:
+            return False
+        self._idle[oldest].pop(0)[0].close()
+        return True
+
+    def _acquire(self, key):
+        """
+        Return a [connection, reused] pair for the host key, waiting if the
+        host or the pool is at its limit
+        """
+        with self._condition:
+            while True:
+                self._expire_idle()
+                if self._active.get(key, 0) < self.maxsize_per_host:
+                    idle = self._idle.get(key, [])
+                    if len(idle) > 0:
+                        connection = idle.pop()[0]
+                        self._active[key] = self._active.get(key, 0) + 1
+                        return [connection, True]
+                    if self._open_count() < self.maxsize or \
+                        self._close_oldest_idle():
+                        self._active[key] = self._active.get(key, 0) + 1
+                        break
+                self._condition.wait(1.0)
+        (scheme, netloc) = key
+        if scheme == "https":
+            connection = httplib.HTTPSConnection(netloc, timeout=self.timeout)
+        else:
+            connection = httplib.HTTPConnection(netloc, timeout=self.timeout)
+        return [connection, False]
+
+    def _release(self, key, connection, reusable):
+        with self._condition:
+            self._active[key] = self._active[key] - 1
+            if reusable:
+                self._idle.setdefault(key, []).append([connection,
+                                                       time.time()])
+            else:
+                connection.close()
+            self._condition.notify_all()
+
+    def urlopen(self, method, url, body=None, headers=None):
+        """
+        Issue an HTTP request on a pooled connection and return a
+        PooledResponse.  The connection goes back to the pool when the
+        response has been read to the end or closed.  A reused connection
+        the server has since dropped is replaced with a fresh one, once.  A
+        request that times out is not sent again here.
+        """
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = path + "?" + parts.query
+        if headers is None:
+            headers = {}
+        while True:
+            [connection, reused] = self._acquire(key)
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+            except (httplib.HTTPException, socket.error), error:
+                self._release(key, connection, False)
+                if reused and not isinstance(error, socket.timeout):
+                    continue
+                raise
+            return PooledResponse(self, key, connection, response)
+
+    def request(self, method, url, body=None, headers=None):
+        """
+        Issue an HTTP request on a pooled connection.  Return the status code
+        and the full body of the response
+        """
+        response = self.urlopen(method, url, body, headers)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+        return [response.status, data]
+
+    def close(self):
+        """
+        Close all idle connections
+        """
+        with self._condition:
+            for idle in self._idle.values():
+                for connection, last_used in idle:
+                    connection.close()
+            self._idle = {}
+
+class PooledResponse(object):
+    """
+    A response read from a ConnectionPool connection.  Reading to the end, or
+    closing, returns the connection to the pool.
+    """
+    def __init__(self, pool, key, connection, response):
+        self.pool = pool
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.released = False
+
+    def getheader(self, name, default=None):
+        return self.response.getheader(name, default)
+
+    def read(self, amt=None):
+        try:
+            data = self.response.read(amt)
+        except (httplib.HTTPException, socket.error):
+            self._release(False)
+            raise
+        if amt is None or data == "":
+            self._release(not self.response.will_close)
+        return data
+
+    def close(self):
+        self._release(self.response.isclosed() and
+                      not self.response.will_close)
+
+    def _release(self, reusable):
+        if not self.released:
+            self.released = True
+            self.pool._release(self.key, self.connection, reusable)
+
+sparql_connection_pool = ConnectionPool()
+
+def set_connection_pool(pool):
+    """
+    Replace the connection pool used by vivo_sparql_query and the other
+    network functions.  Returns the previous pool, which is not closed.
+    """
+    global sparql_connection_pool
+    previous = sparql_connection_pool
+    sparql_connection_pool = pool
+    return previous
+
+class QueryCache(object):
+    """
+    An in-process cache of SPARQL query results, keyed by endpoint, result
+    format and query text with runs of whitespace collapsed.  Holds at most
+    maxsize results, evicting the least recently used.  Each result expires
+    ttl seconds after it is stored.  hits and misses count lookups.
+
+    Cached results are shared by every caller asking the same query.  Treat
+    them as read only.
+    """
+    def __init__(self, maxsize=1000, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict() # key -> [expires, result]
+        self._lock = threading.Lock()
+
+    def key(self, query, endpoint, format=""):
+        return (endpoint, format, " ".join(query.split()))
+
+    def get(self, key):
+        """
+        Return the cached result for key, or None if there is none or it has
+        expired
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                self.misses = self.misses + 1
+                return None
+            self._entries[key] = entry # most recently used goes last
+            self.hits = self.hits + 1
+            return entry[1]
+
+    def put(self, key, result, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = [time.time() + ttl, result]
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, query=None, endpoint=None):
+        """
+        Remove cached results.  With no arguments, remove all of them.  Given
+        a query, remove the results of that query.  Given an endpoint, remove
+        the results from that endpoint.
+        """
+        with self._lock:
+            if query is not None:
+                query = " ".join(query.split())
+            for key in self._entries.keys():
+                if (endpoint is None or key[0] == endpoint) and \
+                    (query is None or key[2] == query):
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
+
+sparql_query_cache = None
+
+def set_query_cache(cache):
+    """
+    Use cache, a QueryCache, for the results of vivo_sparql_query.  None
+    turns caching off, the default.  Returns the previous cache.
+    """
+    global sparql_query_cache
+    previous = sparql_query_cache
+    sparql_query_cache = cache
+    return previous
+
+class DiskQueryCache(object):
+    """
+    A persistent cache of SPARQL responses in an sqlite database at path.
+    Responses are stored zlib compressed, keyed by a SHA-1 digest of the
+    endpoint, result format and query text with runs of whitespace
+    collapsed.  Responses older than max_age seconds are not served.  When
+    the stored responses exceed max_size bytes, the oldest are removed.
+    """
+    def __init__(self, path, max_age=86400.0, max_size=500*1024*1024):
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses
+            (key TEXT PRIMARY KEY, stored REAL, size INTEGER, data BLOB)""")
+        self._db.execute("""CREATE INDEX IF NOT EXISTS responses_stored
+            ON responses (stored)""")
+        self._db.commit()
+
+    def key(self, query, endpoint, format=""):
+        text = endpoint + "\n" + format + "\n" + " ".join(query.split())
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        return hashlib.sha1(text).hexdigest()
+
+    def get(self, key):
+        """
+        Return the response text stored for key, or None if there is none or
+        it is older than max_age
+        """
+        with self._lock:
+            row = self._db.execute("""SELECT stored, data FROM responses
+                WHERE key = ?""", (key,)).fetchone()
+            if row is None or row[0] < time.time() - self.max_age:
+                self.misses = self.misses + 1
+                return None
+            self.hits = self.hits + 1
+            return zlib.decompress(str(row[1]))
+
+    def put(self, key, response):
+        data = zlib.compress(response)
+        with self._lock:
+            self._db.execute("""INSERT OR REPLACE INTO responses
+                (key, stored, size, data) VALUES (?, ?, ?, ?)""",
+                (key, time.time(), len(data), sqlite3.Binary(data)))
+            total = self._db.execute(
+                "SELECT SUM(size) FROM responses").fetchone()[0]
+            while total > self.max_size:
+                [oldest, size] = self._db.execute("""SELECT key, size
+                    FROM responses ORDER BY stored LIMIT 1""").fetchone()
+                self._db.execute("DELETE FROM responses WHERE key = ?",
+                                 (oldest,))
+                total = total - size
+            self._db.commit()
+
+    def invalidate(self, max_age=None):
+        """
+        Remove stored responses older than max_age seconds.  With no
+        argument, remove all of them
+        """
+        with self._lock:
+            if max_age is None:
+                self._db.execute("DELETE FROM responses")
+            else:
+                self._db.execute("DELETE FROM responses WHERE stored < ?",
+                                 (time.time() - max_age,))
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            [count, size] = self._db.execute(
+                "SELECT COUNT(*), SUM(size) FROM responses").fetchone()
+            return {'size': count, 'bytes': size or 0,
+                    'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+sparql_disk_cache = None
+
+def set_disk_cache(cache):
+    """
+    Use cache, a DiskQueryCache, for the responses of vivo_sparql_query.
+    None turns the disk cache off, the default.  Returns the previous cache.
+    """
+    global sparql_disk_cache
+    previous = sparql_disk_cache
+    sparql_disk_cache = cache
+    return previous
+
+class RetryPolicy(object):
+    """
+    How the network calls of vivotools retry.  A failed call is retried up
+    to retries times, sleeping a random time between zero and base * 2**n
+    seconds, at most cap, before retry n.  Timeouts, dropped connections,
+    429 and 5xx responses are retried.  Other 4xx responses mean the request
+    itself is wrong and are not retried.
+
+    budget is the number of retries allowed across all calls of a job.
+    Once spent, calls fail on their first error.  Each BatchJob run and
+    update_pubmed_pipeline has a RetryBudget of its own for the calls it
+    makes, on any thread.  Other calls share the budget of the policy,
+    restored by reset.  None, the default, means no budget.
+
+    Each service (a host) has a circuit breaker.  After failure_threshold
+    calls to a service have failed in a row, the circuit opens and calls to
+    the service throw CircuitOpen at once.  After reset_timeout seconds one
+    call is let through.  If it succeeds the circuit closes.
+    """
+    def __init__(self, retries=5, base=1.0, cap=30.0, budget=None,
+                 failure_threshold=5, reset_timeout=60.0, sleep=time.sleep):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self._budget = RetryBudget(budget)
+        self._failures = {}
+        self._opened = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """
+        Restore the retry budget of the policy and close all circuits
+        """
+        with self._lock:
+            self._budget = RetryBudget(self.budget)
+            self._failures = {}
+            self._opened = {}
+
+    def _current_budget(self):
+        budget = getattr(_local_budget, 'budget', None)
+        if budget is None:
+            budget = self._budget
+        return budget
+
+    def backoff(self, attempt):
+        """
+        Return the seconds to sleep before retry number attempt
+        """
+        return random.uniform(0, min(self.cap, self.base * 2**(attempt-1)))
+
+    def retryable(self, error):
+        """
+        Return True if the call that threw error should be retried
+        """
+        if isinstance(error, socket.timeout):
+            return True
+        status = getattr(error, 'status', getattr(error, 'code', None))
+        if isinstance(status, int) and 400 <= status < 500:
+            return status == 429
+        return True
+
+    def _before_call(self, service):
+        with self._lock:
+            opened = self._opened.get(service)
+            if opened is None:
+                return
+            if time.time() - opened < self.reset_timeout:
+                raise CircuitOpen(service)
+            self._opened[service] = time.time() # one trial call, half-open
+
+    def _after_call(self, service, failed):
+        """
+        Record the outcome of a call.  Return True if the circuit for
+        service is open
+        """
+        with self._lock:
+            if not failed:
+                self._failures[service] = 0
+                self._opened.pop(service, None)
+                return False
+            failures = self._failures.get(service, 0) + 1
+            self._failures[service] = failures
+            if failures >= self.failure_threshold:
+                self._opened[service] = time.time()
+            return service in self._opened
+
+    def _spend_retry(self):
+        return self._current_budget().spend()
+
+    def call(self, service, function, *args):
+        """
+        Return function(*args), retrying as the policy allows.  Throw the
+        last error if the call cannot be made to succeed, or CircuitOpen if
+        the circuit for service is open or a failure opens it, at once,
+        without sleeping first.
+        """
+        attempt = 0
+        while True:
+            self._before_call(service)
+            try:
+                result = function(*args)
+            except Exception, error:
+                if not self.retryable(error):
+                    self._after_call(service, False) # service is up
+                    raise
+                opened = self._after_call(service, True)
+                attempt = attempt + 1
+                if attempt > self.retries:
+                    raise
+                if opened:
+                    raise CircuitOpen(service) # rather than sleep first
+                if not self._spend_retry():
+                    raise
+                sleep_seconds = self.backoff(attempt)
+                print "<!-- Failed call to "+service+". Count = "+\
+                    str(attempt)+" Will sleep now for "+\
+                    str(round(sleep_seconds, 1))+" seconds and retry -->"
+                self.sleep(sleep_seconds)
+                continue
+            self._after_call(service, False)
+            return result
+
+    def stats(self):
+        """
+        Return the retries used from the budget of the current job, or of
+        the policy outside a job, and the services with open circuits
+        """
+        retries_used = self._current_budget().used
+        with self._lock:
+            return {'retries_used': retries_used,
+                    'open_circuits': sorted(self._opened.keys())}
+
+class RetryBudget(object):
+    """
+    The retries allowed across the calls of one job.  retries None allows
+    any number.  used is the number spent
+    """
+    def __init__(self, retries=None):
+        self.retries = retries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def spend(self):
+        """
+        Spend a retry.  Return False if none are left
+        """
+        with self._lock:
+            if self.retries is not None and self.used >= self.retries:
+                return False
+            self.used = self.used + 1
+            return True
+
+#   The RetryBudget of the job a thread is working for.  Futures carry it to
+#   the thread that runs them
+
+_local_budget = threading.local()
+
+retry_policy = RetryPolicy()
+
+def set_retry_policy(policy):
+    """
+    Use policy, a RetryPolicy, for the network calls of vivo_sparql_query,
+    vivo_sparql_bindings, get_pmid_from_doi and get_pubmed_values.  Returns
+    the previous RetryPolicy.
+    """
+    global retry_policy
+    previous = retry_policy
+    retry_policy = policy
+    return previous
+
+def _service(url):
+    """
+    Given a URL, return the name of its service for RetryPolicy
+    """
+    return urlparse.urlsplit(url).netloc
+
+class Metrics(object):
+    """
+    A registry of the network calls made by vivotools.  Each call is
+    recorded with its service ('sparql', 'entrez' or 'catalyst'), the
+    vivotools function that caused it, its time in seconds, the bytes of
+    its response, its retries and whether it failed.  Calls are summed by
+    service and caller, with a histogram of times.  Dump the registry with
+    to_json or to_prometheus and reset it between jobs.
+    """
+    buckets = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+               60.0]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def record(self, service, caller, seconds, size=0, retries=0,
+               error=False):
+        with self._lock:
+            series = self._series.get((service, caller))
+            if series is None:
+                series = {'count': 0, 'errors': 0, 'seconds': 0.0,
+                          'max_seconds': 0.0, 'bytes': 0, 'retries': 0,
+                          'buckets': [0] * len(self.buckets)}
+                self._series[(service, caller)] = series
+            series['count'] = series['count'] + 1
+            series['seconds'] = series['seconds'] + seconds
+            series['max_seconds'] = max(series['max_seconds'], seconds)
+            series['bytes'] = series['bytes'] + size
+            series['retries'] = series['retries'] + retries
+            if error:
+                series['errors'] = series['errors'] + 1
+            for i in range(len(self.buckets)):
+                if seconds <= self.buckets[i]:
+                    series['buckets'][i] = series['buckets'][i] + 1
+
+    def snapshot(self):
+        """
+        Return the metrics as a dictionary of services, each a dictionary of
+        callers.  The buckets of a caller count the calls taking no more
+        than the seconds of each of Metrics.buckets
+        """
+        with self._lock:
+            metrics = {}
+            for [service, caller], series in self._series.items():
+                series = dict(series, buckets=list(series['buckets']))
+                metrics.setdefault(service, {})[caller] = series
+            return metrics
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True,
+                          separators=(',', ': '))
+
+    def to_prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format
+        """
+        metrics = self.snapshot()
+        series = [[service, caller, metrics[service][caller]]
+                  for service in sorted(metrics)
+                  for caller in sorted(metrics[service])]
+        lines = ["# HELP vivotools_request_seconds Time of network calls",
+                 "# TYPE vivotools_request_seconds histogram"]
+        for [service, caller, s] in series:
+            labels = 'service="%s",caller="%s"' % (service, caller)
+            for [bound, count] in zip(self.buckets, s['buckets']):
+                lines.append('vivotools_request_seconds_bucket{%s,le="%s"} %d'
+                             % (labels, repr(bound), count))
+            lines.append('vivotools_request_seconds_bucket{%s,le="+Inf"} %d'
+                         % (labels, s['count']))
+            lines.append('vivotools_request_seconds_sum{%s} %s'
+                         % (labels, repr(s['seconds'])))
+            lines.append('vivotools_request_seconds_count{%s} %d'
+                         % (labels, s['count']))
+        for [name, key, text] in [
+                ["vivotools_response_bytes_total", 'bytes',
+                 "Bytes of responses to network calls"],
+                ["vivotools_request_retries_total", 'retries',
+                 "Retries of network calls"],
+                ["vivotools_request_errors_total", 'errors',
+                 "Network calls that failed"]]:
+            lines.append("# HELP " + name + " " + text)
+            lines.append("# TYPE " + name + " counter")
+            for [service, caller, s] in series:
+                lines.append('%s{service="%s",caller="%s"} %d'
+                             % (name, service, caller, s[key]))
+        return "\n".join(lines) + "\n"
+
+network_metrics = Metrics()
+
+def set_metrics(metrics):
+    """
+    Record the network calls of vivotools in metrics, a Metrics.  None turns
+    recording off.  Returns the previous Metrics.
+    """
+    global network_metrics
+    previous = network_metrics
+    network_metrics = metrics
+    return previous
+
+_local_caller = threading.local()
+
+def _caller():
+    """
+    Return the name of the outermost public function of vivotools on the
+    stack, that is the function the user called.  Work done by a Future is
+    credited to the caller of the thread that made the Future
+    """
+    caller = getattr(_local_caller, 'name', None)
+    if caller is not None:
+        return caller
+    module = globals()
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_code.co_name
+        if frame.f_globals is module and not name.startswith("_") and \
+            getattr(module.get(name), 'func_code', None) is frame.f_code:
+            caller = name
+        frame = frame.f_back
+    return caller or "-"
+
+class TraceMissing(Exception):
+    """
+    A Trace in replay mode has no recorded response for a request
+    """
+    pass
+
+class Trace(object):
+    """
+    The requests vivotools makes to VIVO and Entrez and their responses,
+    kept in a gzip file of one JSON object per line.  In 'record' mode each
+    call is made as usual and its request and response written to the file.
+    In 'replay' mode no calls are made.  Each request is answered with the
+    responses recorded for it, in the order recorded, the last repeating if
+    the request is made more often than it was recorded.  A request not in
+    the trace throws TraceMissing, so it fails as if the service were down.
+    """
+    def __init__(self, path, mode='replay'):
+        if mode not in ('record', 'replay'):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._file = None
+        if mode == 'record':
+            self._file = gzip.open(path, 'wb')
+        else:
+            f = gzip.open(path, 'rb')
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    key = (entry['service'], entry['request'])
+                    self._responses.setdefault(key, []).append(
+                        entry['response'].encode('latin-1'))
+            finally:
+                f.close()
+            self._next = dict((key, 0) for key in self._responses)
+
+    def record(self, service, request, response):
+        # Responses are bytes.  latin-1 maps them to text and back unchanged
+        line = json.dumps({'service': service, 'request': request,
+                           'response': response.decode('latin-1')},
+                          separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded = self.recorded + 1
+
+    def replay(self, service, request):
+        """
+        Return the next response recorded for the request to service
+        """
+        key = (service, request)
+        with self._lock:
+            responses = self._responses.get(key)
+            if responses is None:
+                self.missing = self.missing + 1
+                raise TraceMissing(service + " " + request)
+            i = self._next[key]
+            self._next[key] = min(i + 1, len(responses) - 1)
+            self.replayed = self.replayed + 1
+            return responses[i]
+
+    def stats(self):
+        with self._lock:
+            return {'mode': self.mode, 'recorded': self.recorded,
+                    'replayed': self.replayed, 'missing': self.missing}
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+network_trace = None
+
+def set_trace(trace):
+    """
+    Record the requests to VIVO and Entrez in trace, a Trace in 'record'
+    mode, or answer them from trace, a Trace in 'replay' mode.  None turns
+    tracing off.  Returns the previous Trace.
+    """
+    global network_trace
+    previous = network_trace
+    network_trace = trace
+    return previous
+
+class RateLimiter(object):
+    """
+    A token bucket.  Tokens are added at rate per second, up to burst.
+    acquire takes a token, waiting until one is due if there is none.
+    Waiting threads take tokens in the order they asked, so calls from any
+    number of threads together stay within the rate.
+    """
+    def __init__(self, rate=3.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0.0
+        self._tokens = float(burst)
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, waiting for it if need be.  Return the seconds waited
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens = self._tokens - 1 # below zero reserves a later token
+            wait = max(0.0, -self._tokens / self.rate)
+            self.waited = self.waited + wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+#   NCBI allows 3 requests a second to the Entrez utilities, 10 with an API
+#   key.  All Entrez requests of vivotools wait on entrez_rate_limiter
+
+entrez_api_key = None
+entrez_rate_limiter = RateLimiter(3.0)
+
+def set_entrez_rate_limiter(limiter):
+    """
+    Make all Entrez requests wait on limiter, a RateLimiter.  None turns
+    rate limiting off.  Returns the previous RateLimiter.
+    """
+    global entrez_rate_limiter
+    previous = entrez_rate_limiter
+    entrez_rate_limiter = limiter
+    return previous
+
+def set_entrez_api_key(api_key):
+    """
+    Send api_key, an NCBI API key, with all Entrez requests and raise the
+    rate of entrez_rate_limiter to the 10 requests a second NCBI allows with
+    a key.  None removes the key and returns to 3 a second.  Returns the
+    previous key.
+    """
+    global entrez_api_key
+    previous = entrez_api_key
+    entrez_api_key = api_key
+    Entrez.api_key = api_key
+    if entrez_rate_limiter is not None:
+        entrez_rate_limiter.rate = 3.0 if api_key is None else 10.0
+    return previous
+
+def _network_call(service, host, request, function, *args):
+    """
+    Return function(*args), retried as retry_policy allows for host, and
+    record the call in network_metrics as a call to service.  request, the
+    text of the request, identifies the call in network_trace.  Each try of
+    an Entrez call waits on entrez_rate_limiter
+    """
+    trace = network_trace
+    if trace is not None and trace.mode == 'replay':
+        return trace.replay(service, request)
+    metrics = network_metrics
+    limiter = None
+    if service == 'entrez':
+        limiter = entrez_rate_limiter
+    attempts = [0]
+    def attempt(*args):
+        attempts[0] = attempts[0] + 1
+        if limiter is not None:
+            limiter.acquire()
+        return function(*args)
+    start = time.time()
+    error = True
+    size = 0
+    try:
+        result = retry_policy.call(host, attempt, *args)
+        error = False
+        if isinstance(result, basestring):
+            size = len(result)
+        if trace is not None:
+            trace.record(service, request, result)
+        return result
+    finally:
+        if metrics is not None:
+            metrics.record(service, _caller(), time.time() - start, size,
+                           max(0, attempts[0] - 1), error)
+
+def vivo_sparql_bindings(query, baseURL=None, debug=False,
+    read_size=65536):
+    """
+    Given a SPARQL SELECT query string, return a generator of the result
+    bindings.  The JSON response is parsed a binding at a time as it is read,
+    read_size bytes at a time, so large result sets are processed without
+    holding the whole response or its parsed form in memory.
+
+    Streamed queries are not served from or stored in the query caches.
+    If the query fails, or the response times out or ends before the
+    closing ] of the bindings, SparqlQueryError is thrown.  baseURL defaults to
+    sparql_endpoint.  While a Trace is set, the response is read whole, so
+    it can be recorded or replayed, and then parsed.
+    """
+    if baseURL is None:
+        baseURL = sparql_endpoint
     params = {
         "default-graph":"",
         "should-sponge":"soft",
-        "query":prefix+query,
+        "query":sparql_prefix+query,
         "debug":"on",
         "timeout":"7000",  # 7 seconds
-        "format":format,
+        "format":"application/sparql-results+json",
         "save":"display",
         "fname":""
     }
@@ -2574,23 +4585,269 @@ def vivo_sparql_query(query,
     if debug:
         print "Base URL", baseURL
         print "Query:", querypart
-    start = 2.0
-    retries = 10
-    count = 0
-    while True:
+    def post():
+        response = sparql_connection_pool.urlopen("POST", baseURL, querypart,
+            {"Content-Type": "application/x-www-form-urlencoded"})
+        if response.status >= 400:
+            response.close()
+            raise HTTPStatusError(response.status, baseURL)
+        return response
+    metrics = network_metrics
+    start = time.time()
+    attempts = [0]
+    def attempt():
+        attempts[0] = attempts[0] + 1
+        return post()
+    if network_trace is not None:
+        metrics = None # recorded by _sparql_fetch
+        data = _sparql_fetch(baseURL, querypart)
+        if data is None:
+            raise SparqlQueryError("Query failed")
+        response = cStringIO.StringIO(data)
+    else:
         try:
-            response = urllib.urlopen(baseURL, querypart).read()
-            break
-        except:
-            count = count + 1
-            if count > retries:
-                break
-            sleep_seconds = start**count
-            print "<!-- Failed query. Count = "+str(count)+\
-                " Will sleep now for "+str(sleep_seconds)+\
-                " seconds and retry -->"
-            time.sleep(sleep_seconds) # increase the wait time with each retry
+            response = retry_policy.call(_service(baseURL), attempt)
+        except Exception, e:
+            if metrics is not None:
+                metrics.record('sparql', _caller(), time.time() - start, 0,
+                               max(0, attempts[0] - 1), True)
+            raise SparqlQueryError("Query failed: " + repr(e))
+
+    #   Skip to the start of the bindings array, then decode one binding at a
+    #   time.  A ValueError from raw_decode means the binding is not yet
+    #   complete in the buffer, so read more.
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    bindings_start = re.compile(r'"bindings"\s*:\s*\[')
+    buf = u""
+    pos = None
+    size = 0
+    error = False
+    try:
+        while True:
+            try:
+                data = response.read(read_size)
+            except (httplib.HTTPException, socket.error), e:
+                error = True
+                raise SparqlQueryError("Response failed after " + \
+                    str(size) + " bytes: " + repr(e))
+            size = size + len(data)
+            buf = buf + text_decoder.decode(data, data == "")
+            if pos is None:
+                match = bindings_start.search(buf)
+                if match is None:
+                    if data == "":
+                        error = True
+                        raise SparqlQueryError("No bindings in response")
+                    continue
+                pos = match.end()
+            while True:
+                while pos < len(buf) and buf[pos] in u" \t\r\n,":
+                    pos = pos + 1
+                if pos < len(buf) and buf[pos] == u"]":
+                    return
+                try:
+                    [binding, pos] = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    break
+                yield binding
+            if data == "":
+                error = True
+                raise SparqlQueryError("Response ended after " + \
+                    str(size) + " bytes, before the end of the bindings")
+            buf = buf[pos:]
+            pos = 0
+    finally:
+        response.close()
+        if metrics is not None:
+            metrics.record('sparql', _caller(), time.time() - start, size,
+                           attempts[0] - 1, error)
+
+def vivo_sparql_pages(query, page_size=5000, workers=4, order_by=None,
+    baseURL=None):
+    """
+    Given a SPARQL SELECT query string without ORDER BY, LIMIT or OFFSET,
+    return a generator of the result bindings.  The query is issued a page
+    at a time with ORDER BY, LIMIT page_size and OFFSET added, so each page
+    completes within the endpoint timeout.  Up to workers pages are fetched
+    at once.  Bindings are generated in order.
+
+    order_by defaults to the variables selected by the query.  If the query
+    selects * or its variables can not be found, pass order_by.  A page that
+    fails throws SparqlQueryError rather than truncating the results.
+
+    The pages are fetched by a WorkerPool of the generator's own, closed
+    when the generator finishes or is closed.
+    """
+    if order_by is None:
+        match = re.search(r'SELECT\s+(?:DISTINCT\s+|REDUCED\s+)?(.*?)\s*' \
+            r'(?:FROM|WHERE|\{)', query, re.I | re.S)
+        if match is not None:
+            order_by = " ".join(re.findall(r'\?\w+', match.group(1)))
+        if match is None or order_by == "":
+            raise ValueError("Can not find the variables of the query to " \
+                "order its pages by.  Pass order_by")
+    page_template = query + "\n    ORDER BY " + order_by + \
+        "\n    LIMIT " + str(page_size) + "\n    OFFSET "
+    pool = WorkerPool(workers)
+
+    def fetch(page):
+        return pool.submit(vivo_sparql_query,
+                           page_template + str(page * page_size),
+                           baseURL=baseURL)
+
+    futures = collections.deque(fetch(page) for page in range(workers))
+    next_page = workers
+    page = 0
+    try:
+        while True:
+            try:
+                bindings = futures.popleft().result()["results"]["bindings"]
+            except Exception:
+                raise SparqlQueryError("Page " + str(page) + \
+                    " of query failed")
+            if len(bindings) < page_size:
+                for b in bindings:
+                    yield b
+                return
+            futures.append(fetch(next_page))
+            next_page = next_page + 1
+            for b in bindings:
+                yield b
+            page = page + 1
+    finally:
+        pool.close()
+
+class SingleFlight(object):
+    """
+    Lets concurrent identical calls share one call.  The first caller with
+    a key makes the call.  Callers with the same key arriving while it is in
+    progress wait for it and get the same result.  calls counts the calls
+    made, shared counts the calls saved.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        with self._lock:
+            future = self._in_flight.get(key)
+            first = future is None
+            if first:
+                future = Future(function, args)
+                self._in_flight[key] = future
+                self.calls = self.calls + 1
+            else:
+                self.shared = self.shared + 1
+        if not first:
+            return future.result()
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared,
+                    'in_flight': len(self._in_flight)}
+
+sparql_single_flight = SingleFlight()
+
+def set_single_flight(single_flight):
+    """
+    Use single_flight, a SingleFlight, to share the response of a query
+    among concurrent callers of vivo_sparql_query asking the same query.
+    None turns sharing off.  Returns the previous SingleFlight.
+    """
+    global sparql_single_flight
+    previous = sparql_single_flight
+    sparql_single_flight = single_flight
+    return previous
+
+def _sparql_post(baseURL, querypart):
+    [status, response] = sparql_connection_pool.request("POST", baseURL,
+        querypart, {"Content-Type": "application/x-www-form-urlencoded"})
+    if status >= 400:
+        raise HTTPStatusError(status, baseURL)
+    return response
+
+def _sparql_fetch(baseURL, querypart):
+    """
+    Post the encoded query to the SPARQL endpoint at baseURL, retrying as
+    retry_policy allows.  Return the text of the response, or None if the
+    endpoint does not respond, rejects the query or its circuit is open
+    """
+    try:
+        return _network_call('sparql', _service(baseURL), querypart,
+                             _sparql_post, baseURL, querypart)
+    except Exception:
+        return None
+
+def vivo_sparql_query(query, baseURL=None,
+    format="application/sparql-results+json", debug=False):
+
+    """
+    Given a SPARQL query string return result set of the SPARQL query.  Default
+    is to call the UF VIVO SPAQRL endpoint and receive results in JSON format
+
+    Queries are sent on keep-alive connections from sparql_connection_pool.
+    Use set_connection_pool to change the pool size and limits.  If a
+    QueryCache has been set with set_query_cache, results are served from
+    it when present and stored in it when not.  Likewise for a DiskQueryCache
+    set with set_disk_cache, so repeated runs need not query VIVO at all.
+    Concurrent callers asking the same query share one request to VIVO
+    through sparql_single_flight.
+
+    baseURL defaults to sparql_endpoint, set with set_sparql_endpoint.
+    Each request to the endpoint is recorded in network_metrics.
+    """
+    if baseURL is None:
+        baseURL = sparql_endpoint
+    cache = sparql_query_cache
+    if cache is not None:
+        cache_key = cache.key(query, baseURL, format)
+        result = cache.get(cache_key)
+        if result is not None:
+            return result
+
+    params = {
+        "default-graph":"",
+        "should-sponge":"soft",
+        "query":sparql_prefix+query,
+        "debug":"on",
+        "timeout":"7000",  # 7 seconds
+        "format":format,
+        "save":"display",
+        "fname":""
+    }
+    querypart = urllib.urlencode(params)
+    if debug:
+        print "Base URL", baseURL
+        print "Query:", querypart
+    disk_cache = sparql_disk_cache
+    response = None
+    if disk_cache is not None:
+        disk_key = disk_cache.key(query, baseURL, format)
+        response = disk_cache.get(disk_key)
+    fetched = response is None
+    if fetched:
+        single_flight = sparql_single_flight
+        if single_flight is None:
+            response = _sparql_fetch(baseURL, querypart)
+        else:
+            response = single_flight.do(
+                (baseURL, format, " ".join(query.split())),
+                _sparql_fetch, baseURL, querypart)
     try:
-        return json.loads(response)
+        result = json.loads(response)
     except:
         return None
+    if disk_cache is not None and fetched:
+        disk_cache.put(disk_key, response)
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result